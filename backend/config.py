@@ -3,7 +3,19 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = ""
+    database_read_url: str = ""  # optional read replica for GET list/stats/dashboard
     db_schema: str = "clnpth"
+    db_ssl: str = "disable"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_background_pool_size: int = 3
+    db_background_max_overflow: int = 2
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # seconds, -1 = never
+    db_pool_timeout: int = 30
+    db_statement_timeout_ms: int = 0  # 0 = server default
+    db_prepared_statement_cache_size: int = 500  # asyncpg per-connection cache, 0 = off
+    db_query_cache_size: int = 1000  # SQLAlchemy compiled statement cache
     frontend_port: int = 5173
     n8n_url: str = "http://localhost:5678"
     n8n_webhook_token: str = ""
@@ -11,13 +23,45 @@ class Settings(BaseSettings):
     deepl_api_url: str = "https://api-free.deepl.com/v2"
     mistral_api_key: str = ""
     mistral_model: str = "mistral-large-latest"
+    mistral_rate_limit_rps: float = 1.0  # request starts per second for batch jobs, 0 = unlimited
+    supervisor_batch_concurrency: int = 4
     runpod_api_key: str = ""
     runpod_endpoint_id: str = ""
     image_storage_path: str = "static/images"
+    image_derivative_widths: str = "480,768,1024"  # resized variants (px), plus full size
+    image_derivative_formats: str = "webp,avif"  # needs Pillow; missing encoders are skipped
+    image_derivative_workers: int = 2  # encoder process pool size
     wp_url: str = "http://meinsite.local/wp-json/wp/v2"
     wp_user: str = ""
     wp_app_password: str = ""
+    wp_max_concurrency: int = 4  # concurrent REST requests per WordPress site
     comfyui_url: str = "http://localhost:8188"
+    comfyui_urls: str = ""  # comma-separated ComfyUI pool; empty = comfyui_url only
+    comfyui_max_queue: int = 4  # queue depth at which an instance counts as saturated
+
+    # Image backend health monitor / circuit breaker
+    image_health_interval: int = 15  # seconds between ComfyUI probes
+    image_circuit_failure_threshold: int = 3
+    image_circuit_reset_timeout: int = 60  # seconds before a half-open trial
+
+    # Image jobs: running jobs heartbeat; silent ones are resumed by another worker/restart
+    image_job_stale_after: int = 120  # seconds without heartbeat before a job is resumed
+    image_job_max_attempts: int = 3
+
+    # n8n webhook ingestion (write-behind queue)
+    webhook_async_ingest: bool = False
+    webhook_queue_size: int = 1000
+    webhook_batch_size: int = 50
+    webhook_ingest_retention_days: int = 14  # idempotency/step log kept for late n8n retries
+
+    # Tonality snapshot lifetime (seconds); bounds staleness across workers
+    tonality_cache_ttl: int = 60
+    # Serialized supervisor dashboard lifetime (seconds)
+    dashboard_cache_ttl: int = 15
+
+    # WebSocket replay — per-process state, so the app runs as a single worker
+    ws_replay_buffer_size: int = 1000
+    ws_replay_state_path: str = ""  # empty = keep replay buffer in memory only
 
     # Feature flags
     feature_image: bool = True
@@ -0,0 +1,32 @@
+"""Transaction hooks for async sessions.
+
+In-process caches must only be invalidated once a write is visible to other
+sessions. Invalidating before the commit lets a concurrent load read the old
+rows after the version bump and cache them for the whole TTL.
+"""
+
+from collections.abc import Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_INFO_KEY = "on_commit"
+
+
+def _run_pending(session) -> None:
+    for callback in session.info.pop(_INFO_KEY, []):
+        callback()
+
+
+def on_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run `callback` once after the session's current transaction commits.
+
+    Registering the same callback twice before the commit runs it once.
+    """
+    session = db.sync_session
+    pending = session.info.setdefault(_INFO_KEY, [])
+    if callback in pending:
+        return
+    if not pending:
+        event.listen(session, "after_commit", _run_pending, once=True)
+    pending.append(callback)
@@ -0,0 +1,42 @@
+"""add unique (artikel_id, sprache) constraint on translations for upserts
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Drop duplicate translations left by earlier select-then-insert races (keep newest)
+    op.execute(
+        """
+        DELETE FROM clnpth.artikel_uebersetzungen a
+        USING clnpth.artikel_uebersetzungen b
+        WHERE a.artikel_id = b.artikel_id
+          AND a.sprache = b.sprache
+          AND a.id < b.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_artikel_uebersetzungen_artikel_sprache",
+        "artikel_uebersetzungen",
+        ["artikel_id", "sprache"],
+        schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "uq_artikel_uebersetzungen_artikel_sprache",
+        "artikel_uebersetzungen",
+        type_="unique",
+        schema="clnpth",
+    )
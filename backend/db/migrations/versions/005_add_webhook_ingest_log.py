@@ -0,0 +1,42 @@
+"""add webhook ingest log and last_step for ordered, idempotent callbacks
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("redaktions_log", sa.Column("last_step", sa.Integer(), nullable=True), schema="clnpth")
+    op.create_table(
+        "webhook_ingest_log",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("artikel_id", sa.Integer(), nullable=False),
+        sa.Column("idempotency_key", sa.String(128), nullable=True, unique=True),
+        sa.Column("step", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(50), nullable=True),
+        sa.Column("ergebnis", sa.String(20), nullable=False, server_default="applied"),
+        sa.Column("empfangen_am", sa.DateTime(), server_default=sa.func.now()),
+        schema="clnpth",
+    )
+    op.create_index(
+        "ix_webhook_ingest_log_artikel_id",
+        "webhook_ingest_log",
+        ["artikel_id"],
+        schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_ingest_log_artikel_id", table_name="webhook_ingest_log", schema="clnpth")
+    op.drop_table("webhook_ingest_log", schema="clnpth")
+    op.drop_column("redaktions_log", "last_step", schema="clnpth")
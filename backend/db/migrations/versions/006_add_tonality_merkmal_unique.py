@@ -0,0 +1,56 @@
+"""add unique constraint on tonality_profil.merkmal for set-based upserts
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Merge duplicate traits into the newest row before enforcing uniqueness
+    op.execute(
+        """
+        WITH agg AS (
+            SELECT merkmal, max(id) AS keep_id,
+                   sum(coalesce(belege, 0)) AS belege, max(gewichtung) AS gewichtung
+            FROM clnpth.tonality_profil
+            GROUP BY merkmal
+            HAVING count(*) > 1
+        )
+        UPDATE clnpth.tonality_profil t
+        SET belege = agg.belege, gewichtung = agg.gewichtung
+        FROM agg
+        WHERE t.id = agg.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM clnpth.tonality_profil a
+        USING clnpth.tonality_profil b
+        WHERE a.merkmal = b.merkmal
+          AND a.id < b.id
+        """
+    )
+    op.create_unique_constraint(
+        "tonality_profil_merkmal_key",
+        "tonality_profil",
+        ["merkmal"],
+        schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "tonality_profil_merkmal_key",
+        "tonality_profil",
+        type_="unique",
+        schema="clnpth",
+    )
@@ -0,0 +1,34 @@
+"""add eval_hash to supervisor_log for evaluation result caching
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "supervisor_log",
+        sa.Column("eval_hash", sa.String(64), nullable=True),
+        schema="clnpth",
+    )
+    op.create_index(
+        "ix_supervisor_log_eval_hash",
+        "supervisor_log",
+        ["eval_hash"],
+        schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_supervisor_log_eval_hash", table_name="supervisor_log", schema="clnpth")
+    op.drop_column("supervisor_log", "eval_hash", schema="clnpth")
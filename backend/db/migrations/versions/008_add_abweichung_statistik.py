@@ -0,0 +1,44 @@
+"""add abweichung_statistik for incrementally maintained deviation counters
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "abweichung_statistik",
+        sa.Column("kategorie", sa.String(100), primary_key=True),
+        sa.Column("woche", sa.Date(), primary_key=True),
+        sa.Column("entscheidungen", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("abweichungen", sa.Integer(), nullable=False, server_default="0"),
+        schema="clnpth",
+    )
+    # Backfill from existing supervisor decisions
+    op.execute(
+        """
+        INSERT INTO clnpth.abweichung_statistik (kategorie, woche, entscheidungen, abweichungen)
+        SELECT coalesce(r.kategorie, ''),
+               date_trunc('week', coalesce(s.erstellt_am, now()))::date,
+               count(*) FILTER (WHERE s.redakteur_entscheidung IS NOT NULL),
+               count(*) FILTER (WHERE s.abweichung)
+        FROM clnpth.supervisor_log s
+        LEFT JOIN clnpth.redaktions_log r ON r.id = s.artikel_id
+        WHERE s.redakteur_entscheidung IS NOT NULL OR s.abweichung
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("abweichung_statistik", schema="clnpth")
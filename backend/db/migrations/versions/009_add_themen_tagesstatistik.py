@@ -0,0 +1,64 @@
+"""add themen_tagesstatistik daily rollup for windowed topic rankings
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "themen_tagesstatistik",
+        sa.Column("kategorie", sa.String(100), primary_key=True),
+        sa.Column("tag", sa.Date(), primary_key=True),
+        sa.Column("erstellt", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("freigegeben", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("abgelehnt", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("score_summe", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("score_anzahl", sa.Integer(), nullable=False, server_default="0"),
+        schema="clnpth",
+    )
+    # Backfill: articles by creation day
+    op.execute(
+        """
+        INSERT INTO clnpth.themen_tagesstatistik (kategorie, tag, erstellt)
+        SELECT coalesce(kategorie, ''), erstellt_am::date, count(*)
+        FROM clnpth.redaktions_log
+        WHERE erstellt_am IS NOT NULL
+        GROUP BY 1, 2
+        """
+    )
+    # Backfill: decisions by evaluation day (the decision time was not stored)
+    op.execute(
+        """
+        INSERT INTO clnpth.themen_tagesstatistik
+            (kategorie, tag, freigegeben, abgelehnt, score_summe, score_anzahl)
+        SELECT coalesce(r.kategorie, ''), s.erstellt_am::date,
+               count(*) FILTER (WHERE s.redakteur_entscheidung = 'freigeben'),
+               count(*) FILTER (WHERE s.redakteur_entscheidung <> 'freigeben'),
+               coalesce(sum(s.supervisor_score), 0),
+               count(s.supervisor_score)
+        FROM clnpth.supervisor_log s
+        LEFT JOIN clnpth.redaktions_log r ON r.id = s.artikel_id
+        WHERE s.redakteur_entscheidung IS NOT NULL AND s.erstellt_am IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (kategorie, tag) DO UPDATE SET
+            freigegeben = EXCLUDED.freigegeben,
+            abgelehnt = EXCLUDED.abgelehnt,
+            score_summe = EXCLUDED.score_summe,
+            score_anzahl = EXCLUDED.score_anzahl
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("themen_tagesstatistik", schema="clnpth")
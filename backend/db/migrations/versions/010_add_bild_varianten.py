@@ -0,0 +1,24 @@
+"""add bild_varianten manifest for image derivatives
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("artikel_archiv", sa.Column("bild_varianten", JSONB(), nullable=True), schema="clnpth")
+
+
+def downgrade() -> None:
+    op.drop_column("artikel_archiv", "bild_varianten", schema="clnpth")
@@ -0,0 +1,50 @@
+"""add image_jobs for persistent image generation status
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "image_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("artikel_id", sa.Integer(), sa.ForeignKey("clnpth.redaktions_log.id"), nullable=False),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("image_type", sa.String(50), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="queued"),
+        sa.Column("backend", sa.String(255), nullable=True),
+        sa.Column("remote_job_id", sa.String(128), nullable=True),
+        sa.Column("remote_output", sa.String(50), nullable=True),
+        sa.Column("progress", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("bild_url", sa.Text(), nullable=True),
+        sa.Column("erstellt_am", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("gestartet_am", sa.DateTime(), nullable=True),
+        sa.Column("beendet_am", sa.DateTime(), nullable=True),
+        sa.Column("aktualisiert_am", sa.DateTime(), server_default=sa.func.now()),
+        schema="clnpth",
+    )
+    op.create_index(
+        "ix_image_jobs_artikel_id_id", "image_jobs", ["artikel_id", "id"], schema="clnpth",
+    )
+    op.create_index(
+        "ix_image_jobs_status_aktualisiert_am", "image_jobs", ["status", "aktualisiert_am"], schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_image_jobs_status_aktualisiert_am", table_name="image_jobs", schema="clnpth")
+    op.drop_index("ix_image_jobs_artikel_id_id", table_name="image_jobs", schema="clnpth")
+    op.drop_table("image_jobs", schema="clnpth")
@@ -0,0 +1,27 @@
+"""index webhook_ingest_log.empfangen_am for age-based pruning
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_webhook_ingest_log_empfangen_am",
+        "webhook_ingest_log",
+        ["empfangen_am"],
+        schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_ingest_log_empfangen_am", table_name="webhook_ingest_log", schema="clnpth")
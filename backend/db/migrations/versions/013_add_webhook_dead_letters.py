@@ -0,0 +1,31 @@
+"""add webhook_dead_letters for callbacks the write-behind queue could not apply
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_dead_letters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("artikel_id", sa.Integer(), nullable=False),
+        sa.Column("payload", JSONB(), nullable=False),
+        sa.Column("erstellt_am", sa.DateTime(), server_default=sa.func.now()),
+        schema="clnpth",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("webhook_dead_letters", schema="clnpth")
@@ -1,7 +1,7 @@
 from datetime import datetime
 from sqlalchemy import (
     Column, Integer, String, Text, Float, Boolean,
-    DateTime, ForeignKey, Index
+    Date, DateTime, ForeignKey, Index, UniqueConstraint
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, relationship
@@ -28,6 +28,7 @@ class RedaktionsLog(Base):
     max_retries = Column(Integer, default=3)
     last_error = Column(Text)
     timeout_at = Column(DateTime)
+    last_step = Column(Integer)  # highest n8n step applied in the current pipeline run
     erstellt_am = Column(DateTime, default=datetime.utcnow)
     aktualisiert_am = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -49,6 +50,7 @@ class ArtikelArchiv(Base):
     seo_titel = Column(String(60))
     seo_description = Column(String(160))
     bild_url = Column(Text)
+    bild_varianten = Column(JSONB)  # derivative manifest, see services/image_derivatives
     bild_prompt = Column(Text)
     bild_alt_texte = Column(JSONB)  # {de: "...", en: "...", ...}
     embedding = Column(Vector(1024))  # mistral-embed dimension
@@ -60,7 +62,10 @@ class ArtikelArchiv(Base):
 
 class ArtikelUebersetzung(Base):
     __tablename__ = "artikel_uebersetzungen"
-    __table_args__ = {"schema": "clnpth"}
+    __table_args__ = (
+        UniqueConstraint("artikel_id", "sprache", name="uq_artikel_uebersetzungen_artikel_sprache"),
+        {"schema": "clnpth"},
+    )
 
     id = Column(Integer, primary_key=True)
     artikel_id = Column(Integer, ForeignKey("clnpth.redaktions_log.id"))
@@ -88,6 +93,7 @@ class SupervisorLog(Base):
     redakteur_entscheidung = Column(String(50))
     redakteur_feedback = Column(Text)
     abweichung = Column(Boolean, default=False)
+    eval_hash = Column(String(64), index=True)  # evaluation input hash, see services/evaluation_cache
     erstellt_am = Column(DateTime, default=datetime.utcnow)
 
     artikel = relationship("RedaktionsLog", back_populates="supervisor_logs")
@@ -98,7 +104,7 @@ class TonalityProfil(Base):
     __table_args__ = {"schema": "clnpth"}
 
     id = Column(Integer, primary_key=True)
-    merkmal = Column(Text, nullable=False)
+    merkmal = Column(Text, nullable=False, unique=True)
     wert = Column(Text)
     gewichtung = Column(Float, default=0.5)
     belege = Column(Integer, default=0)
@@ -117,6 +123,39 @@ class ThemenRanking(Base):
     letzter_artikel = Column(DateTime)
 
 
+class ThemenTagesStatistik(Base):
+    """Daily per-kategorie rollup for windowed topic rankings.
+
+    Incremented on article creation and editor decisions
+    (learning_strategy.update_daily_rollup); averages are sum/count.
+    """
+    __tablename__ = "themen_tagesstatistik"
+    __table_args__ = {"schema": "clnpth"}
+
+    kategorie = Column(String(100), primary_key=True)  # "" = ohne Kategorie
+    tag = Column(Date, primary_key=True)
+    erstellt = Column(Integer, nullable=False, default=0)
+    freigegeben = Column(Integer, nullable=False, default=0)
+    abgelehnt = Column(Integer, nullable=False, default=0)  # ueberarbeiten / ablehnen
+    score_summe = Column(Integer, nullable=False, default=0)
+    score_anzahl = Column(Integer, nullable=False, default=0)
+
+
+class AbweichungsStatistik(Base):
+    """Running decision/deviation counters per kategorie and week.
+
+    Maintained by learning_strategy.record_editor_decision, so dashboard
+    statistics and trends never scan supervisor_log.
+    """
+    __tablename__ = "abweichung_statistik"
+    __table_args__ = {"schema": "clnpth"}
+
+    kategorie = Column(String(100), primary_key=True)  # "" = ohne Kategorie
+    woche = Column(Date, primary_key=True)  # Monday of the evaluation's week
+    entscheidungen = Column(Integer, nullable=False, default=0)
+    abweichungen = Column(Integer, nullable=False, default=0)
+
+
 class SocialSnippet(Base):
     __tablename__ = "social_snippets"
     __table_args__ = {"schema": "clnpth"}
@@ -129,3 +168,58 @@ class SocialSnippet(Base):
     erstellt_am = Column(DateTime, default=datetime.utcnow)
 
     artikel = relationship("RedaktionsLog")
+
+
+class WebhookIngestLog(Base):
+    __tablename__ = "webhook_ingest_log"
+    __table_args__ = {"schema": "clnpth"}
+
+    id = Column(Integer, primary_key=True)
+    artikel_id = Column(Integer, nullable=False, index=True)  # no FK: unknown ids are logged too
+    idempotency_key = Column(String(128), unique=True)
+    step = Column(Integer)
+    status = Column(String(50))
+    ergebnis = Column(String(20), nullable=False, default="applied")  # applied, stale
+    empfangen_am = Column(DateTime, default=datetime.utcnow, index=True)  # pruned by the watchdog
+
+
+class WebhookDeadLetter(Base):
+    """n8n callback that failed twice in the write-behind queue, kept for replay."""
+    __tablename__ = "webhook_dead_letters"
+    __table_args__ = {"schema": "clnpth"}
+
+    id = Column(Integer, primary_key=True)
+    artikel_id = Column(Integer, nullable=False)
+    payload = Column(JSONB, nullable=False)  # N8nCallback as JSON
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+
+
+class ImageJob(Base):
+    """One image generation request and its progress on a GPU backend.
+
+    Written by services/image_pipeline; status reads and the resume loop
+    never query ComfyUI or RunPod.
+    """
+    __tablename__ = "image_jobs"
+    __table_args__ = (
+        Index("ix_image_jobs_artikel_id_id", "artikel_id", "id"),
+        Index("ix_image_jobs_status_aktualisiert_am", "status", "aktualisiert_am"),
+        {"schema": "clnpth"},
+    )
+
+    id = Column(Integer, primary_key=True)
+    artikel_id = Column(Integer, ForeignKey("clnpth.redaktions_log.id"), nullable=False)
+    prompt = Column(Text, nullable=False)
+    image_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, generating, ready, failed
+    backend = Column(String(255))  # ComfyUI instance URL or "runpod"
+    remote_job_id = Column(String(128))  # ComfyUI prompt_id or RunPod job id
+    remote_output = Column(String(50))  # SaveImage node id of this job in the remote workflow
+    progress = Column(Integer, nullable=False, default=0)  # percent
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    bild_url = Column(Text)
+    erstellt_am = Column(DateTime, default=datetime.utcnow)
+    gestartet_am = Column(DateTime)
+    beendet_am = Column(DateTime)
+    aktualisiert_am = Column(DateTime, default=datetime.utcnow)  # heartbeat while running
@@ -0,0 +1,74 @@
+"""Cached statements for hot lookup paths.
+
+Each helper returns a `lambda_stmt`: SQLAlchemy builds and compiles the
+statement once per call site and afterwards only extracts the bound
+parameters from the closure, so per-request Python work is a cache lookup.
+Combined with asyncpg's prepared statement cache (see
+`db_prepared_statement_cache_size`), the server also skips re-parsing.
+"""
+
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung, ImageJob
+
+_latest_job = aliased(ImageJob)
+
+
+def article_by_id(article_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(RedaktionsLog).where(RedaktionsLog.id == article_id))
+
+
+def article_with_archive(article_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(RedaktionsLog)
+        .where(RedaktionsLog.id == article_id)
+        .options(joinedload(RedaktionsLog.archiv_eintrag))
+    )
+
+
+def archive_by_article(article_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
+    )
+
+
+def translations_by_article(article_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(ArtikelUebersetzung)
+        .where(ArtikelUebersetzung.artikel_id == article_id)
+        .order_by(ArtikelUebersetzung.sprache)
+    )
+
+
+def translation_by_lang(article_id: int, lang: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(ArtikelUebersetzung).where(
+            ArtikelUebersetzung.artikel_id == article_id,
+            ArtikelUebersetzung.sprache == lang,
+        )
+    )
+
+
+def article_status(article_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(RedaktionsLog.status).where(RedaktionsLog.id == article_id)
+    )
+
+
+def image_status(article_id: int) -> StatementLambdaElement:
+    """Archive image columns with the article's latest image job (if any), in one query."""
+    return lambda_stmt(
+        lambda: select(
+            ArtikelArchiv.bild_url, ArtikelArchiv.bild_varianten, ArtikelArchiv.bild_prompt, ImageJob,
+        )
+        .outerjoin(
+            ImageJob,
+            ImageJob.id == select(func.max(_latest_job.id))
+            .where(_latest_job.artikel_id == ArtikelArchiv.redaktions_log_id)
+            .correlate(ArtikelArchiv)
+            .scalar_subquery(),
+        )
+        .where(ArtikelArchiv.redaktions_log_id == article_id)
+    )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # ── Request schemas ──────────────────────────────────────────
@@ -35,6 +35,8 @@ class SupervisorUpdate(BaseModel):
 class N8nCallback(BaseModel):
     artikel_id: int
     status: str
+    step: int | None = None  # pipeline step sequence; lower than the last applied step = stale
+    idempotency_key: str | None = Field(default=None, max_length=128)
     titel: str | None = None
     lead: str | None = None
     body: str | None = None
@@ -103,6 +105,7 @@ class ArticleDetail(BaseModel):
     seo_titel: str | None = None
     seo_description: str | None = None
     bild_url: str | None = None
+    bild_varianten: dict | None = None
     bild_prompt: str | None = None
     translations: list[TranslationResponse] = []
     supervisor: SupervisorResponse | None = None
@@ -1,28 +1,77 @@
 from collections.abc import AsyncGenerator
 
-from sqlalchemy import event, text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from config import settings
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    pool_size=5,
-    max_overflow=10,
-    connect_args={"ssl": "disable"},
-)
-
 
 # Set search_path on every new connection so clnpth tables + pgvector types are found
-@event.listens_for(engine.sync_engine, "connect")
 def set_search_path(dbapi_conn, connection_record):
     cursor = dbapi_conn.cursor()
     cursor.execute(f"SET search_path TO {settings.db_schema}, public")
     cursor.close()
 
 
+def _connect_args() -> dict:
+    args: dict = {
+        "ssl": settings.db_ssl,
+        "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+    }
+    if settings.db_statement_timeout_ms:
+        args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+    return args
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """Create an engine with the shared pool tuning from Settings."""
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+        query_cache_size=settings.db_query_cache_size,
+        connect_args=_connect_args(),
+    )
+    event.listen(new_engine.sync_engine, "connect", set_search_path)
+    return new_engine
+
+
+# Interactive API requests
+engine = _create_engine(settings.database_url, settings.db_pool_size, settings.db_max_overflow)
+
+# Watchdog, webhook queue and background pipelines — own pool, so long jobs
+# cannot starve API requests of connections
+background_engine = _create_engine(
+    settings.database_url,
+    settings.db_background_pool_size,
+    settings.db_background_max_overflow,
+)
+
+# Optional read replica for read-only GET endpoints
+read_engine = (
+    _create_engine(settings.database_read_url, settings.db_pool_size, settings.db_max_overflow)
+    if settings.database_read_url
+    else None
+)
+
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+background_session = async_sessionmaker(background_engine, class_=AsyncSession, expire_on_commit=False)
+read_session = (
+    async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    if read_engine is not None
+    else None
+)
+
+
+async def dispose_engines() -> None:
+    for e in (engine, background_engine, read_engine):
+        if e is not None:
+            await e.dispose()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -33,3 +82,16 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         except Exception:
             await session.rollback()
             raise
+
+
+async def get_read_db(db: AsyncSession = Depends(get_db)) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only endpoints; routed to the read replica when configured.
+
+    Without a replica this is the regular request session (which only checks
+    out a connection once it is used).
+    """
+    if read_session is None:
+        yield db
+        return
+    async with read_session() as session:
+        yield session
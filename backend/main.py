@@ -1,3 +1,5 @@
+import logging
+import tempfile
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -7,7 +9,7 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from config import settings
-from db.session import engine
+from db.session import background_session, dispose_engines
 from routes.articles import router as articles_router
 from routes.images import router as images_router
 from routes.translations import router as translations_router
@@ -18,15 +20,50 @@ from routes.social import router as social_router
 from routes.rss import router as rss_router
 from ws import manager
 
+logger = logging.getLogger(__name__)
+
+
+def ws_lock_path() -> Path:
+    """Lock file that keeps a second worker from starting (see ConnectionManager.claim)."""
+    if settings.ws_replay_state_path:
+        return Path(settings.ws_replay_state_path + ".lock")
+    return Path(tempfile.gettempdir()) / "clnpth-ws.lock"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     import asyncio
+    from contextlib import suppress
+    from services import image_derivatives
+    from services.backend_health import monitor_loop
+    from services.image_pipeline import resume_loop
     from services.queue_watchdog import watchdog_loop
+    from services.webhook_ingest import webhook_queue
+    manager.claim(ws_lock_path())
+    if settings.ws_replay_state_path:
+        manager.load(Path(settings.ws_replay_state_path))
+    try:
+        await webhook_queue.replay_dead_letters(background_session)
+    except Exception:
+        logger.exception("Replaying webhook dead letters failed")
     watchdog_task = asyncio.create_task(watchdog_loop())
+    webhook_task = asyncio.create_task(webhook_queue.run(background_session))
+    health_task = asyncio.create_task(monitor_loop())
+    image_jobs_task = asyncio.create_task(resume_loop(background_session))
     yield
     watchdog_task.cancel()
-    await engine.dispose()
+    health_task.cancel()
+    image_jobs_task.cancel()
+    webhook_task.cancel()
+    # Let the consumer finish the batch it already took off the queue
+    with suppress(asyncio.CancelledError):
+        await webhook_task
+    await webhook_queue.drain(background_session)
+    await webhook_queue.save_dead_letters(background_session)
+    if settings.ws_replay_state_path:
+        manager.save(Path(settings.ws_replay_state_path))
+    image_derivatives.shutdown()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -77,17 +114,22 @@ if _frontend_dir.exists():
 @app.get("/api/health")
 async def health():
     from services.feature_flags import get_active_features
+    from services.webhook_ingest import webhook_queue
     return {
         "status": "ok",
         "version": "0.1.0",
         "ws_connections": manager.count,
+        "ws_seq": manager.seq,
+        "webhook_queue": webhook_queue.depth,
+        "webhook_dead_letters_unsaved": len(webhook_queue.dead_letters),
         "features": get_active_features(),
     }
 
 
 @app.websocket("/ws/status")
-async def websocket_status(ws: WebSocket):
-    await manager.connect(ws)
+async def websocket_status(ws: WebSocket, since: int | None = None):
+    """Live status stream. Reconnecting clients pass ?since=<last seq> to resume."""
+    await manager.connect(ws, since=since)
     try:
         while True:
             # Keep connection alive, receive pings
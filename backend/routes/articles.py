@@ -6,9 +6,10 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung, SupervisorLog
-from db.session import get_db
-from services.learning_strategy import process_editor_decision
+from db import queries
+from db.models import RedaktionsLog
+from db.session import get_db, get_read_db
+from services.learning_strategy import process_editor_decision, update_daily_rollup
 from db.schemas import (
     ArticleCreate, ArticleApprove, ArticleRevise,
     ArticleListItem, ArticleDetail, TranslationResponse,
@@ -66,6 +67,7 @@ async def create_article(article: ArticleCreate, db: AsyncSession = Depends(get_
     )
     db.add(row)
     await db.flush()
+    await update_daily_rollup(db, row.kategorie, erstellt=1)
 
     # Trigger n8n pipeline (non-blocking — failure is OK)
     await trigger_article_generation(
@@ -91,7 +93,7 @@ async def list_articles(
     status: str | None = None,
     limit: int = 50,
     offset: int = 0,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     q = select(RedaktionsLog).order_by(RedaktionsLog.erstellt_am.desc())
     if status:
@@ -102,7 +104,7 @@ async def list_articles(
 
 
 @router.get("/stats", response_model=QueueStats)
-async def queue_stats(db: AsyncSession = Depends(get_db)):
+async def queue_stats(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(
         select(RedaktionsLog.status, func.count(RedaktionsLog.id))
         .group_by(RedaktionsLog.status)
@@ -155,6 +157,7 @@ async def get_article(article_id: int, db: AsyncSession = Depends(get_db)):
         seo_titel=archiv.seo_titel if archiv else None,
         seo_description=archiv.seo_description if archiv else None,
         bild_url=archiv.bild_url if archiv else None,
+        bild_varianten=archiv.bild_varianten if archiv else None,
         bild_prompt=archiv.bild_prompt if archiv else None,
         translations=[
             TranslationResponse.model_validate(t) for t in row.uebersetzungen
@@ -169,9 +172,7 @@ async def approve_article(
     body: ArticleApprove,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == article_id)
-    )
+    result = await db.execute(queries.article_with_archive(article_id))
     row = result.scalar_one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
@@ -182,13 +183,12 @@ async def approve_article(
     row.aktualisiert_am = datetime.utcnow()
 
     # Update learning systems (tonality profile, topic ranking, deviation tracking)
-    await process_editor_decision(db, article_id, "freigeben", body.feedback)
-
-    # Generate embedding for approved article
-    archiv_result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
+    await process_editor_decision(
+        db, article_id, "freigeben", body.feedback, kategorie=row.kategorie,
     )
-    archiv = archiv_result.scalar_one_or_none()
+
+    # Generate embedding for approved article (archive came with the article query)
+    archiv = row.archiv_eintrag
     if archiv and not archiv.embedding:
         from services.embedding_client import generate_embedding, build_article_text
         text = build_article_text(row.titel, archiv.lead, archiv.body)
@@ -209,18 +209,19 @@ async def revise_article(
     body: ArticleRevise,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == article_id)
-    )
+    result = await db.execute(queries.article_by_id(article_id))
     row = result.scalar_one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
 
     row.status = "generating"
+    row.last_step = None  # new n8n run starts its step sequence again
     row.aktualisiert_am = datetime.utcnow()
 
     # Update learning systems
-    await process_editor_decision(db, article_id, "ueberarbeiten", body.feedback)
+    await process_editor_decision(
+        db, article_id, "ueberarbeiten", body.feedback, kategorie=row.kategorie,
+    )
 
     # Re-trigger n8n with feedback
     await trigger_article_generation(
@@ -242,9 +243,7 @@ async def revise_article(
 
 @router.patch("/{article_id}/cancel", response_model=ArticleListItem)
 async def cancel_article(article_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == article_id)
-    )
+    result = await db.execute(queries.article_by_id(article_id))
     row = result.scalar_one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
@@ -260,9 +259,7 @@ async def cancel_article(article_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.patch("/{article_id}/retry", response_model=ArticleListItem)
 async def retry_article(article_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == article_id)
-    )
+    result = await db.execute(queries.article_by_id(article_id))
     row = result.scalar_one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
@@ -270,6 +267,7 @@ async def retry_article(article_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Artikel im Status '{row.status}' kann nicht wiederholt werden")
 
     row.status = "generating"
+    row.last_step = None
     row.retry_count = 0
     row.last_error = None
     row.timeout_at = datetime.utcnow() + timedelta(minutes=10)
@@ -298,9 +296,7 @@ async def related_articles(
     limit: int = 5,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
-    )
+    result = await db.execute(queries.archive_by_article(article_id))
     archiv = result.scalar_one_or_none()
     if not archiv or archiv.embedding is None:
         raise HTTPException(status_code=400, detail="Artikel hat kein Embedding")
@@ -383,5 +379,8 @@ async def bulk_create_articles(
         )
         articles.append(row)
 
+    if articles:
+        await update_daily_rollup(db, payload.kategorie, erstellt=len(articles))
+
     await manager.broadcast("articles:bulk_created", {"count": len(articles)})
     return BulkArticleResponse(created=len(articles), articles=articles)
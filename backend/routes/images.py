@@ -1,14 +1,15 @@
+from datetime import datetime
+
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import FileResponse
 from pathlib import Path
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from db.models import ArtikelArchiv
-from db.session import get_db, async_session
-from services import comfyui_client, runpod_client
+from db import queries
+from db.session import get_db, background_session
+from services import backend_health, image_jobs
 from services.image_pipeline import run_image_pipeline
 
 router = APIRouter(prefix="/api/articles/{article_id}/image", tags=["images"])
@@ -22,8 +23,16 @@ class ImageTrigger(BaseModel):
 class ImageStatus(BaseModel):
     artikel_id: int
     bild_url: str | None
+    bild_varianten: dict | None = None
     bild_prompt: str | None
-    status: str  # pending, generating, ready, failed
+    status: str  # pending, queued, generating, ready, failed
+    job_id: int | None = None
+    backend: str | None = None
+    progress: int = 0
+    error: str | None = None
+    gestartet_am: datetime | None = None
+    beendet_am: datetime | None = None
+    aktualisiert_am: datetime | None = None
 
 
 @router.post("/trigger")
@@ -34,9 +43,7 @@ async def trigger_image_generation(
     db: AsyncSession = Depends(get_db),
 ):
     """Trigger image generation for an article."""
-    result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
-    )
+    result = await db.execute(queries.archive_by_article(article_id))
     archiv = result.scalar_one_or_none()
     if not archiv:
         raise HTTPException(status_code=404, detail="Artikel-Archiv nicht gefunden")
@@ -47,30 +54,35 @@ async def trigger_image_generation(
     # Save prompt to DB
     archiv.bild_prompt = payload.prompt
     archiv.bild_url = None  # Reset previous image
+    archiv.bild_varianten = None
 
-    # Check availability
-    local_available = await comfyui_client.is_available()
-    runpod_available = await runpod_client.is_configured()
-
-    if not local_available and not runpod_available:
+    # Check availability (cached by the health monitor, no live probe)
+    backend = await backend_health.select_backend()
+    if backend is None:
         raise HTTPException(
             status_code=503,
             detail="Weder lokales ComfyUI noch RunPod verfuegbar"
         )
 
+    # Record the job before the pipeline starts, so it can update and resume it
+    job_id = await image_jobs.create(db, article_id, payload.prompt, payload.image_type)
+    await db.commit()
+
     # Start pipeline in background
     background_tasks.add_task(
         run_image_pipeline,
         artikel_id=article_id,
         prompt=payload.prompt,
         image_type=payload.image_type,
-        session_factory=async_session,
+        session_factory=background_session,
+        job_id=job_id,
     )
 
     return {
         "ok": True,
         "artikel_id": article_id,
-        "backend": "comfyui" if local_available else "runpod",
+        "backend": backend,
+        "job_id": job_id,
     }
 
 
@@ -79,26 +91,39 @@ async def get_image_status(
     article_id: int,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get current image generation status for an article."""
-    result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
-    )
-    archiv = result.scalar_one_or_none()
-    if not archiv:
+    """Get current image generation status for an article.
+
+    Read from the latest image job (one indexed query); the GPU backends are
+    not contacted. Archives without a job report ready/pending from bild_url.
+    """
+    result = await db.execute(queries.image_status(article_id))
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Artikel-Archiv nicht gefunden")
 
-    if archiv.bild_url:
-        status = "ready"
-    elif archiv.bild_prompt:
-        status = "generating"
-    else:
-        status = "pending"
+    job = row.ImageJob
+    if job is None:
+        return ImageStatus(
+            artikel_id=article_id,
+            bild_url=row.bild_url,
+            bild_varianten=row.bild_varianten,
+            bild_prompt=row.bild_prompt,
+            status="ready" if row.bild_url else "pending",
+        )
 
     return ImageStatus(
         artikel_id=article_id,
-        bild_url=archiv.bild_url,
-        bild_prompt=archiv.bild_prompt,
-        status=status,
+        bild_url=row.bild_url,
+        bild_varianten=row.bild_varianten,
+        bild_prompt=row.bild_prompt,
+        status=job.status,
+        job_id=job.id,
+        backend=job.backend,
+        progress=job.progress,
+        error=job.error,
+        gestartet_am=job.gestartet_am,
+        beendet_am=job.beendet_am,
+        aktualisiert_am=job.aktualisiert_am,
     )
 
 
@@ -106,6 +131,7 @@ async def get_image_status(
 async def list_backends():
     """Check which image generation backends are available."""
     return {
-        "comfyui": await comfyui_client.is_available(),
-        "runpod": await runpod_client.is_configured(),
+        "comfyui": await backend_health.is_available("comfyui"),
+        "runpod": await backend_health.is_available("runpod"),
+        "details": backend_health.status(),
     }
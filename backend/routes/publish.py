@@ -1,11 +1,10 @@
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung
-from db.session import get_db, async_session
-from services import wordpress_client
+from db import queries
+from db.session import get_db, background_session
+from services import image_derivatives, wordpress_client
 from ws import manager
 
 router = APIRouter(prefix="/api/articles/{article_id}/publish", tags=["publish"])
@@ -30,16 +29,12 @@ async def publish_to_wordpress(
         raise HTTPException(status_code=503, detail="WordPress nicht erreichbar oder nicht konfiguriert")
 
     # Load article
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == article_id)
-    )
+    result = await db.execute(queries.article_by_id(article_id))
     artikel = result.scalar_one_or_none()
     if not artikel:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
 
-    archiv_result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
-    )
+    archiv_result = await db.execute(queries.archive_by_article(article_id))
     archiv = archiv_result.scalar_one_or_none()
     if not archiv or not archiv.body:
         raise HTTPException(status_code=400, detail="Artikel hat noch keinen Inhalt")
@@ -51,7 +46,7 @@ async def publish_to_wordpress(
         wp_status=options.wp_status,
         languages=options.languages,
         upload_image=options.upload_image,
-        session_factory=async_session,
+        session_factory=background_session,
     )
 
     return {"ok": True, "artikel_id": article_id, "wp_status": options.wp_status}
@@ -64,27 +59,37 @@ async def _publish_pipeline(
     upload_image: bool,
     session_factory,
 ):
-    """Background task: publish article + translations to WordPress."""
+    """Background task: publish article + translations to WordPress.
+
+    The featured image is uploaded first, since every post references its
+    media id; the German post and all translations are then sent as one
+    /batch/v1 request (already published languages are updated in place)
+    and linked as translations of each other. Post ids are written back in
+    one transaction and a single publish:complete event reports the outcome
+    per language.
+    """
     async with session_factory() as db:
         # Load data
-        result = await db.execute(
-            select(RedaktionsLog).where(RedaktionsLog.id == artikel_id)
-        )
+        result = await db.execute(queries.article_by_id(artikel_id))
         artikel = result.scalar_one_or_none()
 
-        archiv_result = await db.execute(
-            select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == artikel_id)
-        )
+        archiv_result = await db.execute(queries.archive_by_article(artikel_id))
         archiv = archiv_result.scalar_one_or_none()
 
         if not artikel or not archiv:
             return
 
+        trans_result = await db.execute(queries.translations_by_article(artikel_id))
+        translations = [
+            trans for trans in trans_result.scalars()
+            if trans.body and (not languages or trans.sprache in languages)
+        ]
+
         # Upload featured image if available
         media_id = None
         if upload_image and archiv.bild_url:
-            # Convert URL path to filesystem path
-            img_path = archiv.bild_url.lstrip("/")
+            # Convert URL path to filesystem path (full-size WebP when available)
+            img_path = image_derivatives.preferred_upload(archiv.bild_url, archiv.bild_varianten).lstrip("/")
             media = await wordpress_client.upload_media(
                 image_path=img_path,
                 alt_text=archiv.titel,
@@ -100,61 +105,46 @@ async def _publish_pipeline(
         if archiv.seo_description:
             seo_meta["_yoast_wpseo_metadesc"] = archiv.seo_description
 
-        # Publish German (main) article
-        wp_post = await wordpress_client.publish_post(
-            title=archiv.titel,
-            content=archiv.body,
-            excerpt=archiv.lead or "",
-            status=wp_status,
-            featured_media=media_id,
-            meta=seo_meta if seo_meta else None,
-            lang="de",
-        )
-
-        if wp_post:
-            archiv.wp_post_id = wp_post["id"]
-            await db.commit()
-
-            await manager.broadcast("article:published", {
-                "artikel_id": artikel_id,
-                "wp_post_id": wp_post["id"],
-                "wp_url": wp_post.get("link"),
-                "lang": "de",
-            })
-
-        # Publish translations
-        trans_result = await db.execute(
-            select(ArtikelUebersetzung).where(
-                ArtikelUebersetzung.artikel_id == artikel_id
-            )
-        )
-        for trans in trans_result.scalars():
-            if languages and trans.sprache not in languages:
-                continue
-            if not trans.body:
-                continue
-
-            wp_trans = await wordpress_client.publish_post(
-                title=trans.titel or archiv.titel,
-                content=trans.body,
-                excerpt=trans.lead or "",
-                status=wp_status,
-                featured_media=media_id,
-                lang=trans.sprache,
+        # German (main) article first in the list, then the translations
+        targets = [("de", archiv, {
+            "title": archiv.titel,
+            "content": archiv.body,
+            "excerpt": archiv.lead or "",
+            "meta": seo_meta if seo_meta else None,
+        })] + [(trans.sprache, trans, {
+            "title": trans.titel or archiv.titel,
+            "content": trans.body,
+            "excerpt": trans.lead or "",
+        }) for trans in translations]
+
+        wp_posts = await wordpress_client.publish_posts([
+            {**fields, "status": wp_status, "featured_media": media_id, "lang": lang, "post_id": row.wp_post_id}
+            for lang, row, fields in targets
+        ])
+
+        results = {}
+        created = False
+        for (lang, row, _), wp_post in zip(targets, wp_posts):
+            # A batch response without a post id counts as failed for that language
+            wp_post_id = wp_post.get("id") if wp_post else None
+            if wp_post_id:
+                created = created or row.wp_post_id != wp_post_id
+                row.wp_post_id = wp_post_id
+                results[lang] = {"ok": True, "wp_post_id": wp_post_id, "wp_url": wp_post.get("link")}
+            else:
+                results[lang] = {"ok": False}
+        await db.commit()
+
+        # New posts only join the translation group once all ids are known
+        if created:
+            await wordpress_client.link_translations(
+                {lang: r["wp_post_id"] for lang, r in results.items() if r["ok"]},
             )
 
-            if wp_trans:
-                trans.wp_post_id = wp_trans["id"]
-                await db.commit()
-
-                await manager.broadcast("article:published", {
-                    "artikel_id": artikel_id,
-                    "wp_post_id": wp_trans["id"],
-                    "lang": trans.sprache,
-                })
-
     await manager.broadcast("publish:complete", {
         "artikel_id": artikel_id,
+        "media_id": media_id,
+        "results": results,
     })
 
 
@@ -164,16 +154,10 @@ async def publish_status(
     db: AsyncSession = Depends(get_db),
 ):
     """Get WordPress publication status for an article."""
-    archiv_result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
-    )
+    archiv_result = await db.execute(queries.archive_by_article(article_id))
     archiv = archiv_result.scalar_one_or_none()
 
-    trans_result = await db.execute(
-        select(ArtikelUebersetzung).where(
-            ArtikelUebersetzung.artikel_id == article_id
-        )
-    )
+    trans_result = await db.execute(queries.translations_by_article(article_id))
 
     publications = {}
     if archiv and archiv.wp_post_id:
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+import uuid
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
-from sqlalchemy import select, func
+from sqlalchemy import insert, select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import (
     SupervisorLog, TonalityProfil, ThemenRanking,
     RedaktionsLog, ArtikelArchiv,
 )
-from db.session import get_db, async_session
+from db.session import get_db, get_read_db, background_session
 from db.schemas import SupervisorResponse
-from services.supervisor_agent import evaluate_article, build_tonality_context
-from services.learning_strategy import process_editor_decision, get_deviation_stats
+from services import dashboard_cache, evaluation_cache, tonality_cache
+from services.supervisor_agent import evaluate_article
+from services.supervisor_batch import run_evaluation_batch
+from services.learning_strategy import (
+    process_editor_decision, get_deviation_stats, get_deviation_trend, get_windowed_ranking,
+)
 from ws import manager
 
 router = APIRouter(prefix="/api/supervisor", tags=["supervisor"])
@@ -20,6 +27,12 @@ class EvaluationTrigger(BaseModel):
     artikel_id: int
 
 
+class EvaluationBatchTrigger(BaseModel):
+    artikel_ids: list[int] = []  # empty = filter: status without any supervisor evaluation
+    status: str = "review"
+    limit: int = 200
+
+
 class TonalityUpdate(BaseModel):
     merkmal: str
     wert: str
@@ -29,73 +42,25 @@ class TonalityUpdate(BaseModel):
 # ── Dashboard data ──
 
 @router.get("/dashboard")
-async def supervisor_dashboard(db: AsyncSession = Depends(get_db)):
-    """Full supervisor dashboard data: profile, stats, recent decisions."""
-    # Tonality profile
-    profile_result = await db.execute(
-        select(TonalityProfil).order_by(TonalityProfil.gewichtung.desc())
-    )
-    profile = [
-        {
-            "id": p.id,
-            "merkmal": p.merkmal,
-            "wert": p.wert,
-            "gewichtung": p.gewichtung,
-            "belege": p.belege,
-        }
-        for p in profile_result.scalars()
-    ]
+async def supervisor_dashboard(request: Request, db: AsyncSession = Depends(get_db)):
+    """Full supervisor dashboard data: profile, stats, recent decisions.
 
-    # Topic ranking
-    ranking_result = await db.execute(
-        select(ThemenRanking).order_by(ThemenRanking.artikel_count.desc()).limit(20)
-    )
-    rankings = [
-        {
-            "id": r.id,
-            "thema": r.thema,
-            "kategorie": r.kategorie,
-            "artikel_count": r.artikel_count,
-            "freigabe_rate": r.freigabe_rate,
-            "letzter_artikel": r.letzter_artikel.isoformat() if r.letzter_artikel else None,
-        }
-        for r in ranking_result.scalars()
-    ]
-
-    # Recent decisions
-    decisions_result = await db.execute(
-        select(SupervisorLog)
-        .order_by(SupervisorLog.erstellt_am.desc())
-        .limit(20)
-    )
-    decisions = []
-    for sv in decisions_result.scalars():
-        decisions.append({
-            "id": sv.id,
-            "artikel_id": sv.artikel_id,
-            "empfehlung": sv.supervisor_empfehlung,
-            "score": sv.supervisor_score,
-            "redakteur_entscheidung": sv.redakteur_entscheidung,
-            "abweichung": sv.abweichung,
-            "erstellt_am": sv.erstellt_am.isoformat() if sv.erstellt_am else None,
-        })
-
-    # Deviation stats
-    dev_stats = await get_deviation_stats(db)
-
-    return {
-        "tonality_profile": profile,
-        "themen_ranking": rankings,
-        "recent_decisions": decisions,
-        "deviation_stats": dev_stats,
-    }
+    Served from the pre-serialized dashboard cache; clients that send the
+    last ETag as If-None-Match get a 304 while nothing changed. Loaded from
+    the primary so replica lag is never cached.
+    """
+    payload = await dashboard_cache.get_dashboard(db)
+    headers = {"ETag": payload.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
 
 
 @router.get("/decisions", response_model=list[SupervisorResponse])
 async def list_decisions(
     limit: int = 50,
     offset: int = 0,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """List supervisor decisions with pagination."""
     result = await db.execute(
@@ -131,15 +96,26 @@ async def trigger_evaluation(
     if not artikel:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
 
-    # Build tonality context from DB
-    profile_result = await db.execute(
-        select(TonalityProfil).order_by(TonalityProfil.gewichtung.desc())
+    # Tonality context from the shared snapshot (no query while it is fresh)
+    tonality_context = (await tonality_cache.get_snapshot(db)).context
+
+    # Unchanged article + profile + prompt: reuse the stored evaluation
+    key = evaluation_cache.cache_key(
+        archiv.titel, archiv.lead or "", archiv.body, artikel.kategorie, tonality_context,
     )
-    profile_entries = [
-        {"merkmal": p.merkmal, "wert": p.wert, "gewichtung": p.gewichtung, "belege": p.belege}
-        for p in profile_result.scalars()
-    ]
-    tonality_context = await build_tonality_context(profile_entries)
+    cached = (await evaluation_cache.lookup(db, [key])).get(key)
+    if cached:
+        await db.execute(insert(SupervisorLog).values(
+            **evaluation_cache.to_row(payload.artikel_id, key, cached)
+        ))
+        dashboard_cache.invalidate_on_commit(db)
+        await manager.broadcast("supervisor:evaluated", {
+            "artikel_id": payload.artikel_id,
+            "score": cached.get("score"),
+            "empfehlung": cached.get("empfehlung"),
+            "cached": True,
+        })
+        return {"ok": True, "artikel_id": payload.artikel_id, "cached": True}
 
     # Run evaluation in background
     async def _evaluate():
@@ -151,16 +127,12 @@ async def trigger_evaluation(
             tonality_profile=tonality_context,
         )
         if result:
-            async with async_session() as session:
-                sv = SupervisorLog(
-                    artikel_id=payload.artikel_id,
-                    supervisor_empfehlung=result.get("empfehlung"),
-                    supervisor_begruendung=result.get("begruendung"),
-                    supervisor_score=result.get("score"),
-                    tonality_tags=result.get("tonality_tags"),
-                )
-                session.add(sv)
+            async with background_session() as session:
+                await session.execute(insert(SupervisorLog).values(
+                    **evaluation_cache.to_row(payload.artikel_id, key, result)
+                ))
                 await session.commit()
+            dashboard_cache.invalidate()
 
             await manager.broadcast("supervisor:evaluated", {
                 "artikel_id": payload.artikel_id,
@@ -173,24 +145,71 @@ async def trigger_evaluation(
     return {"ok": True, "artikel_id": payload.artikel_id}
 
 
+@router.post("/evaluate/batch")
+async def trigger_batch_evaluation(
+    payload: EvaluationBatchTrigger,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
+    """Evaluate many articles at once (explicit ids or all unevaluated in a status).
+
+    Archives are loaded in one query; progress is broadcast as
+    supervisor:batch_progress / supervisor:batch_complete counters.
+    """
+    if len(payload.artikel_ids) > 500 or not 0 < payload.limit <= 500:
+        raise HTTPException(status_code=400, detail="Maximal 500 Artikel pro Batch")
+
+    q = (
+        select(
+            ArtikelArchiv.redaktions_log_id.label("artikel_id"),
+            ArtikelArchiv.titel,
+            ArtikelArchiv.lead,
+            ArtikelArchiv.body,
+            RedaktionsLog.kategorie,
+        )
+        .join(RedaktionsLog, RedaktionsLog.id == ArtikelArchiv.redaktions_log_id)
+        .where(ArtikelArchiv.body.isnot(None), ArtikelArchiv.body != "")
+    )
+    if payload.artikel_ids:
+        q = q.where(ArtikelArchiv.redaktions_log_id.in_(payload.artikel_ids))
+    else:
+        q = (
+            q.where(
+                RedaktionsLog.status == payload.status,
+                ~select(SupervisorLog.id)
+                .where(SupervisorLog.artikel_id == RedaktionsLog.id)
+                .exists(),
+            )
+            .order_by(RedaktionsLog.erstellt_am)
+            .limit(payload.limit)
+        )
+    result = await db.execute(q)
+    items = [dict(row._mapping) for row in result]
+
+    found = {item["artikel_id"] for item in items}
+    skipped = [i for i in payload.artikel_ids if i not in found]
+    if not items:
+        return {"ok": True, "batch_id": None, "queued": 0, "skipped": skipped}
+
+    tonality_context = (await tonality_cache.get_snapshot(db)).context
+    batch_id = uuid.uuid4().hex[:8]
+    background_tasks.add_task(
+        run_evaluation_batch,
+        batch_id=batch_id,
+        items=items,
+        tonality_context=tonality_context,
+        session_factory=background_session,
+    )
+
+    return {"ok": True, "batch_id": batch_id, "queued": len(items), "skipped": skipped}
+
+
 # ── Tonality profile management ──
 
 @router.get("/tonality")
 async def get_tonality_profile(db: AsyncSession = Depends(get_db)):
     """Get the current tonality profile."""
-    result = await db.execute(
-        select(TonalityProfil).order_by(TonalityProfil.gewichtung.desc())
-    )
-    return [
-        {
-            "id": p.id,
-            "merkmal": p.merkmal,
-            "wert": p.wert,
-            "gewichtung": p.gewichtung,
-            "belege": p.belege,
-        }
-        for p in result.scalars()
-    ]
+    return (await tonality_cache.get_snapshot(db)).entries
 
 
 @router.post("/tonality")
@@ -199,22 +218,20 @@ async def add_tonality_entry(
     db: AsyncSession = Depends(get_db),
 ):
     """Manually add or update a tonality profile entry."""
-    result = await db.execute(
-        select(TonalityProfil).where(TonalityProfil.merkmal == payload.merkmal)
+    stmt = pg_insert(TonalityProfil).values(
+        merkmal=payload.merkmal,
+        wert=payload.wert,
+        gewichtung=payload.gewichtung,
+        belege=0,
     )
-    entry = result.scalar_one_or_none()
-
-    if entry:
-        entry.wert = payload.wert
-        entry.gewichtung = payload.gewichtung
-    else:
-        entry = TonalityProfil(
-            merkmal=payload.merkmal,
-            wert=payload.wert,
-            gewichtung=payload.gewichtung,
-            belege=0,
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TonalityProfil.merkmal],
+            set_={"wert": stmt.excluded.wert, "gewichtung": stmt.excluded.gewichtung},
         )
-        db.add(entry)
+    )
+    tonality_cache.invalidate_on_commit(db)
+    dashboard_cache.invalidate_on_commit(db)
 
     return {"ok": True, "merkmal": payload.merkmal}
 
@@ -233,13 +250,15 @@ async def delete_tonality_entry(
         raise HTTPException(status_code=404, detail="Eintrag nicht gefunden")
 
     await db.delete(entry)
+    tonality_cache.invalidate_on_commit(db)
+    dashboard_cache.invalidate_on_commit(db)
     return {"ok": True}
 
 
 # ── Topic ranking ──
 
 @router.get("/topics")
-async def get_topic_ranking(db: AsyncSession = Depends(get_db)):
+async def get_topic_ranking(db: AsyncSession = Depends(get_read_db)):
     """Get topic ranking sorted by article count."""
     result = await db.execute(
         select(ThemenRanking).order_by(ThemenRanking.artikel_count.desc())
@@ -257,9 +276,32 @@ async def get_topic_ranking(db: AsyncSession = Depends(get_db)):
     ]
 
 
+@router.get("/topics/window")
+async def get_windowed_topic_ranking(
+    days: int = 30,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Topic ranking for the last `days` days (max. 365) from the daily rollup."""
+    return await get_windowed_ranking(db, max(1, min(days, 365)), max(1, min(limit, 100)))
+
+
 # ── Deviation stats ──
 
 @router.get("/deviations")
-async def deviation_statistics(db: AsyncSession = Depends(get_db)):
+async def deviation_statistics(
+    kategorie: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get deviation statistics between supervisor and editor decisions."""
-    return await get_deviation_stats(db)
+    return await get_deviation_stats(db, kategorie)
+
+
+@router.get("/deviations/trend")
+async def deviation_trend(
+    weeks: int = 12,
+    kategorie: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Weekly deviation rate series, oldest week first (max. 104 weeks)."""
+    return await get_deviation_trend(db, max(1, min(weeks, 104)), kategorie)
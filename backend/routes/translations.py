@@ -3,11 +3,10 @@ from datetime import datetime
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung
-from db.session import get_db, async_session
+from db import queries
+from db.session import get_db, background_session
 from db.schemas import TranslationResponse
 from services.translation_pipeline import run_translation_pipeline
 from ws import manager
@@ -33,17 +32,13 @@ async def trigger_translations(
     db: AsyncSession = Depends(get_db),
 ):
     """Trigger DeepL + Mistral translation pipeline for specified languages."""
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == article_id)
-    )
+    result = await db.execute(queries.article_by_id(article_id))
     row = result.scalar_one_or_none()
     if not row:
         raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
 
     # Check article has content
-    archiv_result = await db.execute(
-        select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == article_id)
-    )
+    archiv_result = await db.execute(queries.archive_by_article(article_id))
     archiv = archiv_result.scalar_one_or_none()
     if not archiv or not archiv.body:
         raise HTTPException(status_code=400, detail="Artikel hat noch keinen Inhalt")
@@ -64,7 +59,7 @@ async def trigger_translations(
         run_translation_pipeline,
         artikel_id=article_id,
         languages=languages,
-        session_factory=async_session,
+        session_factory=background_session,
     )
 
     return {"ok": True, "artikel_id": article_id, "languages": languages}
@@ -76,11 +71,7 @@ async def list_translations(
     db: AsyncSession = Depends(get_db),
 ):
     """List all translations for an article."""
-    result = await db.execute(
-        select(ArtikelUebersetzung)
-        .where(ArtikelUebersetzung.artikel_id == article_id)
-        .order_by(ArtikelUebersetzung.sprache)
-    )
+    result = await db.execute(queries.translations_by_article(article_id))
     return result.scalars().all()
 
 
@@ -91,12 +82,7 @@ async def get_translation(
     db: AsyncSession = Depends(get_db),
 ):
     """Get a specific translation."""
-    result = await db.execute(
-        select(ArtikelUebersetzung).where(
-            ArtikelUebersetzung.artikel_id == article_id,
-            ArtikelUebersetzung.sprache == lang,
-        )
-    )
+    result = await db.execute(queries.translation_by_lang(article_id, lang))
     trans = result.scalar_one_or_none()
     if not trans:
         raise HTTPException(status_code=404, detail=f"Übersetzung '{lang}' nicht gefunden")
@@ -111,12 +97,7 @@ async def edit_translation(
     db: AsyncSession = Depends(get_db),
 ):
     """Manually edit a translation (reviewer corrections)."""
-    result = await db.execute(
-        select(ArtikelUebersetzung).where(
-            ArtikelUebersetzung.artikel_id == article_id,
-            ArtikelUebersetzung.sprache == lang,
-        )
-    )
+    result = await db.execute(queries.translation_by_lang(article_id, lang))
     trans = result.scalar_one_or_none()
     if not trans:
         raise HTTPException(status_code=404, detail=f"Übersetzung '{lang}' nicht gefunden")
@@ -143,12 +124,7 @@ async def approve_translation(
     db: AsyncSession = Depends(get_db),
 ):
     """Approve a translation without changes."""
-    result = await db.execute(
-        select(ArtikelUebersetzung).where(
-            ArtikelUebersetzung.artikel_id == article_id,
-            ArtikelUebersetzung.sprache == lang,
-        )
-    )
+    result = await db.execute(queries.translation_by_lang(article_id, lang))
     trans = result.scalar_one_or_none()
     if not trans:
         raise HTTPException(status_code=404, detail=f"Übersetzung '{lang}' nicht gefunden")
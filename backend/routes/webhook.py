@@ -1,14 +1,11 @@
-from datetime import datetime
-
 from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlalchemy import select
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung, SupervisorLog
-from db.session import get_db
+from db.session import background_session, get_db
 from db.schemas import N8nCallback
-from ws import manager
+from services.webhook_ingest import apply_callback, broadcast_applied, webhook_queue
 
 router = APIRouter(prefix="/api/webhook", tags=["webhook"])
 
@@ -28,80 +25,32 @@ async def n8n_callback(
     db: AsyncSession = Depends(get_db),
     _token: None = Depends(verify_webhook_token),
 ):
-    """Receives callbacks from n8n after each pipeline step."""
-    result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == payload.artikel_id)
-    )
-    row = result.scalar_one_or_none()
-    if not row:
-        raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
-
-    # Update status
-    row.status = payload.status
-    row.aktualisiert_am = datetime.utcnow()
-
-    # Update title if provided
-    if payload.titel:
-        row.titel = payload.titel
-
-    # Upsert article archive content
-    if payload.body or payload.lead:
-        result = await db.execute(
-            select(ArtikelArchiv).where(ArtikelArchiv.redaktions_log_id == row.id)
+    """Receives callbacks from n8n after each pipeline step.
+
+    With webhook_async_ingest enabled the validated payload is queued and
+    acknowledged with 202; the write-behind consumer applies it in a batch,
+    so bursts no longer hold one pooled connection per request.
+    """
+    if settings.webhook_async_ingest:
+        if not webhook_queue.enqueue(payload):
+            raise HTTPException(status_code=503, detail="Webhook-Puffer voll, bitte erneut senden")
+        return JSONResponse(
+            status_code=202,
+            content={"ok": True, "artikel_id": payload.artikel_id, "queued": True},
         )
-        archiv = result.scalar_one_or_none()
-        if not archiv:
-            archiv = ArtikelArchiv(redaktions_log_id=row.id, titel=row.titel)
-            db.add(archiv)
-        if payload.titel:
-            archiv.titel = payload.titel
-        if payload.lead:
-            archiv.lead = payload.lead
-        if payload.body:
-            archiv.body = payload.body
-        if payload.quellen:
-            archiv.quellen = payload.quellen
-        if payload.seo_titel:
-            archiv.seo_titel = payload.seo_titel
-        if payload.seo_description:
-            archiv.seo_description = payload.seo_description
-        if payload.bild_prompt:
-            archiv.bild_prompt = payload.bild_prompt
 
-    # Upsert translations
-    if payload.translations:
-        for lang, data in payload.translations.items():
-            result = await db.execute(
-                select(ArtikelUebersetzung).where(
-                    ArtikelUebersetzung.artikel_id == row.id,
-                    ArtikelUebersetzung.sprache == lang,
-                )
-            )
-            trans = result.scalar_one_or_none()
-            if not trans:
-                trans = ArtikelUebersetzung(artikel_id=row.id, sprache=lang)
-                db.add(trans)
-            trans.titel = data.get("titel", trans.titel)
-            trans.lead = data.get("lead", trans.lead)
-            trans.body = data.get("body", trans.body)
-            trans.status = data.get("status", trans.status)
+    result = await apply_callback(db, payload)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
 
-    # Upsert supervisor result
-    if payload.supervisor:
-        sv = SupervisorLog(
-            artikel_id=row.id,
-            supervisor_empfehlung=payload.supervisor.get("empfehlung"),
-            supervisor_begruendung=payload.supervisor.get("begruendung"),
-            supervisor_score=payload.supervisor.get("score"),
-            tonality_tags=payload.supervisor.get("tonality_tags"),
-        )
-        db.add(sv)
+    await broadcast_applied(result)
+    result.pop("titel", None)  # only needed for the broadcast
+    return result
 
-    # Broadcast status update via WebSocket
-    await manager.broadcast("article:updated", {
-        "id": row.id,
-        "titel": row.titel,
-        "status": row.status,
-    })
 
-    return {"ok": True, "artikel_id": row.id, "status": row.status}
+@router.post("/n8n/replay")
+async def replay_failed_callbacks(_token: None = Depends(verify_webhook_token)):
+    """Queue callbacks that failed twice in the write-behind consumer again."""
+    queued = await webhook_queue.replay_dead_letters(background_session)
+    remaining = await webhook_queue.count_dead_letters(background_session)
+    return {"ok": True, "queued": queued, "remaining": remaining}
@@ -0,0 +1,193 @@
+"""Cached health and circuit breakers for the image backends.
+
+A background monitor probes every ComfyUI instance of the pool
+periodically (its /queue, which also yields the queue depth), so backend
+selection in request handlers and the image pipeline is a dictionary
+lookup instead of a live HTTP probe. Each
+instance (keyed by URL) and RunPod (key "runpod") also has a circuit
+breaker fed by probes and real job outcomes: after repeated failures it
+opens and the backend is skipped until `image_circuit_reset_timeout` has
+passed, then a single trial job (half-open) decides whether it closes again.
+"""
+
+import asyncio
+import logging
+import time
+
+from config import settings
+from services import comfyui_client, runpod_client
+
+logger = logging.getLogger(__name__)
+
+RUNPOD = "runpod"
+
+
+class CircuitBreaker:
+    """closed → open after `failure_threshold` failures → half-open after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether the backend may be selected (does not reserve the half-open trial)."""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_running)
+
+    def allow(self) -> bool:
+        """Reserve an attempt; in half-open state only one trial runs at a time."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def record_failure(self, trip: bool = False) -> None:
+        """Count a failure; `trip` opens the breaker immediately (backend unreachable)."""
+        self.failures += 1
+        if trip or self._trial_running or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_running = False
+
+
+breakers: dict[str, CircuitBreaker] = {}
+_healthy: dict[str, bool] = {}
+_checked_at: dict[str, float] = {}
+# Queue depth per ComfyUI instance from the last probe, plus jobs dispatched or
+# finished by this process since then
+_queue_depth: dict[str, int] = {}
+
+
+def breaker(key: str) -> CircuitBreaker:
+    if key not in breakers:
+        breakers[key] = CircuitBreaker(
+            settings.image_circuit_failure_threshold, settings.image_circuit_reset_timeout,
+        )
+    return breakers[key]
+
+
+def _usable(key: str) -> bool:
+    return _healthy.get(key, False) and breaker(key).available()
+
+
+async def refresh() -> dict[str, bool]:
+    """Probe all backends once and update cached status and breakers."""
+    urls = comfyui_client.endpoints()
+    *depths, runpod_ok = await asyncio.gather(
+        *(comfyui_client.queue_depth(url) for url in urls), runpod_client.is_configured(),
+    )
+    for url, depth in zip(urls, depths):
+        if depth is not None:
+            _queue_depth[url] = depth
+    results = [depth is not None for depth in depths] + [runpod_ok]
+    now = time.monotonic()
+    for key, ok in zip([*urls, RUNPOD], results):
+        was = _healthy.get(key)
+        _healthy[key] = ok
+        _checked_at[key] = now
+        if key != RUNPOD and not ok:
+            # Unreachable: open at once; recovery goes through a half-open trial job
+            breaker(key).record_failure(trip=True)
+        if was is not None and was != ok:
+            logger.info("Image backend %s is now %s", key, "up" if ok else "down")
+    return dict(_healthy)
+
+
+async def _ensure_checked() -> None:
+    if not _checked_at:
+        await refresh()
+
+
+async def comfyui_candidates() -> list[str]:
+    """Healthy ComfyUI instances whose breaker admits jobs."""
+    await _ensure_checked()
+    return [url for url in comfyui_client.endpoints() if _usable(url)]
+
+
+async def ranked_comfyui(checkpoint: str | None = None) -> list[str]:
+    """Usable, non-saturated ComfyUI instances, best first (see comfyui_client.rank_endpoints)."""
+    urls = await comfyui_candidates()
+    return comfyui_client.rank_endpoints({url: _queue_depth.get(url, 0) for url in urls}, checkpoint)
+
+
+async def is_available(name: str) -> bool:
+    """Cached availability of "comfyui" (any instance) or "runpod"."""
+    if name == "comfyui":
+        return bool(await comfyui_candidates())
+    await _ensure_checked()
+    return _usable(name)
+
+
+async def select_backend() -> str | None:
+    """First available backend in preference order (ComfyUI, then RunPod)."""
+    for name in ("comfyui", RUNPOD):
+        if await is_available(name):
+            return name
+    return None
+
+
+async def acquire(key: str) -> bool:
+    """Check availability and reserve an attempt on the backend's breaker.
+
+    A reserved ComfyUI job counts towards the instance's queue depth until
+    its result is recorded, so requests between two probes spread over the pool.
+    """
+    await _ensure_checked()
+    if not (_healthy.get(key, False) and breaker(key).allow()):
+        return False
+    if key != RUNPOD:
+        _queue_depth[key] = _queue_depth.get(key, 0) + 1
+    return True
+
+
+def record_result(key: str, ok: bool) -> None:
+    """Feed a real job outcome into the backend's breaker."""
+    if key in _queue_depth:
+        _queue_depth[key] = max(0, _queue_depth[key] - 1)
+    if ok:
+        breaker(key).record_success()
+    else:
+        breaker(key).record_failure()
+
+
+def status() -> dict[str, dict]:
+    now = time.monotonic()
+    return {
+        key: {
+            "available": _usable(key),
+            "healthy": _healthy.get(key),
+            "circuit": breaker(key).state,
+            "failures": breaker(key).failures,
+            "queue": _queue_depth.get(key),
+            "checked_ago": round(now - _checked_at[key], 1) if key in _checked_at else None,
+        }
+        for key in [*comfyui_client.endpoints(), RUNPOD]
+    }
+
+
+async def monitor_loop() -> None:
+    """Probe backends every `image_health_interval` seconds. Runs in the app lifespan."""
+    while True:
+        try:
+            await refresh()
+        except Exception:
+            logger.exception("Image backend health check failed")
+        await asyncio.sleep(settings.image_health_interval)
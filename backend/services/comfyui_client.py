@@ -1,19 +1,29 @@
 """ComfyUI API client for local image generation.
 
-Connects to ComfyUI (localhost:8188) to queue workflows,
-poll status, and download generated images.
+Connects to ComfyUI (localhost:8188) to queue workflows, follows them on
+the /ws progress socket (HTTP polling as fallback), and downloads
+generated images.
 """
 
 import asyncio
+import hashlib
 import json
 import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import lru_cache
 
 import httpx
+import websockets
 from config import settings
-from services.prompt_loader import load_prompt
+from services.prompt_loader import load_prompt, load_workflow
 
 CHECKPOINT = "sd_xl_base_1.0.safetensors"
 
+# Per-request values patched into a compiled template; all other "$name"
+# placeholders are filled from the style when the template is compiled.
+REQUEST_SLOTS = ("prompt", "seed", "filename_prefix")
+
 
 def _get_image_config() -> dict:
     """Load image configuration from YAML."""
@@ -27,23 +37,21 @@ def _get_style(image_type: str) -> dict:
     return styles.get(image_type, styles.get("illustration", {}))
 
 
-def build_workflow(prompt: str, image_type: str = "illustration") -> dict:
-    """Build a ComfyUI API workflow JSON from a prompt and image type."""
-    style = _get_style(image_type)
-    image_cfg = _get_image_config()
-    negative = image_cfg.get("negative_prompt", "")
-    full_prompt = style.get("prefix", "") + prompt
-    client_id = str(uuid.uuid4())
+def seed_for(prompt: str) -> int:
+    """Deterministic seed for a prompt (stable across processes, unlike hash())."""
+    return int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:4], "big")
+
 
-    # Standard SDXL txt2img workflow for ComfyUI API format
-    workflow = {
+def _default_graph() -> dict:
+    """Standard SDXL txt2img workflow in ComfyUI API format, with placeholders."""
+    return {
         "3": {
             "class_type": "KSampler",
             "inputs": {
-                "seed": hash(prompt) % (2**32),
-                "steps": style.get("steps", 30),
-                "cfg": style.get("cfg", 7.5),
-                "sampler_name": style.get("sampler", "euler_ancestral"),
+                "seed": "$seed",
+                "steps": "$steps",
+                "cfg": "$cfg",
+                "sampler_name": "$sampler",
                 "scheduler": "normal",
                 "denoise": 1.0,
                 "model": ["4", 0],
@@ -54,23 +62,19 @@ def build_workflow(prompt: str, image_type: str = "illustration") -> dict:
         },
         "4": {
             "class_type": "CheckpointLoaderSimple",
-            "inputs": {"ckpt_name": CHECKPOINT},
+            "inputs": {"ckpt_name": "$checkpoint"},
         },
         "5": {
             "class_type": "EmptyLatentImage",
-            "inputs": {
-                "width": style.get("width", 1024),
-                "height": style.get("height", 1024),
-                "batch_size": 1,
-            },
+            "inputs": {"width": "$width", "height": "$height", "batch_size": 1},
         },
         "6": {
             "class_type": "CLIPTextEncode",
-            "inputs": {"text": full_prompt, "clip": ["4", 1]},
+            "inputs": {"text": "$prompt", "clip": ["4", 1]},
         },
         "7": {
             "class_type": "CLIPTextEncode",
-            "inputs": {"text": negative, "clip": ["4", 1]},
+            "inputs": {"text": "$negative", "clip": ["4", 1]},
         },
         "8": {
             "class_type": "VAEDecode",
@@ -78,98 +82,431 @@ def build_workflow(prompt: str, image_type: str = "illustration") -> dict:
         },
         "9": {
             "class_type": "SaveImage",
-            "inputs": {"filename_prefix": f"clnpth_{client_id[:8]}", "images": ["8", 0]},
+            "inputs": {"filename_prefix": "$filename_prefix", "images": ["8", 0]},
         },
     }
 
+
+@dataclass(frozen=True)
+class WorkflowTemplate:
+    """A compiled workflow graph; rendering only patches the request slots.
+
+    `graph` must not be mutated: rendered workflows share its unpatched nodes.
+    """
+
+    graph: dict[str, dict]
+    slots: tuple[tuple[str, str, str], ...]  # (slot, node id, input name)
+    output_node: str
+    prefix: str
+    key: tuple  # sampling parameters and workflow file
+    checkpoint: str | None  # ckpt_name the graph loads, for dispatch affinity
+
+    def render(self, prompt: str, filename_prefix: str) -> dict:
+        """Graph for one request; only the slot nodes are copied."""
+        values = {"prompt": self.prefix + prompt, "seed": seed_for(prompt), "filename_prefix": filename_prefix}
+        nodes = {
+            node_id: {**self.graph[node_id], "inputs": dict(self.graph[node_id]["inputs"])}
+            for _, node_id, _ in self.slots
+        }
+        for slot, node_id, name in self.slots:
+            nodes[node_id]["inputs"][name] = values[slot]
+        return {**self.graph, **nodes}
+
+
+def _compile(graph: dict, style: dict, workflow: str | None) -> WorkflowTemplate:
+    """Fill style placeholders and locate the request slots."""
+    static = {
+        "negative": _get_image_config().get("negative_prompt", ""),
+        "checkpoint": CHECKPOINT,
+        "steps": style.get("steps", 30),
+        "cfg": style.get("cfg", 7.5),
+        "sampler": style.get("sampler", "euler_ancestral"),
+        "width": style.get("width", 1024),
+        "height": style.get("height", 1024),
+    }
+    compiled: dict[str, dict] = {}
+    slots: list[tuple[str, str, str]] = []
+    for node_id, node in graph.items():
+        inputs = {}
+        for name, value in node.get("inputs", {}).items():
+            if isinstance(value, str) and value.startswith("$"):
+                placeholder = value[1:]
+                if placeholder in REQUEST_SLOTS:
+                    slots.append((placeholder, str(node_id), name))
+                elif placeholder in static:
+                    value = static[placeholder]
+                else:
+                    raise ValueError(f"Unknown placeholder {value} in workflow {workflow or 'default'}")
+            inputs[name] = value
+        compiled[str(node_id)] = {**node, "inputs": inputs}
+
+    outputs = [node_id for slot, node_id, _ in slots if slot == "filename_prefix"] or [
+        node_id for node_id, node in compiled.items() if node["class_type"] == "SaveImage"
+    ]
+    if not outputs:
+        raise ValueError(f"Workflow {workflow or 'default'} has no SaveImage node")
+
+    checkpoints = [
+        node["inputs"]["ckpt_name"] for node in compiled.values()
+        if isinstance(node["inputs"].get("ckpt_name"), str)
+    ]
+
+    return WorkflowTemplate(
+        graph=compiled,
+        slots=tuple(slots),
+        output_node=outputs[0],
+        prefix=style.get("prefix", ""),
+        key=(static["steps"], static["cfg"], static["sampler"], static["width"], static["height"], workflow),
+        checkpoint=checkpoints[0] if checkpoints else None,
+    )
+
+
+@lru_cache(maxsize=32)
+def get_template(image_type: str) -> WorkflowTemplate:
+    """Compiled workflow for an image type, built once per process.
+
+    A style may name a custom ComfyUI API-format graph (`workflow:` in
+    prompts/image.yaml, file under prompts/workflows/); otherwise the
+    standard SDXL graph is used.
+    """
+    style = _get_style(image_type)
+    workflow = style.get("workflow")
+    graph = load_workflow(workflow) if workflow else _default_graph()
+    return _compile(graph, style, workflow)
+
+
+def generation_params(prompt: str, image_type: str = "illustration") -> dict:
+    """Everything that determines the generated image for a request."""
+    template = get_template(image_type)
+    steps, cfg, sampler, width, height, workflow = template.key
+    params = {
+        "prompt": template.prefix + prompt,
+        "negative": _get_image_config().get("negative_prompt", ""),
+        "steps": steps,
+        "cfg": cfg,
+        "sampler": sampler,
+        "width": width,
+        "height": height,
+        "checkpoint": template.checkpoint,
+        "seed": seed_for(prompt),
+    }
+    if workflow:
+        params["workflow"] = workflow
+    return params
+
+
+def build_workflow(prompt: str, image_type: str = "illustration") -> dict:
+    """Build a ComfyUI API workflow JSON from a prompt and image type."""
+    client_id = str(uuid.uuid4())
+    workflow = get_template(image_type).render(prompt, f"clnpth_{client_id[:8]}")
     return {"prompt": workflow, "client_id": client_id}
 
 
-async def is_available() -> bool:
+def endpoints() -> list[str]:
+    """Configured ComfyUI instances: `comfyui_urls` (comma-separated) or `comfyui_url`."""
+    urls = [u.strip().rstrip("/") for u in settings.comfyui_urls.split(",") if u.strip()]
+    return urls or [settings.comfyui_url.rstrip("/")]
+
+
+# Checkpoint of the last workflow each instance ran (kept in VRAM by ComfyUI), for dispatch affinity
+_loaded_checkpoint: dict[str, str] = {}
+
+
+async def is_available(base_url: str | None = None) -> bool:
     """Check if ComfyUI is reachable."""
     try:
-        async with httpx.AsyncClient(timeout=3) as client:
-            resp = await client.get(f"{settings.comfyui_url}/system_stats")
+        async with httpx.AsyncClient(base_url=base_url or settings.comfyui_url, timeout=3) as client:
+            resp = await client.get("/system_stats")
             return resp.status_code == 200
     except Exception:
         return False
 
 
-async def queue_prompt(prompt: str, image_type: str = "illustration") -> dict | None:
-    """Queue an image generation workflow. Returns {prompt_id, client_id} or None."""
-    workflow_data = build_workflow(prompt, image_type)
-
+async def queue_depth(base_url: str) -> int | None:
+    """Running + pending prompts on an instance, or None if it did not answer."""
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(
-                f"{settings.comfyui_url}/prompt",
-                json=workflow_data,
-            )
+        async with httpx.AsyncClient(base_url=base_url, timeout=3) as client:
+            resp = await client.get("/queue")
             resp.raise_for_status()
-            result = resp.json()
-            return {
-                "prompt_id": result["prompt_id"],
-                "client_id": workflow_data["client_id"],
-            }
+            data = resp.json()
+            return len(data.get("queue_running", [])) + len(data.get("queue_pending", []))
     except Exception:
         return None
 
 
-async def poll_status(prompt_id: str, timeout: int = 300) -> str:
-    """Poll ComfyUI for generation status. Returns 'completed', 'failed', or 'timeout'."""
-    elapsed = 0
+def rank_endpoints(depths: dict[str, int], checkpoint: str | None = None) -> list[str]:
+    """Instances by queue depth, preferring those that last ran `checkpoint`.
+
+    `depths` maps instance → known queue depth (see backend_health); instances
+    at `comfyui_max_queue` or more are saturated and left out.
+    """
+    ranked = sorted(
+        (depth, checkpoint is not None and _loaded_checkpoint.get(url) != checkpoint, i, url)
+        for i, (url, depth) in enumerate(depths.items())
+        if depth < settings.comfyui_max_queue
+    )
+    return [url for *_, url in ranked]
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+QueuedCallback = Callable[[str], Awaitable[None]]
+
+
+def _ws_url(client_id: str, base_url: str | None = None) -> str:
+    base = base_url or settings.comfyui_url
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://"):]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://"):]
+    return f"{base}/ws?clientId={client_id}"
+
+
+async def _submit(client: httpx.AsyncClient, workflow_data: dict) -> dict | None:
+    try:
+        resp = await client.post("/prompt", json=workflow_data)
+        resp.raise_for_status()
+        return {
+            "prompt_id": resp.json()["prompt_id"],
+            "client_id": workflow_data["client_id"],
+        }
+    except Exception:
+        return None
+
+
+async def queue_prompt(
+    prompt: str,
+    image_type: str = "illustration",
+    base_url: str | None = None,
+) -> dict | None:
+    """Queue an image generation workflow. Returns {prompt_id, client_id} or None."""
+    workflow_data = build_workflow(prompt, image_type)
+    async with httpx.AsyncClient(base_url=base_url or settings.comfyui_url, timeout=10) as client:
+        return await _submit(client, workflow_data)
+
+
+async def _poll_history(
+    client: httpx.AsyncClient,
+    prompt_id: str,
+    timeout: float = 300,
+) -> tuple[str, dict | None]:
+    """Poll /history until the prompt finishes. Returns (status, history entry)."""
+    elapsed = 0.0
     interval = 2
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        while elapsed < timeout:
-            try:
-                resp = await client.get(f"{settings.comfyui_url}/history/{prompt_id}")
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if prompt_id in data:
-                        status = data[prompt_id].get("status", {})
-                        if status.get("completed", False):
-                            return "completed"
-                        if status.get("status_str") == "error":
-                            return "failed"
-            except Exception:
-                pass
+    while elapsed < timeout:
+        try:
+            resp = await client.get(f"/history/{prompt_id}")
+            if resp.status_code == 200:
+                data = resp.json()
+                if prompt_id in data:
+                    status = data[prompt_id].get("status", {})
+                    if status.get("completed", False):
+                        return "completed", data[prompt_id]
+                    if status.get("status_str") == "error":
+                        return "failed", None
+        except Exception:
+            pass
+
+        await asyncio.sleep(interval)
+        elapsed += interval
+
+    return "timeout", None
 
-            await asyncio.sleep(interval)
-            elapsed += interval
 
-    return "timeout"
+async def poll_status(prompt_id: str, timeout: int = 300, base_url: str | None = None) -> str:
+    """Poll ComfyUI for generation status. Returns 'completed', 'failed', or 'timeout'."""
+    async with httpx.AsyncClient(base_url=base_url or settings.comfyui_url, timeout=10) as client:
+        status, _ = await _poll_history(client, prompt_id, timeout)
+    return status
+
 
+def _images_from_history(entry: dict) -> dict[str, list[dict]]:
+    """Image descriptors ({filename, subfolder, type}) per output node of a history entry."""
+    return {
+        node_id: node_output["images"]
+        for node_id, node_output in entry.get("outputs", {}).items()
+        if node_output.get("images")
+    }
 
-async def get_image(prompt_id: str) -> bytes | None:
+
+async def _download(client: httpx.AsyncClient, images: list[dict]) -> bytes | None:
+    """Fetch the first image from /view."""
+    for img_info in images:
+        try:
+            img_resp = await client.get(
+                "/view",
+                params={
+                    "filename": img_info["filename"],
+                    "subfolder": img_info.get("subfolder", ""),
+                    "type": img_info.get("type", "output"),
+                },
+            )
+        except Exception:
+            return None
+        if img_resp.status_code == 200:
+            return img_resp.content
+    return None
+
+
+async def get_image(prompt_id: str, base_url: str | None = None) -> bytes | None:
     """Download the generated image for a completed prompt."""
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(f"{settings.comfyui_url}/history/{prompt_id}")
+        async with httpx.AsyncClient(base_url=base_url or settings.comfyui_url, timeout=10) as client:
+            resp = await client.get(f"/history/{prompt_id}")
             if resp.status_code != 200:
                 return None
 
             data = resp.json()
             if prompt_id not in data:
                 return None
+            outputs = _images_from_history(data[prompt_id])
+            return await _download(client, [img for imgs in outputs.values() for img in imgs])
+    except Exception:
+        return None
 
-            outputs = data[prompt_id].get("outputs", {})
-            # Find the SaveImage node output
-            for node_output in outputs.values():
-                images = node_output.get("images", [])
-                if images:
-                    img_info = images[0]
-                    img_resp = await client.get(
-                        f"{settings.comfyui_url}/view",
-                        params={
-                            "filename": img_info["filename"],
-                            "subfolder": img_info.get("subfolder", ""),
-                            "type": img_info.get("type", "output"),
-                        },
-                    )
-                    if img_resp.status_code == 200:
-                        return img_resp.content
 
-            return None
+async def fetch_output(
+    prompt_id: str,
+    output_node: str | None,
+    base_url: str,
+    timeout: int = 300,
+) -> bytes | None:
+    """Wait for an already queued prompt (e.g. after an API restart) and download its image."""
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+            status, entry = await _poll_history(client, prompt_id, timeout)
+            if status != "completed":
+                return None
+            images = _images_from_history(entry)
+            if output_node is not None:
+                return await _download(client, images.get(output_node, []))
+            return await _download(client, [img for imgs in images.values() for img in imgs])
     except Exception:
         return None
+
+
+async def _follow_socket(
+    ws,
+    prompt_id: str,
+    on_progress: ProgressCallback | None,
+) -> tuple[str, dict[str, list[dict]]]:
+    """Consume ComfyUI socket messages for `prompt_id`.
+
+    Returns ("completed", images), ("failed", {}) or ("closed", images) if
+    the socket dropped before the prompt finished; images are keyed by
+    output node id.
+    """
+    images: dict[str, list[dict]] = {}
+    try:
+        async for raw in ws:
+            if isinstance(raw, bytes):
+                continue  # binary latent previews
+            msg = json.loads(raw)
+            kind = msg.get("type")
+            data = msg.get("data") or {}
+            if data.get("prompt_id", prompt_id) != prompt_id:
+                continue
+
+            if kind == "progress" and on_progress is not None:
+                await on_progress(int(data.get("value", 0)), int(data.get("max", 0)))
+            elif kind == "executed":
+                node_images = (data.get("output") or {}).get("images", [])
+                if node_images:
+                    images.setdefault(str(data.get("node")), []).extend(node_images)
+            elif kind == "execution_success" or (
+                kind == "executing" and data.get("node") is None and "prompt_id" in data
+            ):
+                return "completed", images
+            elif kind in ("execution_error", "execution_interrupted"):
+                return "failed", {}
+    except websockets.ConnectionClosed:
+        pass
+    return "closed", images
+
+
+async def _run_workflow(
+    client: httpx.AsyncClient,
+    workflow_data: dict,
+    output_nodes: set[str],
+    on_progress: ProgressCallback | None,
+    timeout: int,
+    on_queued: QueuedCallback | None = None,
+    checkpoint: str | None = None,
+) -> dict[str, list[dict]] | None:
+    """Queue a workflow and wait for it; returns output images per node or None.
+
+    The progress socket is opened with the workflow's client_id before the
+    prompt is queued, so completion is seen immediately and step progress
+    is passed to `on_progress(value, max)`. SaveImage `executed` messages
+    name the output files; /history is read once only if an output came from
+    ComfyUI's cache or the socket dropped. Without a socket the prompt is
+    polled as before. `on_queued(prompt_id)` is awaited once ComfyUI has
+    accepted the prompt; `checkpoint` (the one the workflow loads) is
+    recorded for the instance once it finished.
+    """
+    base_url = str(client.base_url).rstrip("/")
+    try:
+        ws = await websockets.connect(_ws_url(workflow_data["client_id"], base_url), max_size=None)
+    except Exception:
+        ws = None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        result = await _submit(client, workflow_data)
+        if result is None:
+            return None
+        prompt_id = result["prompt_id"]
+        if on_queued is not None:
+            await on_queued(prompt_id)
+
+        status, images = "closed", {}
+        if ws is not None:
+            try:
+                async with asyncio.timeout(timeout):
+                    status, images = await _follow_socket(ws, prompt_id, on_progress)
+            except TimeoutError:
+                return None
+        if status == "failed":
+            return None
+
+        if status == "closed" or not output_nodes <= images.keys():
+            status, entry = await _poll_history(
+                client, prompt_id, max(2.0, deadline - loop.time()),
+            )
+            if status != "completed":
+                return None
+            images = _images_from_history(entry)
+
+        if checkpoint is not None:
+            _loaded_checkpoint[base_url] = checkpoint
+        return images
+    finally:
+        if ws is not None:
+            await ws.close()
+
+
+async def generate_image(
+    prompt: str,
+    image_type: str = "illustration",
+    on_progress: ProgressCallback | None = None,
+    timeout: int = 300,
+    base_url: str | None = None,
+    on_queued: QueuedCallback | None = None,
+) -> bytes | None:
+    """Queue a workflow, wait for completion and return the image bytes.
+
+    `base_url` selects the instance (default `comfyui_url`).
+    """
+    workflow_data = build_workflow(prompt, image_type)
+    template = get_template(image_type)
+    output_node = template.output_node
+    async with httpx.AsyncClient(base_url=base_url or settings.comfyui_url, timeout=10) as client:
+        images = await _run_workflow(
+            client, workflow_data, {output_node}, on_progress, timeout, on_queued, template.checkpoint,
+        )
+        if images is None:
+            return None
+        return await _download(
+            client, images.get(output_node) or [i for imgs in images.values() for i in imgs],
+        )
@@ -0,0 +1,158 @@
+"""Cached, pre-serialized supervisor dashboard.
+
+The dashboard is polled by every open editor tab. Its data is loaded with a
+single statement (topic ranking, recent decisions and deviation counters as
+JSON sub-selects; the tonality profile comes from the tonality snapshot),
+serialized once and kept until a committed learning write invalidates it.
+The ETag is a hash of the body, so it matches across worker processes and
+polling clients can revalidate with If-None-Match.
+
+Loads always go to the primary: a lagging read replica would be cached for
+the whole TTL and served under a fresh ETag. Across worker processes the
+staleness is bounded by `dashboard_cache_ttl`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.hooks import on_commit
+from db.models import AbweichungsStatistik, SupervisorLog, ThemenRanking
+from services import tonality_cache
+
+RANKING_LIMIT = 20
+DECISIONS_LIMIT = 20
+
+
+@dataclass(frozen=True)
+class DashboardPayload:
+    version: int
+    body: bytes
+    etag: str
+    loaded_at: float = 0.0
+
+
+_version = 0
+_payload: DashboardPayload | None = None
+
+
+def invalidate() -> None:
+    """Drop the cached dashboard; call after committed learning writes and new evaluations."""
+    global _version, _payload
+    _version += 1
+    _payload = None
+
+
+def invalidate_on_commit(db: AsyncSession) -> None:
+    """Invalidate once the write pending in `db` is committed."""
+    on_commit(db, invalidate)
+
+
+def _json_list(subquery, fields: dict, order_by):
+    """Scalar sub-select aggregating `subquery` rows into a JSON array of objects."""
+    obj = func.json_build_object(*[
+        part for key, col in fields.items() for part in (literal_column(f"'{key}'"), col)
+    ])
+    return (
+        select(func.coalesce(func.json_agg(aggregate_order_by(obj, *order_by)), text("'[]'::json")))
+        .select_from(subquery)
+        .scalar_subquery()
+    )
+
+
+def dashboard_statement():
+    """One SELECT returning ranking, recent decisions and deviation totals."""
+    ranking = (
+        select(
+            ThemenRanking.id, ThemenRanking.thema, ThemenRanking.kategorie,
+            ThemenRanking.artikel_count, ThemenRanking.freigabe_rate, ThemenRanking.letzter_artikel,
+        )
+        .order_by(ThemenRanking.artikel_count.desc())
+        .limit(RANKING_LIMIT)
+        .subquery("ranking")
+    )
+    decisions = (
+        select(
+            SupervisorLog.id, SupervisorLog.artikel_id, SupervisorLog.supervisor_empfehlung,
+            SupervisorLog.supervisor_score, SupervisorLog.redakteur_entscheidung,
+            SupervisorLog.abweichung, SupervisorLog.erstellt_am,
+        )
+        .order_by(SupervisorLog.erstellt_am.desc())
+        .limit(DECISIONS_LIMIT)
+        .subquery("decisions")
+    )
+    return select(
+        _json_list(
+            ranking,
+            {
+                "id": ranking.c.id,
+                "thema": ranking.c.thema,
+                "kategorie": ranking.c.kategorie,
+                "artikel_count": ranking.c.artikel_count,
+                "freigabe_rate": ranking.c.freigabe_rate,
+                "letzter_artikel": ranking.c.letzter_artikel,
+            },
+            [ranking.c.artikel_count.desc()],
+        ).label("themen_ranking"),
+        _json_list(
+            decisions,
+            {
+                "id": decisions.c.id,
+                "artikel_id": decisions.c.artikel_id,
+                "empfehlung": decisions.c.supervisor_empfehlung,
+                "score": decisions.c.supervisor_score,
+                "redakteur_entscheidung": decisions.c.redakteur_entscheidung,
+                "abweichung": decisions.c.abweichung,
+                "erstellt_am": decisions.c.erstellt_am,
+            },
+            [decisions.c.erstellt_am.desc()],
+        ).label("recent_decisions"),
+        select(func.coalesce(func.sum(AbweichungsStatistik.entscheidungen), 0))
+        .scalar_subquery().label("total_decisions"),
+        select(func.coalesce(func.sum(AbweichungsStatistik.abweichungen), 0))
+        .scalar_subquery().label("deviations"),
+    )
+
+
+async def _load(db: AsyncSession) -> dict:
+    profile = (await tonality_cache.get_snapshot(db)).entries
+    row = (await db.execute(dashboard_statement())).one()
+    total, deviations = row.total_decisions, row.deviations
+    return {
+        "tonality_profile": profile,
+        "themen_ranking": row.themen_ranking,
+        "recent_decisions": row.recent_decisions,
+        "deviation_stats": {
+            "total_decisions": total,
+            "deviations": deviations,
+            "deviation_rate": (deviations / total * 100) if total > 0 else 0,
+        },
+    }
+
+
+async def get_dashboard(db: AsyncSession) -> DashboardPayload:
+    """Return the cached dashboard, reloading it if missing or expired."""
+    global _payload
+    cached = _payload
+    if cached is not None and time.monotonic() - cached.loaded_at < settings.dashboard_cache_ttl:
+        return cached
+
+    version = _version
+    body = json.dumps(await _load(db), ensure_ascii=False, default=str).encode()
+    payload = DashboardPayload(
+        version=version,
+        body=body,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        loaded_at=time.monotonic(),
+    )
+    if version == _version:
+        _payload = payload
+    return payload
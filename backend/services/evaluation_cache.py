@@ -0,0 +1,70 @@
+"""Evaluation result cache backed by supervisor_log.eval_hash.
+
+An evaluation depends only on the article text, kategorie, the tonality
+profile and the prompt/model used. Their hash is stored on every
+SupervisorLog row, so a re-trigger for unchanged input copies the latest
+matching row instead of paying for another Mistral call.
+"""
+
+import hashlib
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.models import SupervisorLog
+from services.prompt_loader import load_prompt
+
+
+def cache_key(
+    titel: str,
+    lead: str,
+    body: str,
+    kategorie: str | None,
+    tonality_profile: str,
+) -> str:
+    """Hash of everything the evaluation result depends on.
+
+    The tonality profile enters as its rendered context string, so the key is
+    stable across workers and restarts and changes whenever the profile does.
+    """
+    template = load_prompt("evaluation")["template"]
+    raw = json.dumps(
+        [titel, lead, body, kategorie, tonality_profile, template, settings.mistral_model],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def lookup(db: AsyncSession, keys: list[str]) -> dict[str, dict]:
+    """Latest cached evaluation per key (one query). Missing keys are absent."""
+    if not keys:
+        return {}
+    result = await db.execute(
+        select(SupervisorLog)
+        .where(SupervisorLog.eval_hash.in_(set(keys)))
+        .order_by(SupervisorLog.eval_hash, SupervisorLog.erstellt_am.desc())
+        .distinct(SupervisorLog.eval_hash)
+    )
+    return {
+        sv.eval_hash: {
+            "empfehlung": sv.supervisor_empfehlung,
+            "begruendung": sv.supervisor_begruendung,
+            "score": sv.supervisor_score,
+            "tonality_tags": sv.tonality_tags,
+        }
+        for sv in result.scalars()
+    }
+
+
+def to_row(artikel_id: int, key: str, result: dict) -> dict:
+    """SupervisorLog insert values for an evaluation result."""
+    return {
+        "artikel_id": artikel_id,
+        "supervisor_empfehlung": result.get("empfehlung"),
+        "supervisor_begruendung": result.get("begruendung"),
+        "supervisor_score": result.get("score"),
+        "tonality_tags": result.get("tonality_tags"),
+        "eval_hash": key,
+    }
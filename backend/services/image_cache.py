@@ -0,0 +1,80 @@
+"""Content-addressed store for generated images.
+
+Images are written once under the hash of their bytes, so identical outputs
+share one file. A small on-disk index maps the request key — hash of prompt,
+style parameters, checkpoint and seed (see comfyui_client.generation_params)
+— to that file, so a repeated request is served without a generation job.
+The index lives next to the images and is shared by all workers.
+
+`lookup` and `store` do blocking disk I/O and hashing; async callers run
+them via asyncio.to_thread.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+
+from config import settings
+from services import comfyui_client
+
+URL_PREFIX = "/static/images"
+
+# Leading bytes of the formats a backend may return (ComfyUI saves PNG, RunPod URLs can be anything)
+_SIGNATURES = ((b"\x89PNG\r\n\x1a\n", "png"), (b"\xff\xd8\xff", "jpg"), (b"GIF8", "gif"))
+
+
+def _storage() -> Path:
+    path = Path(settings.image_storage_path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _index_dir() -> Path:
+    path = _storage() / ".index"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _extension(image_bytes: bytes) -> str:
+    """File extension matching the image format; unknown data keeps the former "png"."""
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return extension
+    return "png"
+
+
+def request_key(prompt: str, image_type: str) -> str:
+    params = comfyui_client.generation_params(prompt, image_type)
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def lookup(key: str) -> str | None:
+    """URL of the stored image for a request key, or None."""
+    try:
+        filename = (_index_dir() / key).read_text().strip()
+    except FileNotFoundError:
+        return None
+    if not (_storage() / filename).exists():
+        return None
+    return f"{URL_PREFIX}/{filename}"
+
+
+def store(image_bytes: bytes, key: str | None = None) -> str:
+    """Store image bytes (deduplicated by content) and index them under `key`. Returns the URL."""
+    filename = f"{hashlib.sha256(image_bytes).hexdigest()}.{_extension(image_bytes)}"
+    path = _storage() / filename
+    if not path.exists():
+        _write_atomic(path, image_bytes)
+    if key:
+        _write_atomic(_index_dir() / key, filename.encode())
+    return f"{URL_PREFIX}/{filename}"
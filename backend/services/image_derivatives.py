@@ -0,0 +1,135 @@
+"""Resized WebP/AVIF derivatives of generated images.
+
+The raw ComfyUI PNG is large (often several MB at 1024px). At save time
+the pipeline renders smaller variants in a process pool — encoding is CPU
+bound and must not block the event loop — and stores a manifest on
+ArtikelArchiv.bild_varianten. Variants are named after the content-hashed
+original, so a cached or duplicate image reuses existing files.
+
+Pillow is optional: without it (or without an AVIF encoder) the affected
+variants are skipped and the original PNG is used as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from config import settings
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    features = None
+
+logger = logging.getLogger(__name__)
+
+QUALITY = {"webp": 80, "avif": 55}
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def available_formats() -> list[str]:
+    if Image is None:
+        return []
+    wanted = [f.strip().lower() for f in settings.image_derivative_formats.split(",") if f.strip()]
+    return [f for f in wanted if f in QUALITY and features.check(f)]
+
+
+def _widths() -> list[int]:
+    return sorted({int(w) for w in settings.image_derivative_widths.split(",") if w.strip()})
+
+
+def render_variants(source: str, widths: list[int], formats: list[str]) -> dict:
+    """Encode variants of `source` next to it. Runs in a worker process.
+
+    Returns {"width", "height", "variants": [{file, format, width, height, bytes}]}.
+    Widths above the original are skipped; existing files are kept.
+    """
+    src = Path(source)
+    with Image.open(src) as img:
+        img.load()
+        orig_w, orig_h = img.size
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+        variants = []
+        for width in [w for w in widths if w < orig_w] + [orig_w]:
+            height = round(orig_h * width / orig_w)
+            resized = img if width == orig_w else img.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                out = src.with_name(f"{src.stem}_{width}.{fmt}")
+                if not out.exists():
+                    # Unique temp name: workers rendering the same image must not share it
+                    tmp = out.with_name(f".{out.name}.{uuid.uuid4().hex[:8]}.tmp")
+                    resized.save(tmp, format=fmt.upper(), quality=QUALITY[fmt])
+                    tmp.replace(out)
+                variants.append({
+                    "file": out.name,
+                    "format": fmt,
+                    "width": width,
+                    "height": height,
+                    "bytes": out.stat().st_size,
+                })
+    return {"width": orig_w, "height": orig_h, "variants": variants}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the API process runs threads (to_thread workers) whose
+        # locks a forked child could inherit in a held state
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.image_derivative_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def build_manifest(image_url: str) -> dict | None:
+    """Render derivatives for a stored image URL; returns the manifest or None."""
+    formats = available_formats()
+    if not formats:
+        return None
+
+    prefix, _, filename = image_url.rpartition("/")
+    source = Path(settings.image_storage_path) / filename
+    loop = asyncio.get_running_loop()
+    try:
+        rendered = await loop.run_in_executor(
+            _get_pool(), render_variants, str(source), _widths(), formats,
+        )
+    except Exception:
+        logger.exception("Image derivatives failed for %s", image_url)
+        return None
+
+    return {
+        "original": image_url,
+        "width": rendered["width"],
+        "height": rendered["height"],
+        "variants": [
+            {**{k: v for k, v in variant.items() if k != "file"}, "url": f"{prefix}/{variant['file']}"}
+            for variant in rendered["variants"]
+        ],
+    }
+
+
+def preferred_upload(bild_url: str, manifest: dict | None) -> str:
+    """URL to upload to WordPress: the full-size WebP variant if present, else the original."""
+    for variant in (manifest or {}).get("variants", []):
+        if variant["format"] == "webp" and variant["width"] == manifest.get("width"):
+            return variant["url"]
+    return bild_url
+
+
+def shutdown() -> None:
+    """Stop the encoder processes; called from the app lifespan."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,141 @@
+"""Persistent image job state (table image_jobs).
+
+The image pipeline records every request here: backend, remote job id,
+progress, timestamps and errors, so the status endpoint is one indexed
+read and a failed job shows as failed. While a job runs a heartbeat keeps
+`aktualisiert_am` fresh; jobs whose heartbeat stopped (API restart, crashed
+worker) are claimed with `claim_stale` and resumed by the image pipeline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import settings
+from db.models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ("queued", "generating")
+PROGRESS_STEP = 10  # percent between progress writes
+SUPERSEDED = "superseded by a newer request"
+
+
+async def create(db: AsyncSession, artikel_id: int, prompt: str, image_type: str) -> int:
+    """Insert a queued job; still-active older jobs of the article are superseded."""
+    now = datetime.utcnow()
+    await db.execute(
+        update(ImageJob)
+        .where(ImageJob.artikel_id == artikel_id, ImageJob.status.in_(ACTIVE))
+        .values(status="failed", error=SUPERSEDED, beendet_am=now, aktualisiert_am=now)
+    )
+    job = ImageJob(artikel_id=artikel_id, prompt=prompt, image_type=image_type, status="queued")
+    db.add(job)
+    await db.flush()
+    return job.id
+
+
+async def _update(session_factory, job_id: int, **values) -> None:
+    async with session_factory() as db:
+        await db.execute(
+            update(ImageJob)
+            .where(ImageJob.id == job_id, ImageJob.status.in_(ACTIVE))
+            .values(**values, aktualisiert_am=datetime.utcnow())
+        )
+        await db.commit()
+
+
+async def start(
+    session_factory,
+    job_id: int,
+    remote_output: str | None,
+    backend: str,
+    remote_job_id: str,
+) -> None:
+    """Mark a job as generating on `backend`; `remote_output` is the ComfyUI output node."""
+    await _update(
+        session_factory, job_id,
+        status="generating", backend=backend, remote_job_id=remote_job_id,
+        remote_output=remote_output, progress=0, gestartet_am=datetime.utcnow(),
+    )
+
+
+async def set_progress(session_factory, job_id: int, percent: int) -> None:
+    await _update(session_factory, job_id, progress=percent)
+
+
+async def fail(session_factory, job_id: int, error: str) -> None:
+    await _update(session_factory, job_id, status="failed", error=error, beendet_am=datetime.utcnow())
+
+
+async def complete(db: AsyncSession, job_id: int, bild_url: str) -> bool:
+    """Mark a job ready inside the caller's transaction; False if it is no longer active."""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(ImageJob)
+        .where(ImageJob.id == job_id, ImageJob.status.in_(ACTIVE))
+        .values(
+            status="ready", bild_url=bild_url, progress=100, error=None, beendet_am=now, aktualisiert_am=now,
+        )
+        .returning(ImageJob.id)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+@asynccontextmanager
+async def heartbeat(session_factory, job_id: int):
+    """Touch `aktualisiert_am` of a running job so it is not taken for orphaned."""
+    interval = max(1, settings.image_job_stale_after // 3)
+
+    async def beat():
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await _update(session_factory, job_id)
+            except Exception:
+                logger.exception("Image job heartbeat failed for %d", job_id)
+
+    task = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+async def claim_stale(session_factory) -> list[ImageJob]:
+    """Claim active jobs without a recent heartbeat, counting a new attempt.
+
+    Rows are locked with SKIP LOCKED and the heartbeat is renewed in the
+    same transaction, so two workers never claim the same job. A stale job
+    that has a newer job for the same article is superseded instead.
+    """
+    newer = aliased(ImageJob)
+    superseded = exists().where(newer.artikel_id == ImageJob.artikel_id, newer.id > ImageJob.id)
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        result = await db.execute(
+            select(ImageJob, superseded.label("superseded"))
+            .where(
+                ImageJob.status.in_(ACTIVE),
+                ImageJob.aktualisiert_am < now - timedelta(seconds=settings.image_job_stale_after),
+            )
+            .order_by(ImageJob.id)
+            .with_for_update(of=ImageJob, skip_locked=True)
+        )
+        claimed = []
+        for job, is_superseded in result.all():
+            job.aktualisiert_am = now
+            if is_superseded:
+                job.status, job.error, job.beendet_am = "failed", SUPERSEDED, now
+            else:
+                job.attempts += 1
+                claimed.append(job)
+        await db.commit()
+    return claimed
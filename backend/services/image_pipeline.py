@@ -3,34 +3,24 @@
 Generates images, saves to local storage, updates DB + WebSocket.
 """
 
-import os
-import uuid
-from datetime import datetime
-from pathlib import Path
-
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
 
 from config import settings
-from db.models import ArtikelArchiv
-from services import comfyui_client, runpod_client
+from db import queries
+from services import (
+    backend_health, comfyui_client, image_cache, image_derivatives, image_jobs, runpod_client,
+)
 from ws import manager
 
-
-def _ensure_storage_dir() -> Path:
-    """Ensure image storage directory exists."""
-    path = Path(settings.image_storage_path)
-    path.mkdir(parents=True, exist_ok=True)
-    return path
+logger = logging.getLogger(__name__)
 
 
-async def _save_image(image_bytes: bytes, artikel_id: int) -> str:
-    """Save image to local storage. Returns relative URL path."""
-    storage = _ensure_storage_dir()
-    filename = f"{artikel_id}_{uuid.uuid4().hex[:8]}.png"
-    filepath = storage / filename
-    filepath.write_bytes(image_bytes)
-    return f"/static/images/{filename}"
+async def _create_job(session_factory, artikel_id: int, prompt: str, image_type: str) -> int:
+    async with session_factory() as db:
+        job_id = await image_jobs.create(db, artikel_id, prompt, image_type)
+        await db.commit()
+    return job_id
 
 
 async def run_image_pipeline(
@@ -38,54 +28,180 @@ async def run_image_pipeline(
     prompt: str,
     image_type: str,
     session_factory,
+    job_id: int | None = None,
 ):
-    """Generate image via ComfyUI (local) or RunPod (fallback). Background task."""
+    """Generate image via ComfyUI (local) or RunPod (fallback). Background task.
+
+    An identical earlier request (same prompt, style, checkpoint, seed) is
+    served from the image cache without a generation job. Progress and
+    outcome are recorded on the image job (created here if not given).
+    """
+    if job_id is None:
+        job_id = await _create_job(session_factory, artikel_id, prompt, image_type)
+
+    key = image_cache.request_key(prompt, image_type)
+    cached_url = await asyncio.to_thread(image_cache.lookup, key)
+    if cached_url:
+        await _store_image(job_id, artikel_id, prompt, cached_url, session_factory, cached=True)
+        return
+
     await manager.broadcast("image:generating", {
         "artikel_id": artikel_id, "status": "generating",
     })
 
     image_bytes: bytes | None = None
-
-    # Strategy 1: Local ComfyUI
-    if await comfyui_client.is_available():
-        result = await comfyui_client.queue_prompt(prompt, image_type)
-        if result:
-            status = await comfyui_client.poll_status(result["prompt_id"])
-            if status == "completed":
-                image_bytes = await comfyui_client.get_image(result["prompt_id"])
-
-    # Strategy 2: RunPod fallback
-    if image_bytes is None and await runpod_client.is_configured():
-        result = await runpod_client.queue_prompt(prompt, image_type)
-        if result:
-            status_result = await runpod_client.poll_status(result["job_id"])
-            if status_result and status_result["status"] == "completed":
-                image_bytes = await runpod_client.get_image_from_output(
-                    status_result["output"]
+    error = "No image backend available"
+    written = 0
+
+    async def _relay_progress(value: int, maximum: int):
+        # Only every PROGRESS_STEP percent: each broadcast takes a slot in the
+        # WebSocket replay buffer, per-sampler-step events would evict the rest
+        nonlocal written
+        percent = value * 100 // maximum if maximum else 0
+        if percent < written + image_jobs.PROGRESS_STEP:
+            return
+        written = percent
+        await manager.broadcast("image:progress", {
+            "artikel_id": artikel_id,
+            "value": value,
+            "max": maximum,
+        })
+        await image_jobs.set_progress(session_factory, job_id, percent)
+
+    async with image_jobs.heartbeat(session_factory, job_id):
+        # Strategy 1: Local ComfyUI pool — shortest known queue first (preferring instances
+        # that have the style's checkpoint loaded), failing over to the next instance;
+        # progress streamed from its WebSocket
+        template = comfyui_client.get_template(image_type)
+        for base_url in await backend_health.ranked_comfyui(template.checkpoint):
+            if not await backend_health.acquire(base_url):
+                continue
+            written = 0
+            # Record the outcome even if the job raises or is cancelled, so a
+            # half-open breaker does not keep its trial reserved forever
+            try:
+                image_bytes = await comfyui_client.generate_image(
+                    prompt, image_type, on_progress=_relay_progress, base_url=base_url,
+                    on_queued=lambda prompt_id, base_url=base_url: image_jobs.start(
+                        session_factory, job_id, template.output_node, base_url, prompt_id,
+                    ),
                 )
+            finally:
+                backend_health.record_result(base_url, image_bytes is not None)
+            if image_bytes is not None:
+                break
+            error = f"ComfyUI {base_url} failed"
+
+        # Strategy 2: RunPod fallback (all instances down, saturated or failed)
+        if image_bytes is None and await backend_health.acquire(backend_health.RUNPOD):
+            try:
+                result = await runpod_client.queue_prompt(prompt, image_type)
+                error = "RunPod job could not be queued"
+                if result:
+                    await image_jobs.start(session_factory, job_id, None, backend_health.RUNPOD, result["job_id"])
+                    image_bytes = await _runpod_result(result["job_id"])
+                    if image_bytes is None:
+                        error = f"RunPod job {result['job_id']} failed"
+            finally:
+                backend_health.record_result(backend_health.RUNPOD, image_bytes is not None)
 
     # Save result
     if image_bytes:
-        image_url = await _save_image(image_bytes, artikel_id)
-
-        async with session_factory() as db:
-            result = await db.execute(
-                select(ArtikelArchiv).where(
-                    ArtikelArchiv.redaktions_log_id == artikel_id
-                )
-            )
-            archiv = result.scalar_one_or_none()
-            if archiv:
-                archiv.bild_url = image_url
-                archiv.bild_prompt = prompt
-                await db.commit()
-
-        await manager.broadcast("image:ready", {
-            "artikel_id": artikel_id,
-            "status": "ready",
-            "bild_url": image_url,
-        })
+        image_url = await asyncio.to_thread(image_cache.store, image_bytes, key)
+        await _store_image(job_id, artikel_id, prompt, image_url, session_factory)
     else:
+        await image_jobs.fail(session_factory, job_id, error)
         await manager.broadcast("image:failed", {
             "artikel_id": artikel_id, "status": "failed",
         })
+
+
+async def _runpod_result(job_id: str) -> bytes | None:
+    status_result = await runpod_client.poll_status(job_id)
+    if status_result and status_result["status"] == "completed":
+        return await runpod_client.get_image_from_output(status_result["output"])
+    return None
+
+
+async def _store_image(
+    job_id: int,
+    artikel_id: int,
+    prompt: str,
+    image_url: str,
+    session_factory,
+    cached: bool = False,
+):
+    """Mark the job ready and set the image on the article archive.
+
+    A job that was superseded meanwhile leaves the archive alone. WebP/AVIF
+    derivatives are rendered in the encoder process pool first; their
+    manifest is stored alongside the URL.
+    """
+    manifest = await image_derivatives.build_manifest(image_url)
+
+    async with session_factory() as db:
+        if not await image_jobs.complete(db, job_id, image_url):
+            return
+        result = await db.execute(queries.archive_by_article(artikel_id))
+        archiv = result.scalar_one_or_none()
+        if archiv:
+            archiv.bild_url = image_url
+            archiv.bild_varianten = manifest
+            archiv.bild_prompt = prompt
+        await db.commit()
+
+    await manager.broadcast("image:ready", {
+        "artikel_id": artikel_id,
+        "status": "ready",
+        "bild_url": image_url,
+        "cached": cached,
+    })
+
+
+async def resume_job(job, session_factory):
+    """Continue an orphaned image job (see image_jobs.claim_stale).
+
+    A job already queued remotely is awaited on its backend (ComfyUI
+    history or RunPod status); otherwise, or if that result is lost, the
+    job is generated again.
+    """
+    if job.attempts > settings.image_job_max_attempts:
+        await image_jobs.fail(
+            session_factory, job.id, f"Max attempts ({settings.image_job_max_attempts}) exceeded",
+        )
+        await manager.broadcast("image:failed", {
+            "artikel_id": job.artikel_id, "status": "failed",
+        })
+        return
+
+    image_bytes: bytes | None = None
+    if job.remote_job_id:
+        async with image_jobs.heartbeat(session_factory, job.id):
+            if job.backend == backend_health.RUNPOD:
+                image_bytes = await _runpod_result(job.remote_job_id)
+            else:
+                image_bytes = await comfyui_client.fetch_output(
+                    job.remote_job_id, job.remote_output, base_url=job.backend,
+                )
+
+    if image_bytes:
+        key = image_cache.request_key(job.prompt, job.image_type)
+        image_url = await asyncio.to_thread(image_cache.store, image_bytes, key)
+        await _store_image(job.id, job.artikel_id, job.prompt, image_url, session_factory)
+    else:
+        await run_image_pipeline(job.artikel_id, job.prompt, job.image_type, session_factory, job_id=job.id)
+
+
+async def resume_loop(session_factory) -> None:
+    """Claim and resume orphaned image jobs periodically. Runs in the app lifespan."""
+    tasks: set[asyncio.Task] = set()
+    while True:
+        try:
+            for job in await image_jobs.claim_stale(session_factory):
+                logger.info("Resuming image job %d (attempt %d)", job.id, job.attempts)
+                task = asyncio.create_task(resume_job(job, session_factory))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except Exception:
+            logger.exception("Image job resume failed")
+        await asyncio.sleep(settings.image_job_stale_after)
@@ -4,46 +4,59 @@ Updates profiles based on editor feedback and supervisor evaluations.
 Tracks approval rates per topic to optimize future article generation.
 """
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-from sqlalchemy import select, func
+from sqlalchemy import Text, all_, bindparam, select, func, update, insert
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import SupervisorLog, TonalityProfil, ThemenRanking, RedaktionsLog
+from db.models import (
+    AbweichungsStatistik, SupervisorLog, TonalityProfil, ThemenRanking, ThemenTagesStatistik,
+)
+from services import dashboard_cache, tonality_cache
 
 
 async def update_tonality_profile(db: AsyncSession, tonality_tags: list[str]):
     """Update tonality profile weights based on approved article tags.
 
     Tags from approved articles increase weight, building a learned style guide.
+    One INSERT … ON CONFLICT (merkmal) DO UPDATE covers new and known tags.
     """
-    for tag in tonality_tags:
-        result = await db.execute(
-            select(TonalityProfil).where(TonalityProfil.merkmal == tag)
+    tags = list(dict.fromkeys(tonality_tags))  # a row may only be upserted once per statement
+    if not tags:
+        return
+
+    stmt = pg_insert(TonalityProfil).values([
+        {"merkmal": tag, "wert": "bestätigt durch Redakteur", "gewichtung": 0.5, "belege": 1}
+        for tag in tags
+    ])
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TonalityProfil.merkmal],
+            set_={
+                "belege": TonalityProfil.belege + 1,
+                # Increase weight slightly with each confirmation (cap at 1.0)
+                "gewichtung": func.least(1.0, TonalityProfil.gewichtung + 0.02),
+                "aktualisiert": datetime.utcnow(),
+            },
         )
-        profil = result.scalar_one_or_none()
-
-        if profil:
-            profil.belege += 1
-            # Increase weight slightly with each confirmation (cap at 1.0)
-            profil.gewichtung = min(1.0, profil.gewichtung + 0.02)
-        else:
-            profil = TonalityProfil(
-                merkmal=tag,
-                wert="bestätigt durch Redakteur",
-                gewichtung=0.5,
-                belege=1,
-            )
-            db.add(profil)
+    )
+    tonality_cache.invalidate_on_commit(db)
 
 
 async def decay_unused_tags(db: AsyncSession, active_tags: list[str]):
-    """Slightly reduce weight of tags NOT seen in recent approvals."""
-    result = await db.execute(
-        select(TonalityProfil).where(TonalityProfil.merkmal.notin_(active_tags))
+    """Slightly reduce weight of tags NOT seen in recent approvals (single UPDATE).
+
+    The tags are bound as one array parameter (merkmal <> ALL(:tags)), so the
+    statement text stays the same whatever the number of tags.
+    """
+    await db.execute(
+        update(TonalityProfil)
+        .where(TonalityProfil.merkmal != all_(bindparam("active_tags", active_tags, type_=ARRAY(Text))))
+        .values(gewichtung=func.greatest(0.1, TonalityProfil.gewichtung - 0.005))
+        .execution_options(synchronize_session=False)
     )
-    for profil in result.scalars():
-        profil.gewichtung = max(0.1, profil.gewichtung - 0.005)
+    tonality_cache.invalidate_on_commit(db)
 
 
 async def update_themen_ranking(
@@ -51,35 +64,65 @@ async def update_themen_ranking(
     kategorie: str | None,
     approved: bool,
 ):
-    """Update topic ranking after article decision."""
+    """Update topic ranking after article decision.
+
+    Updated in place with one UPDATE; the row is only inserted the first
+    time a kategorie is seen.
+    """
     if not kategorie:
         return
 
+    # Weighted moving average (new decision counts more for recent trend)
     result = await db.execute(
-        select(ThemenRanking).where(ThemenRanking.kategorie == kategorie)
+        update(ThemenRanking)
+        .where(ThemenRanking.kategorie == kategorie)
+        .values(
+            artikel_count=ThemenRanking.artikel_count + 1,
+            letzter_artikel=datetime.utcnow(),
+            freigabe_rate=func.coalesce(ThemenRanking.freigabe_rate, 0.0) * 0.8
+            + (1.0 if approved else 0.0) * 0.2,
+        )
+        .returning(ThemenRanking.id)
+        .execution_options(synchronize_session=False)
     )
-    ranking = result.scalar_one_or_none()
-
-    if not ranking:
-        ranking = ThemenRanking(
-            thema=kategorie,
-            kategorie=kategorie,
-            artikel_count=0,
-            freigabe_rate=0.0,
+    if result.first() is None:
+        await db.execute(
+            insert(ThemenRanking).values(
+                thema=kategorie,
+                kategorie=kategorie,
+                artikel_count=1,
+                freigabe_rate=0.2 if approved else 0.0,
+                letzter_artikel=datetime.utcnow(),
+            )
         )
-        db.add(ranking)
 
-    ranking.artikel_count += 1
-    ranking.letzter_artikel = datetime.utcnow()
 
-    # Recalculate approval rate
-    if approved:
-        # Weighted moving average (new approval counts more for recent trend)
-        old_rate = ranking.freigabe_rate or 0.0
-        ranking.freigabe_rate = old_rate * 0.8 + 1.0 * 0.2
-    else:
-        old_rate = ranking.freigabe_rate or 0.0
-        ranking.freigabe_rate = old_rate * 0.8 + 0.0 * 0.2
+async def update_daily_rollup(
+    db: AsyncSession,
+    kategorie: str | None,
+    erstellt: int = 0,
+    freigegeben: int = 0,
+    abgelehnt: int = 0,
+    score: int | None = None,
+):
+    """Increment today's ThemenTagesStatistik row for `kategorie` (one upsert)."""
+    rollup = ThemenTagesStatistik.__table__
+    stmt = pg_insert(ThemenTagesStatistik).values(
+        kategorie=kategorie or "",
+        tag=datetime.utcnow().date(),
+        erstellt=erstellt,
+        freigegeben=freigegeben,
+        abgelehnt=abgelehnt,
+        score_summe=score or 0,
+        score_anzahl=0 if score is None else 1,
+    )
+    counters = ("erstellt", "freigegeben", "abgelehnt", "score_summe", "score_anzahl")
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[rollup.c.kategorie, rollup.c.tag],
+            set_={c: rollup.c[c] + stmt.excluded[c] for c in counters},
+        )
+    )
 
 
 async def track_deviation(db: AsyncSession, supervisor_log_id: int):
@@ -97,71 +140,238 @@ async def track_deviation(db: AsyncSession, supervisor_log_id: int):
     sv.abweichung = sv.supervisor_empfehlung != sv.redakteur_entscheidung
 
 
-async def process_editor_decision(
+def _week_start(ts: datetime | None) -> date:
+    day = (ts or datetime.utcnow()).date()
+    return day - timedelta(days=day.weekday())
+
+
+async def _bump_deviation_counters(
+    db: AsyncSession,
+    kategorie: str | None,
+    woche: date,
+    entscheidungen: int,
+    abweichungen: int,
+):
+    stats = AbweichungsStatistik.__table__
+    stmt = pg_insert(AbweichungsStatistik).values(
+        kategorie=kategorie or "",
+        woche=woche,
+        entscheidungen=entscheidungen,
+        abweichungen=abweichungen,
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[stats.c.kategorie, stats.c.woche],
+            set_={
+                "entscheidungen": stats.c.entscheidungen + stmt.excluded.entscheidungen,
+                "abweichungen": stats.c.abweichungen + stmt.excluded.abweichungen,
+            },
+        )
+    )
+
+
+async def record_editor_decision(
     db: AsyncSession,
     artikel_id: int,
     entscheidung: str,
     feedback: str | None = None,
-):
-    """Process an editor's decision: update learning systems.
+    kategorie: str | None = None,
+) -> tuple[list[str], int | None] | None:
+    """Write the editor decision onto the latest supervisor log in one UPDATE.
 
-    Called after approve/revise/reject to update:
-    - Supervisor log with editor decision
-    - Tonality profile (on approval)
-    - Topic ranking
-    - Deviation tracking
+    The previous decision is read in the same statement, so the deviation
+    counters (AbweichungsStatistik) only move by the actual change: a repeated
+    decision on the same log is counted once, a changed one flips its
+    deviation. Counters are bucketed by the evaluation's week.
+
+    Returns the log's tonality tags and supervisor score, or None if the
+    article has no supervisor log.
     """
-    # Get latest supervisor log
-    result = await db.execute(
-        select(SupervisorLog)
+    previous = (
+        select(
+            SupervisorLog.id,
+            SupervisorLog.redakteur_entscheidung.label("alt_entscheidung"),
+            SupervisorLog.abweichung.label("alt_abweichung"),
+        )
         .where(SupervisorLog.artikel_id == artikel_id)
         .order_by(SupervisorLog.erstellt_am.desc())
         .limit(1)
+        .with_for_update()
+        .subquery("previous")
     )
-    sv = result.scalar_one_or_none()
+    result = await db.execute(
+        update(SupervisorLog)
+        .where(SupervisorLog.id == previous.c.id)
+        .values(
+            redakteur_entscheidung=entscheidung,
+            redakteur_feedback=feedback,
+            abweichung=SupervisorLog.supervisor_empfehlung.is_distinct_from(entscheidung),
+        )
+        .returning(
+            SupervisorLog.tonality_tags,
+            SupervisorLog.supervisor_score,
+            SupervisorLog.abweichung,
+            SupervisorLog.erstellt_am,
+            previous.c.alt_entscheidung,
+            previous.c.alt_abweichung,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    if row is None:
+        return None
 
-    if sv:
-        sv.redakteur_entscheidung = entscheidung
-        sv.redakteur_feedback = feedback
-        sv.abweichung = sv.supervisor_empfehlung != entscheidung
+    counted = row.alt_entscheidung is not None
+    delta_decisions = 0 if counted else 1
+    delta_deviations = int(bool(row.abweichung)) - int(counted and bool(row.alt_abweichung))
+    if delta_decisions or delta_deviations:
+        await _bump_deviation_counters(
+            db, kategorie, _week_start(row.erstellt_am), delta_decisions, delta_deviations,
+        )
+    return row.tonality_tags or [], row.supervisor_score
 
-        # On approval: reinforce tonality tags
-        if entscheidung == "freigeben" and sv.tonality_tags:
-            await update_tonality_profile(db, sv.tonality_tags)
-            await decay_unused_tags(db, sv.tonality_tags)
 
-    # Get article for category
-    art_result = await db.execute(
-        select(RedaktionsLog).where(RedaktionsLog.id == artikel_id)
+async def process_editor_decision(
+    db: AsyncSession,
+    artikel_id: int,
+    entscheidung: str,
+    feedback: str | None = None,
+    kategorie: str | None = None,
+):
+    """Process an editor's decision: update learning systems.
+
+    Called after approve/revise/reject to update:
+    - Supervisor log with editor decision and deviation flag (+ counters)
+    - Tonality profile (on approval)
+    - Topic ranking and the daily topic rollup
+
+    `kategorie` comes from the article the caller has already loaded, so the
+    whole decision runs as a fixed number of set-based statements.
+    """
+    recorded = await record_editor_decision(db, artikel_id, entscheidung, feedback, kategorie)
+    tags, score = recorded or ([], None)
+
+    # On approval: reinforce tonality tags
+    if entscheidung == "freigeben" and tags:
+        await update_tonality_profile(db, tags)
+        await decay_unused_tags(db, tags)
+
+    await update_themen_ranking(
+        db,
+        kategorie=kategorie,
+        approved=(entscheidung == "freigeben"),
+    )
+    await update_daily_rollup(
+        db,
+        kategorie,
+        freigegeben=int(entscheidung == "freigeben"),
+        abgelehnt=int(entscheidung != "freigeben"),
+        score=score,
     )
-    artikel = art_result.scalar_one_or_none()
+    dashboard_cache.invalidate_on_commit(db)
 
-    if artikel:
-        await update_themen_ranking(
-            db,
-            kategorie=artikel.kategorie,
-            approved=(entscheidung == "freigeben"),
-        )
 
+async def get_windowed_ranking(
+    db: AsyncSession,
+    days: int = 30,
+    limit: int = 20,
+) -> list[dict]:
+    """Topic ranking over the last `days` days from the daily rollup.
 
-async def get_deviation_stats(db: AsyncSession) -> dict:
-    """Get overall deviation statistics for the supervisor dashboard."""
-    total = await db.execute(
-        select(func.count(SupervisorLog.id)).where(
-            SupervisorLog.redakteur_entscheidung.isnot(None)
+    Sorted by articles created in the window; rates and averages are
+    None when the window has no decisions/scores for a kategorie.
+    """
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    erstellt = func.sum(ThemenTagesStatistik.erstellt)
+    freigegeben = func.sum(ThemenTagesStatistik.freigegeben)
+    abgelehnt = func.sum(ThemenTagesStatistik.abgelehnt)
+    result = await db.execute(
+        select(
+            ThemenTagesStatistik.kategorie,
+            erstellt.label("erstellt"),
+            freigegeben.label("freigegeben"),
+            abgelehnt.label("abgelehnt"),
+            func.sum(ThemenTagesStatistik.score_summe).label("score_summe"),
+            func.sum(ThemenTagesStatistik.score_anzahl).label("score_anzahl"),
+            func.max(ThemenTagesStatistik.tag).label("letzter_tag"),
         )
+        .where(ThemenTagesStatistik.tag >= since)
+        .group_by(ThemenTagesStatistik.kategorie)
+        .order_by(erstellt.desc(), (freigegeben + abgelehnt).desc())
+        .limit(limit)
     )
-    total_count = total.scalar() or 0
+    ranking = []
+    for r in result:
+        decisions = r.freigegeben + r.abgelehnt
+        ranking.append({
+            "kategorie": r.kategorie or None,
+            "erstellt": r.erstellt,
+            "freigegeben": r.freigegeben,
+            "abgelehnt": r.abgelehnt,
+            "freigabe_rate": r.freigegeben / decisions if decisions else None,
+            "avg_score": r.score_summe / r.score_anzahl if r.score_anzahl else None,
+            "letzter_tag": r.letzter_tag.isoformat(),
+        })
+    return ranking
 
-    deviations = await db.execute(
-        select(func.count(SupervisorLog.id)).where(
-            SupervisorLog.abweichung.is_(True)
-        )
+
+def _rate(total: int, deviations: int) -> float:
+    return (deviations / total * 100) if total > 0 else 0
+
+
+async def get_deviation_stats(db: AsyncSession, kategorie: str | None = None) -> dict:
+    """Get deviation statistics for the supervisor dashboard.
+
+    Sums the running counters (one row per kategorie and week) instead of
+    counting supervisor_log. `kategorie` restricts to one category ("" for
+    articles without one).
+    """
+    stmt = select(
+        func.coalesce(func.sum(AbweichungsStatistik.entscheidungen), 0),
+        func.coalesce(func.sum(AbweichungsStatistik.abweichungen), 0),
     )
-    deviation_count = deviations.scalar() or 0
+    if kategorie is not None:
+        stmt = stmt.where(AbweichungsStatistik.kategorie == kategorie)
+    total_count, deviation_count = (await db.execute(stmt)).one()
 
     return {
         "total_decisions": total_count,
         "deviations": deviation_count,
-        "deviation_rate": (deviation_count / total_count * 100) if total_count > 0 else 0,
+        "deviation_rate": _rate(total_count, deviation_count),
     }
+
+
+async def get_deviation_trend(
+    db: AsyncSession,
+    weeks: int = 12,
+    kategorie: str | None = None,
+) -> list[dict]:
+    """Deviation rate per week for the last `weeks` weeks, oldest first.
+
+    Weeks without decisions are included with zero counts.
+    """
+    first_week = _week_start(datetime.utcnow()) - timedelta(weeks=weeks - 1)
+    stmt = (
+        select(
+            AbweichungsStatistik.woche,
+            func.sum(AbweichungsStatistik.entscheidungen),
+            func.sum(AbweichungsStatistik.abweichungen),
+        )
+        .where(AbweichungsStatistik.woche >= first_week)
+        .group_by(AbweichungsStatistik.woche)
+    )
+    if kategorie is not None:
+        stmt = stmt.where(AbweichungsStatistik.kategorie == kategorie)
+    counts = {woche: (total, dev) for woche, total, dev in (await db.execute(stmt)).all()}
+
+    trend = []
+    for i in range(weeks):
+        woche = first_week + timedelta(weeks=i)
+        total, dev = counts.get(woche, (0, 0))
+        trend.append({
+            "woche": woche.isoformat(),
+            "total_decisions": total,
+            "deviations": dev,
+            "deviation_rate": _rate(total, dev),
+        })
+    return trend
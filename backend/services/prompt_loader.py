@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -12,6 +13,7 @@ if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+WORKFLOWS_DIR = PROMPTS_DIR / "workflows"
 
 
 @lru_cache(maxsize=32)
@@ -24,6 +26,16 @@ def load_prompt(name: str) -> dict:
         return yaml.safe_load(f)
 
 
+@lru_cache(maxsize=32)
+def load_workflow(filename: str) -> dict:
+    """Load a ComfyUI API-format workflow (.json or .yaml) from prompts/workflows/."""
+    path = WORKFLOWS_DIR / filename
+    if not path.exists():
+        raise FileNotFoundError(f"Workflow '{filename}' not found at {path}")
+    with open(path) as f:
+        return json.load(f) if path.suffix == ".json" else yaml.safe_load(f)
+
+
 def render_prompt(name: str, **kwargs: str) -> str:
     """Load a prompt template and render it with the given variables."""
     data = load_prompt(name)
@@ -32,19 +44,14 @@ def render_prompt(name: str, **kwargs: str) -> str:
 
 
 async def load_tonality_summary(db: AsyncSession, top_n: int = 5) -> str:
-    """Load top-N tonality traits sorted by weight as a comma-separated string."""
-    from sqlalchemy import select
-    from db.models import TonalityProfil
+    """Top-N tonality traits sorted by weight as a comma-separated string.
+
+    Served from the shared tonality snapshot, so repeated renders make no queries.
+    """
+    from services.tonality_cache import get_snapshot
 
-    result = await db.execute(
-        select(TonalityProfil.merkmal, TonalityProfil.wert)
-        .order_by(TonalityProfil.gewichtung.desc())
-        .limit(top_n)
-    )
-    rows = result.all()
-    if not rows:
-        return "keine Tonalitaet definiert"
-    return ", ".join(f"{r.merkmal}: {r.wert}" for r in rows)
+    snapshot = await get_snapshot(db)
+    return snapshot.summarize(top_n)
 
 
 async def render_prompt_with_context(
@@ -56,7 +63,7 @@ async def render_prompt_with_context(
     """Render a prompt template with standard article variables auto-filled.
 
     Extracts {titel}, {lead}, {body}, {kategorie}, {sprache} from the artikel
-    object and loads {tonalitaet} from the TonalityProfil table.
+    object and loads {tonalitaet} from the cached tonality snapshot.
     Extra kwargs override auto-filled values.
     """
     # Standard-Variablen aus Artikel-Objekt extrahieren
@@ -7,8 +7,9 @@ from datetime import datetime
 from sqlalchemy import select, and_
 
 from db.models import RedaktionsLog
-from db.session import async_session
+from db.session import background_session
 from services.n8n_client import trigger_article_generation
+from services.webhook_ingest import prune_ingest_log
 from ws import manager
 
 logger = logging.getLogger(__name__)
@@ -17,7 +18,7 @@ logger = logging.getLogger(__name__)
 async def check_timeouts() -> int:
     """Find timed-out articles and retry or mark as timeout. Returns count processed."""
     count = 0
-    async with async_session() as db:
+    async with background_session() as db:
         result = await db.execute(
             select(RedaktionsLog).where(
                 and_(
@@ -41,6 +42,7 @@ async def check_timeouts() -> int:
                 # Add 10 more minutes
                 from datetime import timedelta
                 row.timeout_at = datetime.utcnow() + timedelta(minutes=10)
+                row.last_step = None
                 row.aktualisiert_am = datetime.utcnow()
 
                 await trigger_article_generation(
@@ -69,13 +71,24 @@ async def check_timeouts() -> int:
     return count
 
 
+async def prune_webhook_log() -> int:
+    """Apply the webhook ingest log retention. Returns the number of deleted rows."""
+    async with background_session() as db:
+        deleted = await prune_ingest_log(db)
+        await db.commit()
+    return deleted
+
+
 async def watchdog_loop(interval: int = 60) -> None:
-    """Run check_timeouts periodically."""
+    """Run check_timeouts and the webhook log retention periodically."""
     while True:
         try:
             processed = await check_timeouts()
             if processed > 0:
                 logger.info("Watchdog processed %d timed-out articles", processed)
+            pruned = await prune_webhook_log()
+            if pruned > 0:
+                logger.info("Watchdog pruned %d webhook ingest log rows", pruned)
         except Exception:
             logger.exception("Watchdog error")
         await asyncio.sleep(interval)
@@ -99,7 +99,8 @@ async def get_image_from_output(output: dict) -> bytes | None:
 
     if b64_data:
         try:
-            return base64.b64decode(b64_data)
+            # Multi-MB payloads: decode on a worker thread, not the event loop
+            return await asyncio.to_thread(base64.b64decode, b64_data)
         except Exception:
             pass
 
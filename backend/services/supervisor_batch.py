@@ -0,0 +1,127 @@
+"""Batch supervisor evaluation: many articles, bounded concurrency, rate-limited.
+
+Runs `evaluate_article` for a list of preloaded articles, writes the results
+in bulk and reports aggregate progress over the WebSocket.
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import insert
+
+from config import settings
+from db.models import SupervisorLog
+from services import dashboard_cache, evaluation_cache
+from services.supervisor_agent import evaluate_article
+from ws import manager
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK = 50
+
+
+class _RateLimiter:
+    """Spaces request starts to stay under `rate` requests per second."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def run_evaluation_batch(
+    batch_id: str,
+    items: list[dict],
+    tonality_context: str,
+    session_factory,
+):
+    """Evaluate items ({artikel_id, titel, lead, body, kategorie}). Background task.
+
+    Items whose evaluation input is unchanged are served from the evaluation
+    cache (one lookup query for the whole batch) without calling Mistral.
+    """
+    total = len(items)
+    counters = {"done": 0, "evaluated": 0, "cached": 0, "failed": 0}
+    progress_every = max(1, total // 20)
+    pending: list[dict] = []
+    write_lock = asyncio.Lock()
+    semaphore = asyncio.Semaphore(settings.supervisor_batch_concurrency)
+    limiter = _RateLimiter(settings.mistral_rate_limit_rps)
+
+    async def flush():
+        async with write_lock:
+            if not pending:
+                return
+            rows = pending[:]
+            pending.clear()
+            async with session_factory() as db:
+                await db.execute(insert(SupervisorLog), rows)
+                await db.commit()
+            dashboard_cache.invalidate()
+
+    keys = {
+        item["artikel_id"]: evaluation_cache.cache_key(
+            item["titel"], item["lead"] or "", item["body"], item["kategorie"], tonality_context,
+        )
+        for item in items
+    }
+    async with session_factory() as db:
+        cached = await evaluation_cache.lookup(db, list(keys.values()))
+
+    to_evaluate = []
+    for item in items:
+        key = keys[item["artikel_id"]]
+        if key in cached:
+            pending.append(evaluation_cache.to_row(item["artikel_id"], key, cached[key]))
+            counters["cached"] += 1
+            counters["done"] += 1
+        else:
+            to_evaluate.append(item)
+
+    async def evaluate_one(item: dict):
+        async with semaphore:
+            await limiter.wait()
+            result = await evaluate_article(
+                titel=item["titel"],
+                lead=item["lead"] or "",
+                body=item["body"],
+                kategorie=item["kategorie"],
+                tonality_profile=tonality_context,
+            )
+
+        counters["done"] += 1
+        if result:
+            counters["evaluated"] += 1
+            pending.append(evaluation_cache.to_row(item["artikel_id"], keys[item["artikel_id"]], result))
+            if len(pending) >= INSERT_CHUNK:
+                await flush()
+        else:
+            counters["failed"] += 1
+
+        if counters["done"] % progress_every == 0 and counters["done"] < total:
+            await manager.broadcast("supervisor:batch_progress", {
+                "batch_id": batch_id, "total": total, **counters,
+            })
+
+    try:
+        await asyncio.gather(*(evaluate_one(item) for item in to_evaluate))
+    finally:
+        try:
+            await flush()
+        except Exception:
+            logger.exception("Supervisor batch %s: failed to store results", batch_id)
+
+    await manager.broadcast("supervisor:batch_complete", {
+        "batch_id": batch_id, "total": total, **counters,
+    })
@@ -0,0 +1,98 @@
+"""Versioned in-memory snapshot of the tonality profile.
+
+The supervisor evaluation and prompt rendering both need the profile as
+preformatted text. The snapshot loads it once, precomputes both strings and
+is reused until a committed write invalidates it (learning updates,
+tonality CRUD).
+A short TTL bounds staleness across worker processes, which each hold
+their own snapshot.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.hooks import on_commit
+from db.models import TonalityProfil
+from services.supervisor_agent import build_tonality_context
+
+SUMMARY_TOP_N = 5
+
+
+@dataclass(frozen=True)
+class TonalitySnapshot:
+    version: int
+    entries: list[dict] = field(default_factory=list)  # sorted by gewichtung desc
+    context: str = ""  # supervisor evaluation context
+    summary: str = ""  # top-N "merkmal: wert" list for prompt rendering
+    loaded_at: float = 0.0
+
+    def summarize(self, top_n: int = SUMMARY_TOP_N) -> str:
+        if top_n == SUMMARY_TOP_N:
+            return self.summary
+        return _format_summary(self.entries, top_n)
+
+
+_version = 0
+_snapshot: TonalitySnapshot | None = None
+
+
+def _format_summary(entries: list[dict], top_n: int) -> str:
+    if not entries:
+        return "keine Tonalitaet definiert"
+    return ", ".join(f"{e['merkmal']}: {e['wert']}" for e in entries[:top_n])
+
+
+def invalidate() -> None:
+    """Drop the snapshot; call after any committed write to TonalityProfil."""
+    global _version, _snapshot
+    _version += 1
+    _snapshot = None
+
+
+def invalidate_on_commit(db: AsyncSession) -> None:
+    """Invalidate once the write pending in `db` is committed."""
+    on_commit(db, invalidate)
+
+
+def current_version() -> int:
+    return _version
+
+
+async def get_snapshot(db: AsyncSession) -> TonalitySnapshot:
+    """Return the cached snapshot, loading it with one query if missing or expired."""
+    global _snapshot
+    snap = _snapshot
+    if snap is not None and time.monotonic() - snap.loaded_at < settings.tonality_cache_ttl:
+        return snap
+
+    version = _version
+    result = await db.execute(
+        select(TonalityProfil).order_by(TonalityProfil.gewichtung.desc())
+    )
+    entries = [
+        {
+            "id": p.id,
+            "merkmal": p.merkmal,
+            "wert": p.wert,
+            "gewichtung": p.gewichtung,
+            "belege": p.belege,
+        }
+        for p in result.scalars()
+    ]
+    snap = TonalitySnapshot(
+        version=version,
+        entries=entries,
+        context=await build_tonality_context(entries),
+        summary=_format_summary(entries, SUMMARY_TOP_N),
+        loaded_at=time.monotonic(),
+    )
+    # A write during the load bumped the version — don't cache the old data
+    if version == _version:
+        _snapshot = snap
+    return snap
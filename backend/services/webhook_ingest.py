@@ -0,0 +1,390 @@
+"""n8n callback ingestion: apply callbacks to the DB, directly or write-behind.
+
+`apply_callback` holds the write logic shared by the synchronous webhook and
+the `WebhookQueue` consumer, which drains bursts of accepted callbacks and
+applies them in grouped transactions on a single pooled connection.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.models import (
+    RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung, SupervisorLog, WebhookDeadLetter, WebhookIngestLog,
+)
+from db.schemas import N8nCallback
+from services import dashboard_cache
+from ws import manager
+
+logger = logging.getLogger(__name__)
+
+# Archive fields copied from the callback when set (falsy values keep the stored value)
+_ARCHIV_FIELDS = ("lead", "body", "quellen", "seo_titel", "seo_description", "bild_prompt")
+_TRANSLATION_FIELDS = ("titel", "lead", "body", "status")
+
+
+async def apply_callback(db: AsyncSession, payload: N8nCallback) -> dict | None:
+    """Apply one n8n callback. Returns the response dict, or None if the article is unknown.
+
+    The whole callback is one statement (`_callback_statement`): the article
+    row is locked, the ingest log insert, the guarded article update and the
+    archive, translation and supervisor writes are data-modifying CTEs keyed
+    on the updated row, so a callback costs a single round trip.
+
+    Callbacks carrying an idempotency_key or step are recorded in the ingest
+    log (pruned after `webhook_ingest_retention_days`). A repeated
+    idempotency_key is acknowledged without being applied again, and a
+    callback whose step is lower than the last applied step is logged as
+    stale and ignored, so a late retry cannot roll the article back to an
+    earlier status.
+    """
+    logged = payload.idempotency_key is not None or payload.step is not None
+    result = await db.execute(_callback_statement(payload, logged))
+    row = result.one()
+    if logged and not row.logged:
+        return {"ok": True, "artikel_id": payload.artikel_id, "duplicate": True}
+    if row.id is None:
+        if payload.step is not None and row.current_status is not None:
+            return {
+                "ok": True, "artikel_id": payload.artikel_id,
+                "status": row.current_status, "stale": True,
+            }
+        return None
+    if payload.supervisor:
+        dashboard_cache.invalidate_on_commit(db)
+    return {"ok": True, "artikel_id": row.id, "status": row.status, "titel": row.titel}
+
+
+def _bind(column, value):
+    return literal(value, column.type)
+
+
+def _callback_statement(payload: N8nCallback, logged: bool):
+    """Build the single statement applying `payload`.
+
+    Data-modifying CTEs run exactly once whether or not the final SELECT
+    reads them, and all of them see the snapshot taken before the statement,
+    so every dependent write selects from the `article` CTE's RETURNING row
+    instead of the table. The result row has `logged` (ingest log row
+    inserted), `current_status` (status before the update, None for an
+    unknown article) and the updated `id`, `titel`, `status` (None unless
+    applied).
+    """
+    now = datetime.utcnow()
+    # FOR UPDATE waits for a concurrent callback on the same article and
+    # then sees its last_step, so the stale check and the update agree
+    current = (
+        select(RedaktionsLog.id, RedaktionsLog.last_step, RedaktionsLog.status)
+        .where(RedaktionsLog.id == payload.artikel_id)
+        .with_for_update()
+        .cte("current_article")
+    )
+    applies = select(current.c.id)
+    if payload.step is not None:
+        # Same step is allowed so parallel n8n branches of one stage all apply
+        applies = applies.where(or_(current.c.last_step.is_(None), current.c.last_step <= payload.step))
+
+    ctes = []
+    ingest = None
+    if logged:
+        ergebnis = literal("applied")
+        if payload.step is not None:
+            behind = exists(select(current.c.id).where(current.c.last_step > payload.step))
+            ergebnis = case((behind, "stale"), else_="applied")
+        ingest = (
+            pg_insert(WebhookIngestLog)
+            .from_select(
+                ["artikel_id", "idempotency_key", "step", "status", "ergebnis", "empfangen_am"],
+                select(
+                    _bind(WebhookIngestLog.artikel_id, payload.artikel_id),
+                    _bind(WebhookIngestLog.idempotency_key, payload.idempotency_key),
+                    _bind(WebhookIngestLog.step, payload.step),
+                    _bind(WebhookIngestLog.status, payload.status),
+                    ergebnis,
+                    _bind(WebhookIngestLog.empfangen_am, now),
+                ),
+                include_defaults=False,
+            )
+            .on_conflict_do_nothing(index_elements=[WebhookIngestLog.idempotency_key])
+            .returning(WebhookIngestLog.id)
+            .cte("ingest")
+        )
+        # A duplicate inserts no ingest row and so applies nothing
+        applies = applies.where(exists(select(ingest.c.id)))
+
+    values: dict = {"status": payload.status, "aktualisiert_am": now}
+    if payload.titel:
+        values["titel"] = payload.titel
+    if payload.step is not None:
+        values["last_step"] = payload.step
+    article = (
+        update(RedaktionsLog)
+        .where(RedaktionsLog.id.in_(applies))
+        .values(**values)
+        .returning(RedaktionsLog.id, RedaktionsLog.titel, RedaktionsLog.status)
+        .cte("article")
+    )
+
+    # Upsert article archive content
+    if payload.body or payload.lead:
+        fields = [f for f in _ARCHIV_FIELDS if getattr(payload, f)]
+        stmt = pg_insert(ArtikelArchiv).from_select(
+            ["redaktions_log_id", "titel", *fields, "erstellt_am"],
+            select(
+                article.c.id, article.c.titel,
+                *(_bind(getattr(ArtikelArchiv, f), getattr(payload, f)) for f in fields),
+                _bind(ArtikelArchiv.erstellt_am, now),
+            ),
+            include_defaults=False,
+        )
+        if payload.titel:
+            fields.append("titel")
+        ctes.append(stmt.on_conflict_do_update(
+            index_elements=[ArtikelArchiv.redaktions_log_id],
+            set_={f: stmt.excluded[f] for f in fields},
+        ).cte("archive"))
+
+    # Upsert translations — one CTE per language, since the updated fields may differ
+    for i, (lang, data) in enumerate((payload.translations or {}).items()):
+        fields = [f for f in _TRANSLATION_FIELDS if f in data]
+        inserted = {"status": "pending", **{f: data[f] for f in fields}, "erstellt_am": now}
+        stmt = pg_insert(ArtikelUebersetzung).from_select(
+            ["artikel_id", "sprache", *inserted],
+            select(
+                article.c.id, _bind(ArtikelUebersetzung.sprache, lang),
+                *(_bind(getattr(ArtikelUebersetzung, f), v) for f, v in inserted.items()),
+            ),
+            include_defaults=False,
+        )
+        index_elements = [ArtikelUebersetzung.artikel_id, ArtikelUebersetzung.sprache]
+        if fields:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements, set_={f: stmt.excluded[f] for f in fields},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        ctes.append(stmt.cte(f"translation_{i}"))
+
+    # Insert supervisor result
+    if payload.supervisor:
+        ctes.append(insert(SupervisorLog).from_select(
+            [
+                "artikel_id", "supervisor_empfehlung", "supervisor_begruendung",
+                "supervisor_score", "tonality_tags", "abweichung", "erstellt_am",
+            ],
+            select(
+                article.c.id,
+                _bind(SupervisorLog.supervisor_empfehlung, payload.supervisor.get("empfehlung")),
+                _bind(SupervisorLog.supervisor_begruendung, payload.supervisor.get("begruendung")),
+                _bind(SupervisorLog.supervisor_score, payload.supervisor.get("score")),
+                _bind(SupervisorLog.tonality_tags, payload.supervisor.get("tonality_tags")),
+                _bind(SupervisorLog.abweichung, False),
+                _bind(SupervisorLog.erstellt_am, now),
+            ),
+            include_defaults=False,
+        ).cte("supervisor"))
+
+    logged_flag = exists(select(ingest.c.id)) if ingest is not None else literal(False)
+    return select(
+        logged_flag.label("logged"),
+        select(current.c.status).scalar_subquery().label("current_status"),
+        select(article.c.id).scalar_subquery().label("id"),
+        select(article.c.titel).scalar_subquery().label("titel"),
+        select(article.c.status).scalar_subquery().label("status"),
+    ).add_cte(*ctes)
+
+
+async def prune_ingest_log(db: AsyncSession) -> int:
+    """Delete ingest log rows older than `webhook_ingest_retention_days`. Returns the count."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.webhook_ingest_retention_days)
+    result = await db.execute(delete(WebhookIngestLog).where(WebhookIngestLog.empfangen_am < cutoff))
+    return result.rowcount
+
+
+async def broadcast_applied(result: dict) -> None:
+    """Broadcast the status update for an applied (not duplicate/stale) callback."""
+    if result.get("duplicate") or result.get("stale"):
+        return
+    await manager.broadcast("article:updated", {
+        "id": result["artikel_id"],
+        "titel": result["titel"],
+        "status": result["status"],
+    })
+
+
+class WebhookQueue:
+    """Bounded write-behind buffer for accepted n8n callbacks.
+
+    Callbacks were already acknowledged with 202, so none may be lost: a
+    batch taken off the queue is finished even if the consumer is cancelled,
+    and callbacks that fail twice are logged and stored in the
+    webhook_dead_letters table until they are replayed. Replay claims rows
+    with DELETE … RETURNING, so with several workers each letter is queued
+    once. `dead_letters` holds only letters that could not be stored yet
+    (database down); they are written on the next replay or on shutdown.
+    """
+
+    def __init__(self, maxsize: int = 1000, batch_size: int = 50) -> None:
+        self._queue: asyncio.Queue[N8nCallback] = asyncio.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self.dead_letters: list[N8nCallback] = []
+
+    def enqueue(self, payload: N8nCallback) -> bool:
+        """Queue a callback. Returns False if the buffer is full."""
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _take_batch(self, first: N8nCallback) -> list[N8nCallback]:
+        batch = [first]
+        while len(batch) < self._batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def run(self, session_factory) -> None:
+        """Consume the queue forever, applying whatever has piled up as one batch.
+
+        The batch runs shielded: on cancellation it is applied to the end
+        before the cancellation propagates.
+        """
+        while True:
+            first = await self._queue.get()
+            task = asyncio.ensure_future(self.apply_batch(self._take_batch(first), session_factory))
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                await task
+                raise
+            except Exception:
+                logger.exception("Webhook queue consumer error")
+
+    async def drain(self, session_factory) -> None:
+        """Apply everything still buffered (called on shutdown)."""
+        while not self._queue.empty():
+            await self.apply_batch(self._take_batch(self._queue.get_nowait()), session_factory)
+
+    async def _bury(self, payload: N8nCallback, session_factory) -> None:
+        """Store a callback that failed twice; kept in memory if that fails too."""
+        try:
+            async with session_factory() as db:
+                await db.execute(insert(WebhookDeadLetter).values(
+                    artikel_id=payload.artikel_id, payload=payload.model_dump(mode="json"),
+                ))
+                await db.commit()
+        except Exception:
+            logger.exception(
+                "Could not store dead letter for article %d: %s", payload.artikel_id, payload.model_dump_json(),
+            )
+            self.dead_letters.append(payload)
+
+    async def save_dead_letters(self, session_factory) -> None:
+        """Store the dead letters still held in memory (called on shutdown)."""
+        pending, self.dead_letters = self.dead_letters, []
+        for payload in pending:
+            await self._bury(payload, session_factory)
+
+    async def replay_dead_letters(self, session_factory) -> int:
+        """Claim stored dead letters and queue them again. Returns how many were queued.
+
+        Only as many as fit into the queue are claimed; the rest stay stored.
+        """
+        await self.save_dead_letters(session_factory)
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return 0
+        claim = (
+            select(WebhookDeadLetter.id)
+            .order_by(WebhookDeadLetter.id)
+            .limit(room)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with session_factory() as db:
+            result = await db.execute(
+                delete(WebhookDeadLetter)
+                .where(WebhookDeadLetter.id.in_(claim))
+                .returning(WebhookDeadLetter.payload)
+            )
+            payloads = [N8nCallback.model_validate(data) for data in result.scalars()]
+            await db.commit()
+        for payload in payloads:
+            self.enqueue(payload)
+        return len(payloads)
+
+    @staticmethod
+    async def count_dead_letters(session_factory) -> int:
+        async with session_factory() as db:
+            result = await db.execute(select(func.count()).select_from(WebhookDeadLetter))
+            return result.scalar_one_or_none() or 0
+
+    async def apply_batch(self, batch: list[N8nCallback], session_factory) -> None:
+        """Apply a batch in one transaction, isolating each callback in a savepoint.
+
+        Callbacks that fail in the batch are retried in their own transaction;
+        if that fails too they become dead letters.
+        """
+        results: list[dict] = []
+        retry: list[N8nCallback] = []
+        try:
+            async with session_factory() as db:
+                for payload in batch:
+                    ok, result = await self._apply_one(db, payload)
+                    if not ok:
+                        retry.append(payload)
+                    elif result:
+                        results.append(result)
+                await db.commit()
+        except Exception:
+            # Commit failed — fall back to one transaction per callback
+            logger.exception("Webhook batch of %d failed, retrying individually", len(batch))
+            results, retry = [], list(batch)
+
+        for payload in retry:
+            try:
+                async with session_factory() as db:
+                    result = await apply_callback(db, payload)
+                    await db.commit()
+            except Exception:
+                logger.exception(
+                    "n8n callback for article %d failed twice, kept for replay: %s",
+                    payload.artikel_id, payload.model_dump_json(),
+                )
+                await self._bury(payload, session_factory)
+                continue
+            if result is None:
+                logger.warning("n8n callback for unknown article %d dropped", payload.artikel_id)
+            else:
+                results.append(result)
+
+        for result in results:
+            await broadcast_applied(result)
+
+    @staticmethod
+    async def _apply_one(db: AsyncSession, payload: N8nCallback) -> tuple[bool, dict | None]:
+        """Apply in a savepoint. Returns (ok, result); ok is False if it raised."""
+        try:
+            async with db.begin_nested():
+                result = await apply_callback(db, payload)
+        except Exception:
+            logger.exception("Failed to apply n8n callback for article %d", payload.artikel_id)
+            return False, None
+        if result is None:
+            logger.warning("n8n callback for unknown article %d dropped", payload.artikel_id)
+        return True, result
+
+
+webhook_queue = WebhookQueue(
+    maxsize=settings.webhook_queue_size,
+    batch_size=settings.webhook_batch_size,
+)
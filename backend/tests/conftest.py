@@ -54,3 +54,56 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     async with AsyncClient(transport=transport, base_url="http://test") as c:
         yield c
     app.dependency_overrides.clear()
+
+
+class FakeResult:
+    """Result stand-in: `value` is a scalar, a row object or a list of rows."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+    def one(self):
+        return self._value
+
+    def scalars(self):
+        return iter(self._value)
+
+
+class FakeSession:
+    """AsyncSession stand-in for unit tests that need no database.
+
+    Successive execute() calls return the queued `results` in order (the
+    last one repeats); executed statements and parameters are recorded.
+    """
+
+    def __init__(self, results: list | None = None):
+        self.results = list(results or [])
+        self.executed: list[tuple] = []
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        self.executed.append((stmt, params))
+        if not self.results:
+            return FakeResult(None)
+        return FakeResult(self.results.pop(0) if len(self.results) > 1 else self.results[0])
+
+    def begin_nested(self):
+        return self
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def fake_session():
+    """The FakeSession class, for tests that run services without Postgres."""
+    return FakeSession
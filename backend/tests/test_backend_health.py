@@ -0,0 +1,106 @@
+import pytest
+
+from services import backend_health
+from services.backend_health import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(backend_health.time, "monotonic", lambda: now[0])
+    return now
+
+
+COMFY = "http://c1:8188"
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(backend_health, "breakers", {})
+    monkeypatch.setattr(backend_health, "_healthy", {})
+    monkeypatch.setattr(backend_health, "_checked_at", {})
+    monkeypatch.setattr(backend_health, "_queue_depth", {})
+    monkeypatch.setattr(backend_health.settings, "image_circuit_failure_threshold", 2)
+    monkeypatch.setattr(backend_health.settings, "image_circuit_reset_timeout", 30)
+    monkeypatch.setattr(backend_health.comfyui_client, "endpoints", lambda: [COMFY])
+
+
+def test_breaker_opens_after_threshold_and_half_opens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock[0] += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_select_backend_uses_cached_probe(monkeypatch, clock):
+    probes = []
+
+    async def comfy_down(url):
+        probes.append(url)
+        return None
+
+    async def runpod_configured():
+        return True
+
+    monkeypatch.setattr(backend_health.comfyui_client, "queue_depth", comfy_down)
+    monkeypatch.setattr(backend_health.runpod_client, "is_configured", runpod_configured)
+
+    assert await backend_health.select_backend() == "runpod"
+    assert await backend_health.select_backend() == "runpod"
+    assert probes == [COMFY]
+    assert backend_health.status()[COMFY]["circuit"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_job_failures_skip_backend(monkeypatch, clock):
+    backend_health._healthy.update({COMFY: True, "runpod": True})
+    backend_health._checked_at.update({COMFY: clock[0], "runpod": clock[0]})
+
+    assert await backend_health.acquire(COMFY)
+    backend_health.record_result(COMFY, False)
+    backend_health.record_result(COMFY, False)
+
+    assert not await backend_health.acquire(COMFY)
+    assert await backend_health.select_backend() == "runpod"
+
+
+@pytest.mark.asyncio
+async def test_ranking_uses_probed_queue_depth(monkeypatch, clock):
+    other = "http://c2:8188"
+    probes = []
+
+    async def depth(url):
+        probes.append(url)
+        return {COMFY: 1, other: 2}[url]
+
+    async def runpod_configured():
+        return False
+
+    monkeypatch.setattr(backend_health.comfyui_client, "endpoints", lambda: [COMFY, other])
+    monkeypatch.setattr(backend_health.comfyui_client, "queue_depth", depth)
+    monkeypatch.setattr(backend_health.runpod_client, "is_configured", runpod_configured)
+
+    assert await backend_health.ranked_comfyui() == [COMFY, other]
+    # Dispatched jobs count until their result is recorded, without new probes
+    assert await backend_health.acquire(COMFY)
+    assert await backend_health.acquire(COMFY)
+    assert await backend_health.ranked_comfyui() == [other, COMFY]
+    backend_health.record_result(COMFY, True)
+    backend_health.record_result(COMFY, True)
+    assert await backend_health.ranked_comfyui() == [COMFY, other]
+    assert probes == [COMFY, other]
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+from services import comfyui_client
+
+
+class FakeSocket:
+    def __init__(self, messages: list):
+        self._messages = [m if isinstance(m, bytes) else json.dumps(m) for m in messages]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._messages:
+            raise StopAsyncIteration
+        return self._messages.pop(0)
+
+
+IMAGE = {"filename": "clnpth_1.png", "subfolder": "", "type": "output"}
+
+
+@pytest.mark.asyncio
+async def test_socket_relays_progress_and_collects_images():
+    progress = []
+
+    async def on_progress(value, maximum):
+        progress.append((value, maximum))
+
+    ws = FakeSocket([
+        {"type": "status", "data": {"status": {}}},
+        {"type": "progress", "data": {"value": 1, "max": 2, "prompt_id": "p1"}},
+        b"\x00preview",
+        {"type": "progress", "data": {"value": 5, "max": 9, "prompt_id": "other"}},
+        {"type": "progress", "data": {"value": 2, "max": 2, "prompt_id": "p1"}},
+        {"type": "executed", "data": {"node": "9", "output": {"images": [IMAGE]}, "prompt_id": "p1"}},
+        {"type": "executing", "data": {"node": None, "prompt_id": "p1"}},
+        {"type": "progress", "data": {"value": 9, "max": 9, "prompt_id": "p1"}},
+    ])
+
+    status, images = await comfyui_client._follow_socket(ws, "p1", on_progress)
+
+    assert status == "completed"
+    assert images == {"9": [IMAGE]}
+    assert progress == [(1, 2), (2, 2)]
+
+
+@pytest.mark.asyncio
+async def test_socket_reports_execution_error():
+    ws = FakeSocket([{"type": "execution_error", "data": {"prompt_id": "p1"}}])
+    assert await comfyui_client._follow_socket(ws, "p1", None) == ("failed", {})
+
+
+@pytest.mark.asyncio
+async def test_socket_closed_before_completion():
+    ws = FakeSocket([{"type": "progress", "data": {"value": 1, "max": 2, "prompt_id": "p1"}}])
+    assert await comfyui_client._follow_socket(ws, "p1", None) == ("closed", {})
+
+
+def test_ws_url_follows_http_scheme(monkeypatch):
+    monkeypatch.setattr(comfyui_client.settings, "comfyui_url", "https://gpu.local:8188")
+    assert comfyui_client._ws_url("abc") == "wss://gpu.local:8188/ws?clientId=abc"
+
+
+def test_rank_endpoints_prefers_short_queue_and_loaded_model(monkeypatch):
+    depths = {"http://a": 2, "http://b": 1, "http://c": 1, "http://d": 9}
+    monkeypatch.setattr(comfyui_client.settings, "comfyui_max_queue", 4)
+    monkeypatch.setattr(comfyui_client, "_loaded_checkpoint", {"http://c": comfyui_client.CHECKPOINT})
+
+    assert comfyui_client.rank_endpoints(depths, comfyui_client.CHECKPOINT) == ["http://c", "http://b", "http://a"]
+    assert comfyui_client.rank_endpoints(depths, "flux.safetensors") == ["http://b", "http://c", "http://a"]
+    assert comfyui_client.rank_endpoints({"http://a": 4, "http://c": 5}) == []
+
+
+@pytest.mark.asyncio
+async def test_finished_workflow_records_its_checkpoint(monkeypatch):
+    async def no_socket(*args, **kwargs):
+        raise OSError
+
+    async def submit(client, workflow_data):
+        return {"prompt_id": "p1", "client_id": workflow_data["client_id"]}
+
+    async def history(client, prompt_id, timeout):
+        return "completed", {"outputs": {"9": {"images": [IMAGE]}}}
+
+    monkeypatch.setattr(comfyui_client.websockets, "connect", no_socket)
+    monkeypatch.setattr(comfyui_client, "_submit", submit)
+    monkeypatch.setattr(comfyui_client, "_poll_history", history)
+    monkeypatch.setattr(comfyui_client, "_loaded_checkpoint", {})
+
+    async with comfyui_client.httpx.AsyncClient(base_url="http://gpu-2:8188") as client:
+        images = await comfyui_client._run_workflow(
+            client, {"client_id": "c1"}, {"9"}, None, 5, checkpoint="flux.safetensors",
+        )
+
+    assert images == {"9": [IMAGE]}
+    assert comfyui_client._loaded_checkpoint == {"http://gpu-2:8188": "flux.safetensors"}
+
+
+def test_endpoints_from_pool_setting(monkeypatch):
+    monkeypatch.setattr(comfyui_client.settings, "comfyui_urls", "http://a:8188/, http://b:8188")
+    assert comfyui_client.endpoints() == ["http://a:8188", "http://b:8188"]
+    monkeypatch.setattr(comfyui_client.settings, "comfyui_urls", "")
+    assert comfyui_client.endpoints() == [comfyui_client.settings.comfyui_url.rstrip("/")]
+
+
+def test_single_workflow_keeps_node_layout():
+    workflow = comfyui_client.build_workflow("Hafen")["prompt"]
+    assert sorted(workflow) == ["3", "4", "5", "6", "7", "8", "9"]
+    assert workflow["3"]["inputs"]["latent_image"] == ["5", 0]
+
+
+def test_template_compiled_once_and_not_mutated():
+    template = comfyui_client.get_template("photo")
+    first = comfyui_client.build_workflow("Hafen", "photo")["prompt"]
+    second = comfyui_client.build_workflow("Markt", "photo")["prompt"]
+
+    assert comfyui_client.get_template("photo") is template
+    assert template.checkpoint == comfyui_client.CHECKPOINT
+    assert first["6"]["inputs"]["text"].endswith("Hafen")
+    assert second["6"]["inputs"]["text"].endswith("Markt")
+    assert first["3"]["inputs"]["seed"] == comfyui_client.seed_for("Hafen")
+    assert first["3"]["inputs"]["steps"] == 35
+    assert template.graph["6"]["inputs"]["text"] == "$prompt"
+    assert first["4"] is second["4"]
+
+
+def test_custom_workflow_file(tmp_path, monkeypatch):
+    graph = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "flux.safetensors"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": "$prompt", "clip": ["1", 1]}},
+        "3": {"class_type": "KSampler", "inputs": {"seed": "$seed", "steps": "$steps", "positive": ["2", 0]}},
+        "4": {"class_type": "SaveImage", "inputs": {"filename_prefix": "$filename_prefix", "images": ["3", 0]}},
+    }
+    (tmp_path / "grafik.json").write_text(json.dumps(graph))
+    monkeypatch.setattr(comfyui_client, "load_workflow", lambda name: json.loads((tmp_path / name).read_text()))
+    monkeypatch.setattr(comfyui_client, "_get_image_config", lambda: {
+        "styles": {"grafik": {"workflow": "grafik.json", "prefix": "chart, ", "steps": 12}},
+    })
+    comfyui_client.get_template.cache_clear()
+    try:
+        template = comfyui_client.get_template("grafik")
+        workflow = comfyui_client.build_workflow("Hafen", "grafik")["prompt"]
+    finally:
+        comfyui_client.get_template.cache_clear()
+
+    assert template.output_node == "4"
+    assert workflow["2"]["inputs"]["text"] == "chart, Hafen"
+    assert workflow["3"]["inputs"]["steps"] == 12
+    assert template.checkpoint == "flux.safetensors"
+    assert template.key[-1] == "grafik.json"
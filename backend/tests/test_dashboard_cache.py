@@ -0,0 +1,62 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services import dashboard_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    dashboard_cache.invalidate()
+    yield
+    dashboard_cache.invalidate()
+
+
+@pytest.fixture
+def fake_load(monkeypatch):
+    calls = []
+
+    async def _load(db):
+        calls.append(db)
+        return {"tonality_profile": [], "themen_ranking": [], "recent_decisions": [],
+                "deviation_stats": {"total_decisions": len(calls)}}
+
+    monkeypatch.setattr(dashboard_cache, "_load", _load)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_dashboard_is_reused_until_invalidated(fake_load):
+    first = await dashboard_cache.get_dashboard(None)
+    second = await dashboard_cache.get_dashboard(None)
+    assert first is second
+    assert len(fake_load) == 1
+
+    dashboard_cache.invalidate()
+    third = await dashboard_cache.get_dashboard(None)
+    assert len(fake_load) == 2
+    assert third.etag != first.etag
+
+
+@pytest.mark.asyncio
+async def test_load_during_uncommitted_write_is_not_kept(fake_load):
+    async with AsyncSession() as writer:
+        dashboard_cache.invalidate_on_commit(writer)
+        stale = await dashboard_cache.get_dashboard(None)
+        await writer.commit()
+
+    fresh = await dashboard_cache.get_dashboard(None)
+    assert len(fake_load) == 2
+    assert fresh.etag != stale.etag
+
+
+@pytest.mark.asyncio
+async def test_dashboard_etag_returns_304(client: AsyncClient, fake_load):
+    resp = await client.get("/api/supervisor/dashboard")
+    assert resp.status_code == 200
+    assert resp.json()["recent_decisions"] == []
+    etag = resp.headers["etag"]
+
+    resp = await client.get("/api/supervisor/dashboard", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
@@ -0,0 +1,20 @@
+from services import evaluation_cache
+
+
+def test_cache_key_is_stable_for_same_input():
+    a = evaluation_cache.cache_key("Titel", "Lead", "Body", "politik", "ctx")
+    b = evaluation_cache.cache_key("Titel", "Lead", "Body", "politik", "ctx")
+    assert a == b and len(a) == 64
+
+
+def test_cache_key_changes_with_content_and_profile():
+    base = evaluation_cache.cache_key("Titel", "Lead", "Body", "politik", "ctx")
+    assert evaluation_cache.cache_key("Titel", "Lead", "Body 2", "politik", "ctx") != base
+    assert evaluation_cache.cache_key("Titel", "Lead", "Body", "kultur", "ctx") != base
+    assert evaluation_cache.cache_key("Titel", "Lead", "Body", "politik", "ctx 2") != base
+
+
+def test_to_row_carries_hash():
+    row = evaluation_cache.to_row(7, "abc", {"empfehlung": "freigeben", "score": 80})
+    assert row["artikel_id"] == 7 and row["eval_hash"] == "abc"
+    assert row["supervisor_score"] == 80 and row["tonality_tags"] is None
@@ -0,0 +1,34 @@
+from services import comfyui_client, image_cache
+
+
+def test_request_key_depends_on_prompt_and_style():
+    key = image_cache.request_key("Hafen bei Nacht", "photo")
+    assert key == image_cache.request_key("Hafen bei Nacht", "photo")
+    assert key != image_cache.request_key("Hafen bei Tag", "photo")
+    assert key != image_cache.request_key("Hafen bei Nacht", "illustration")
+
+
+def test_seed_is_stable():
+    assert comfyui_client.seed_for("Hafen") == comfyui_client.seed_for("Hafen")
+    assert 0 <= comfyui_client.seed_for("Hafen") < 2**32
+
+
+def test_store_dedupes_and_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_cache.settings, "image_storage_path", str(tmp_path))
+
+    first = image_cache.store(b"png-bytes", "key-a")
+    second = image_cache.store(b"png-bytes", "key-b")
+
+    assert first == second
+    assert len(list(tmp_path.glob("*.png"))) == 1
+    assert image_cache.lookup("key-a") == first
+    assert image_cache.lookup("key-b") == first
+    assert image_cache.lookup("unknown") is None
+
+
+def test_store_names_file_after_detected_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_cache.settings, "image_storage_path", str(tmp_path))
+
+    assert image_cache.store(b"\x89PNG\r\n\x1a\nrest").endswith(".png")
+    assert image_cache.store(b"\xff\xd8\xff\xe0rest").endswith(".jpg")
+    assert image_cache.store(b"RIFF\x10\x00\x00\x00WEBPVP8 ").endswith(".webp")
@@ -0,0 +1,47 @@
+import pytest
+
+from services import image_derivatives
+
+
+MANIFEST = {
+    "original": "/static/images/abc.png",
+    "width": 1024,
+    "height": 1024,
+    "variants": [
+        {"url": "/static/images/abc_480.webp", "format": "webp", "width": 480, "height": 480, "bytes": 1},
+        {"url": "/static/images/abc_1024.avif", "format": "avif", "width": 1024, "height": 1024, "bytes": 1},
+        {"url": "/static/images/abc_1024.webp", "format": "webp", "width": 1024, "height": 1024, "bytes": 1},
+    ],
+}
+
+
+def test_preferred_upload_uses_full_size_webp():
+    assert image_derivatives.preferred_upload(MANIFEST["original"], MANIFEST) == "/static/images/abc_1024.webp"
+    assert image_derivatives.preferred_upload("/static/images/x.png", None) == "/static/images/x.png"
+
+
+@pytest.mark.asyncio
+async def test_manifest_skipped_without_encoders(monkeypatch):
+    monkeypatch.setattr(image_derivatives, "available_formats", lambda: [])
+    assert await image_derivatives.build_manifest("/static/images/abc.png") is None
+
+
+def test_render_variants(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "abc.png"
+    Image.new("RGB", (1024, 512), "white").save(source)
+
+    rendered = image_derivatives.render_variants(str(source), [480, 2048], ["webp"])
+
+    assert [(v["width"], v["height"]) for v in rendered["variants"]] == [(480, 240), (1024, 512)]
+    assert (tmp_path / "abc_480.webp").exists()
+
+
+def test_pool_spawns_workers(monkeypatch):
+    monkeypatch.setattr(image_derivatives, "_pool", None)
+    pool = image_derivatives._get_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        image_derivatives.shutdown()
+    assert image_derivatives._pool is None
@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import image_pipeline
+
+
+@pytest.fixture
+def no_side_effects(monkeypatch):
+    events: list[tuple] = []
+
+    async def broadcast(event, data):
+        events.append((event, data))
+
+    async def record(name, *args, **kwargs):
+        events.append((name, args, kwargs))
+
+    monkeypatch.setattr(image_pipeline.manager, "broadcast", broadcast)
+    monkeypatch.setattr(image_pipeline.image_cache, "lookup", lambda key: None)
+    monkeypatch.setattr(image_pipeline.image_jobs, "fail", lambda sf, job_id, error: record("fail", job_id, error))
+    monkeypatch.setattr(image_pipeline.image_jobs, "start", lambda sf, job_id, output, backend, remote: record(
+        "start", job_id, output, backend, remote,
+    ))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_pipeline_records_failed_job(monkeypatch, no_side_effects):
+    async def no_candidates():
+        return []
+
+    async def not_acquired(key):
+        return False
+
+    monkeypatch.setattr(image_pipeline.backend_health, "comfyui_candidates", no_candidates)
+    monkeypatch.setattr(image_pipeline.backend_health, "acquire", not_acquired)
+
+    await image_pipeline.run_image_pipeline(5, "Hafen", "photo", None, job_id=9)
+
+    assert ("fail", (9, "No image backend available"), {}) in no_side_effects
+    assert no_side_effects[-1] == ("image:failed", {"artikel_id": 5, "status": "failed"})
+
+
+@pytest.mark.asyncio
+async def test_resume_fetches_result_of_queued_comfyui_job(monkeypatch, no_side_effects):
+    stored: list = []
+    job = SimpleNamespace(
+        id=3, artikel_id=5, prompt="Hafen", image_type="photo", attempts=1,
+        backend="http://gpu-1:8188", remote_job_id="p1", remote_output="9",
+    )
+
+    async def fetch_output(prompt_id, output_node, base_url):
+        assert (prompt_id, output_node, base_url) == ("p1", "9", "http://gpu-1:8188")
+        return b"png"
+
+    async def store_image(*args, cached=False):
+        stored.append(args[:4])
+
+    monkeypatch.setattr(image_pipeline.comfyui_client, "fetch_output", fetch_output)
+    monkeypatch.setattr(image_pipeline.image_cache, "store", lambda data, key: "/static/images/x.png")
+    monkeypatch.setattr(image_pipeline, "_store_image", store_image)
+
+    await image_pipeline.resume_job(job, None)
+
+    assert stored == [(3, 5, "Hafen", "/static/images/x.png")]
+
+
+@pytest.mark.asyncio
+async def test_resume_gives_up_after_max_attempts(monkeypatch, no_side_effects):
+    monkeypatch.setattr(image_pipeline.settings, "image_job_max_attempts", 2)
+    job = SimpleNamespace(id=3, artikel_id=5, attempts=3, remote_job_id=None)
+
+    await image_pipeline.resume_job(job, None)
+
+    assert ("fail", (3, "Max attempts (2) exceeded"), {}) in no_side_effects
+
+
+@pytest.mark.asyncio
+async def test_progress_is_broadcast_per_step(monkeypatch, no_side_effects):
+    written: list[int] = []
+
+    async def ranked(checkpoint):
+        return ["http://gpu-1:8188"]
+
+    async def comfyui_only(key):
+        return key != image_pipeline.backend_health.RUNPOD
+
+    async def generate_image(prompt, image_type, on_progress, base_url, on_queued):
+        for step in range(1, 31):
+            await on_progress(step, 30)
+        return None
+
+    async def set_progress(session_factory, job_id, percent):
+        written.append(percent)
+
+    monkeypatch.setattr(image_pipeline.backend_health, "ranked_comfyui", ranked)
+    monkeypatch.setattr(image_pipeline.backend_health, "acquire", comfyui_only)
+    monkeypatch.setattr(image_pipeline.backend_health, "record_result", lambda key, ok: None)
+    monkeypatch.setattr(image_pipeline.comfyui_client, "generate_image", generate_image)
+    monkeypatch.setattr(image_pipeline.image_jobs, "set_progress", set_progress)
+
+    await image_pipeline.run_image_pipeline(5, "Hafen", "photo", None, job_id=9)
+
+    progress = [data["value"] for event, data, *_ in no_side_effects if event == "image:progress"]
+    assert progress == [3, 6, 9, 12, 15, 18, 21, 24, 27, 30]
+    assert written == [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+
+
+@pytest.mark.asyncio
+async def test_raising_half_open_trial_is_released(monkeypatch, no_side_effects):
+    url = "http://gpu-1:8188"
+    breaker = image_pipeline.backend_health.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    async def ranked(checkpoint):
+        return [url]
+
+    async def comfyui_only(key):
+        return key == url and breaker.allow()
+
+    async def generate_image(*args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(image_pipeline.backend_health, "breakers", {url: breaker})
+    monkeypatch.setattr(image_pipeline.backend_health, "ranked_comfyui", ranked)
+    monkeypatch.setattr(image_pipeline.backend_health, "acquire", comfyui_only)
+    monkeypatch.setattr(image_pipeline.comfyui_client, "generate_image", generate_image)
+
+    with pytest.raises(RuntimeError):
+        await image_pipeline.run_image_pipeline(5, "Hafen", "photo", None, job_id=9)
+
+    # The trial was released: the breaker admits the next trial instead of staying stuck
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_fails_over_to_next_comfyui_instance(monkeypatch, no_side_effects):
+    results, stored = [], []
+
+    async def ranked(checkpoint):
+        return ["http://gpu-1:8188", "http://gpu-2:8188"]
+
+    async def acquired(key):
+        return True
+
+    async def generate_image(prompt, image_type, on_progress, base_url, on_queued):
+        await on_queued("p1")
+        return b"png" if base_url == "http://gpu-2:8188" else None
+
+    async def store_image(*args, cached=False):
+        stored.append(args[:4])
+
+    monkeypatch.setattr(image_pipeline.backend_health, "ranked_comfyui", ranked)
+    monkeypatch.setattr(image_pipeline.backend_health, "acquire", acquired)
+    monkeypatch.setattr(image_pipeline.backend_health, "record_result", lambda key, ok: results.append((key, ok)))
+    monkeypatch.setattr(image_pipeline.comfyui_client, "generate_image", generate_image)
+    monkeypatch.setattr(image_pipeline.image_cache, "store", lambda data, key: "/static/images/x.png")
+    monkeypatch.setattr(image_pipeline, "_store_image", store_image)
+
+    await image_pipeline.run_image_pipeline(5, "Hafen", "photo", None, job_id=9)
+
+    assert results == [("http://gpu-1:8188", False), ("http://gpu-2:8188", True)]
+    started = [entry[1][2] for entry in no_side_effects if entry[0] == "start"]
+    assert started == ["http://gpu-1:8188", "http://gpu-2:8188"]
+    assert stored == [(9, 5, "Hafen", "/static/images/x.png")]
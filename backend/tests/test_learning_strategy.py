@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import RedaktionsLog, SupervisorLog, TonalityProfil, ThemenRanking
+from services.learning_strategy import (
+    get_deviation_stats, get_deviation_trend, get_windowed_ranking, process_editor_decision,
+)
+
+
+async def _create_article_with_evaluation(db: AsyncSession, tags: list[str]) -> RedaktionsLog:
+    row = RedaktionsLog(
+        titel="Lern-Test", trigger_typ="prompt", status="review",
+        kategorie="lerntest-kategorie", sprachen={"de": True},
+    )
+    db.add(row)
+    await db.flush()
+    db.add(SupervisorLog(
+        artikel_id=row.id,
+        supervisor_empfehlung="freigeben",
+        supervisor_score=80,
+        tonality_tags=tags,
+    ))
+    await db.flush()
+    return row
+
+
+@pytest.mark.asyncio
+async def test_approval_records_decision_and_reinforces_tags(db_session: AsyncSession):
+    row = await _create_article_with_evaluation(db_session, ["lerntest-sachlich", "lerntest-klar"])
+
+    await process_editor_decision(db_session, row.id, "freigeben", kategorie=row.kategorie)
+    await process_editor_decision(db_session, row.id, "freigeben", kategorie=row.kategorie)
+
+    sv = (await db_session.execute(
+        select(SupervisorLog).where(SupervisorLog.artikel_id == row.id)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+    assert sv.redakteur_entscheidung == "freigeben"
+    assert sv.abweichung is False
+
+    profil = (await db_session.execute(
+        select(TonalityProfil).where(TonalityProfil.merkmal == "lerntest-sachlich")
+    )).scalar_one()
+    assert profil.belege == 2
+    assert profil.gewichtung == pytest.approx(0.52)
+
+    ranking = (await db_session.execute(
+        select(ThemenRanking).where(ThemenRanking.kategorie == "lerntest-kategorie")
+    )).scalar_one()
+    assert ranking.artikel_count == 2
+
+
+@pytest.mark.asyncio
+async def test_revision_marks_deviation(db_session: AsyncSession):
+    row = await _create_article_with_evaluation(db_session, ["lerntest-locker"])
+
+    await process_editor_decision(db_session, row.id, "ueberarbeiten", "zu locker", kategorie=row.kategorie)
+
+    sv = (await db_session.execute(
+        select(SupervisorLog).where(SupervisorLog.artikel_id == row.id)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+    assert sv.abweichung is True
+    assert sv.redakteur_feedback == "zu locker"
+
+
+@pytest.mark.asyncio
+async def test_unused_tags_decay_with_floor(db_session: AsyncSession):
+    db_session.add_all([
+        TonalityProfil(merkmal="lerntest-alt", wert="x", gewichtung=0.5, belege=3),
+        TonalityProfil(merkmal="lerntest-boden", wert="x", gewichtung=0.1, belege=1),
+    ])
+    await db_session.flush()
+    row = await _create_article_with_evaluation(db_session, ["lerntest-neu"])
+
+    await process_editor_decision(db_session, row.id, "freigeben", kategorie=row.kategorie)
+
+    result = await db_session.execute(
+        select(TonalityProfil.merkmal, TonalityProfil.gewichtung)
+        .where(TonalityProfil.merkmal.in_(["lerntest-alt", "lerntest-boden", "lerntest-neu"]))
+    )
+    weights = dict(result.all())
+    assert weights["lerntest-alt"] == pytest.approx(0.495)
+    assert weights["lerntest-boden"] == pytest.approx(0.1)
+    assert weights["lerntest-neu"] == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_deviation_counters_track_changed_decisions(db_session: AsyncSession):
+    before = await get_deviation_stats(db_session, "lerntest-kategorie")
+    row = await _create_article_with_evaluation(db_session, [])
+
+    await process_editor_decision(db_session, row.id, "ueberarbeiten", kategorie=row.kategorie)
+    await process_editor_decision(db_session, row.id, "freigeben", kategorie=row.kategorie)
+
+    after = await get_deviation_stats(db_session, "lerntest-kategorie")
+    # Same supervisor log decided twice: one decision, deviation flipped back
+    assert after["total_decisions"] == before["total_decisions"] + 1
+    assert after["deviations"] == before["deviations"]
+
+    trend = await get_deviation_trend(db_session, weeks=4, kategorie="lerntest-kategorie")
+    assert len(trend) == 4
+    assert trend[-1]["total_decisions"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_decisions_feed_daily_rollup(db_session: AsyncSession):
+    row = await _create_article_with_evaluation(db_session, [])
+    row.kategorie = "lerntest-rollup"
+
+    await process_editor_decision(db_session, row.id, "ueberarbeiten", kategorie=row.kategorie)
+    await process_editor_decision(db_session, row.id, "freigeben", kategorie=row.kategorie)
+
+    ranking = await get_windowed_ranking(db_session, days=1, limit=100)
+    entry = next(r for r in ranking if r["kategorie"] == "lerntest-rollup")
+    assert entry["freigegeben"] == 1 and entry["abgelehnt"] == 1
+    assert entry["freigabe_rate"] == pytest.approx(0.5)
+    assert entry["avg_score"] == pytest.approx(80)
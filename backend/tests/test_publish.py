@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+from routes import publish
+
+
+@pytest.mark.asyncio
+async def test_publish_pipeline_batches_posts_and_commits_once(monkeypatch, fake_session):
+    archiv = SimpleNamespace(
+        titel="Titel", body="Text", lead="Lead", bild_url=None, bild_varianten=None,
+        seo_titel=None, seo_description=None, wp_post_id=None,
+    )
+    en = SimpleNamespace(sprache="en", titel="Title", body="Text", lead="", wp_post_id=None)
+    fr = SimpleNamespace(sprache="fr", titel="Titre", body="Texte", lead="", wp_post_id=None)
+    es = SimpleNamespace(sprache="es", titel="Titulo", body="", lead="", wp_post_id=None)
+    it = SimpleNamespace(sprache="it", titel="Titolo", body="Testo", lead="", wp_post_id=None)
+    session = fake_session([SimpleNamespace(id=1), archiv, [en, es, fr, it]])
+    calls, events, links = [], [], []
+
+    async def publish_posts(posts):
+        calls.extend(post["lang"] for post in posts)
+        responses = {"fr": None, "it": {"code": "rest_cannot_create"}}  # failed / no post id
+        return [
+            responses.get(post["lang"], {"id": 101 + i, "link": f"https://wp/{post['lang']}"})
+            for i, post in enumerate(posts)
+        ]
+
+    async def link_translations(post_ids):
+        links.append(post_ids)
+        return True
+
+    async def broadcast(event, data):
+        events.append((event, data))
+
+    monkeypatch.setattr(publish.wordpress_client, "publish_posts", publish_posts)
+    monkeypatch.setattr(publish.wordpress_client, "link_translations", link_translations)
+    monkeypatch.setattr(publish.manager, "broadcast", broadcast)
+
+    await publish._publish_pipeline(1, "draft", None, True, lambda: session)
+
+    assert calls == ["de", "en", "fr", "it"]
+    assert session.commits == 1
+    assert links == [{"de": 101, "en": 102}]
+    assert (archiv.wp_post_id, en.wp_post_id, fr.wp_post_id, it.wp_post_id) == (101, 102, None, None)
+    assert events == [("publish:complete", {
+        "artikel_id": 1,
+        "media_id": None,
+        "results": {
+            "de": {"ok": True, "wp_post_id": 101, "wp_url": "https://wp/de"},
+            "en": {"ok": True, "wp_post_id": 102, "wp_url": "https://wp/en"},
+            "fr": {"ok": False},
+            "it": {"ok": False},
+        },
+    })]
@@ -0,0 +1,28 @@
+from sqlalchemy.dialects import postgresql
+
+from db import queries
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_article_by_id_binds_parameter():
+    stmt = queries.article_by_id(42)
+    sql = _sql(stmt)
+    assert "redaktions_log.id = " in sql
+    assert "42" not in sql
+
+
+def test_lambda_statements_share_cache_key():
+    key_a = queries.translation_by_lang(1, "en")._generate_cache_key()
+    key_b = queries.translation_by_lang(2, "fr")._generate_cache_key()
+    assert key_a.key == key_b.key
+    assert [p.value for p in key_b.bindparams] == [2, "fr"]
+
+
+def test_image_status_joins_latest_job():
+    sql = _sql(queries.image_status(7))
+    assert "LEFT OUTER JOIN clnpth.image_jobs" in sql
+    assert "max(image_jobs_1.id)" in sql
+    assert "7" not in sql
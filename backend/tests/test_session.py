@@ -0,0 +1,30 @@
+import pytest
+
+from db import session as db_session_module
+
+
+def test_connect_args_default_has_no_statement_timeout(monkeypatch):
+    monkeypatch.setattr(db_session_module.settings, "db_statement_timeout_ms", 0)
+    args = db_session_module._connect_args()
+    assert args["ssl"] == db_session_module.settings.db_ssl
+    assert "server_settings" not in args
+
+
+def test_connect_args_statement_timeout(monkeypatch):
+    monkeypatch.setattr(db_session_module.settings, "db_statement_timeout_ms", 5000)
+    args = db_session_module._connect_args()
+    assert args["server_settings"] == {"statement_timeout": "5000"}
+
+
+def test_background_engine_is_separate_pool():
+    assert db_session_module.background_engine is not db_session_module.engine
+    assert db_session_module.background_engine.pool.size() == db_session_module.settings.db_background_pool_size
+
+
+@pytest.mark.asyncio
+async def test_read_db_falls_back_to_request_session():
+    if db_session_module.read_session is not None:
+        pytest.skip("read replica configured")
+    sentinel = object()
+    gen = db_session_module.get_read_db(sentinel)
+    assert await gen.__anext__() is sentinel
@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from services import evaluation_cache, supervisor_batch
+
+
+def _items(n: int) -> list[dict]:
+    return [
+        {"artikel_id": i, "titel": f"T{i}", "lead": None, "body": "b", "kategorie": None}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_bulk_inserts_results_and_counts_failures(monkeypatch, fake_session):
+    monkeypatch.setattr(supervisor_batch.settings, "mistral_rate_limit_rps", 0)
+    db = fake_session()
+    running = 0
+    peak = 0
+
+    async def fake_evaluate(titel, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return None if titel == "T3" else {"empfehlung": "freigeben", "score": 80}
+
+    async def no_hits(db, keys):
+        return {}
+
+    with patch.object(supervisor_batch, "evaluate_article", fake_evaluate), \
+            patch.object(evaluation_cache, "lookup", no_hits), \
+            patch.object(supervisor_batch.manager, "broadcast") as broadcast:
+        await supervisor_batch.run_evaluation_batch(
+            "b1", _items(10), "ctx", session_factory=lambda: db,
+        )
+
+    rows = [r for _, chunk in db.executed for r in chunk]
+    assert len(rows) == 9
+    assert 3 not in {r["artikel_id"] for r in rows}
+    assert peak <= supervisor_batch.settings.supervisor_batch_concurrency
+    event, data = broadcast.call_args.args
+    assert event == "supervisor:batch_complete"
+    assert data["evaluated"] == 9 and data["failed"] == 1 and data["total"] == 10
+
+
+@pytest.mark.asyncio
+async def test_batch_reuses_cached_evaluations(monkeypatch, fake_session):
+    monkeypatch.setattr(supervisor_batch.settings, "mistral_rate_limit_rps", 0)
+    db = fake_session()
+    items = _items(3)
+    hit_key = evaluation_cache.cache_key("T1", "", "b", None, "ctx")
+    evaluated: list[str] = []
+
+    async def fake_lookup(db, keys):
+        return {hit_key: {"empfehlung": "freigeben", "score": 90}} if hit_key in keys else {}
+
+    async def fake_evaluate(titel, **kwargs):
+        evaluated.append(titel)
+        return {"empfehlung": "ueberarbeiten", "score": 50}
+
+    with patch.object(supervisor_batch, "evaluate_article", fake_evaluate), \
+            patch.object(evaluation_cache, "lookup", fake_lookup), \
+            patch.object(supervisor_batch.manager, "broadcast") as broadcast:
+        await supervisor_batch.run_evaluation_batch(
+            "b2", items, "ctx", session_factory=lambda: db,
+        )
+
+    rows = {r["artikel_id"]: r for _, chunk in db.executed for r in chunk}
+    assert sorted(evaluated) == ["T0", "T2"]
+    assert rows[1]["supervisor_score"] == 90 and rows[1]["eval_hash"] == hit_key
+    assert all(r["eval_hash"] for r in rows.values())
+    data = broadcast.call_args.args[1]
+    assert data["cached"] == 1 and data["evaluated"] == 2 and data["done"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests():
+    limiter = supervisor_batch._RateLimiter(rate=50)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(3):
+        await limiter.wait()
+    assert loop.time() - start >= 0.035
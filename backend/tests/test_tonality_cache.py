@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services import tonality_cache
+from services.prompt_loader import load_tonality_summary
+
+
+def _profil(merkmal: str, gewichtung: float):
+    return SimpleNamespace(id=1, merkmal=merkmal, wert="w", gewichtung=gewichtung, belege=2)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    tonality_cache.invalidate()
+    yield
+    tonality_cache.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_reused_until_invalidated(fake_session):
+    db = fake_session([[_profil("sachlich", 0.9), _profil("klar", 0.6)]])
+
+    first = await tonality_cache.get_snapshot(db)
+    second = await tonality_cache.get_snapshot(db)
+    assert first is second
+    assert len(db.executed) == 1
+    assert "sachlich" in first.context
+
+    tonality_cache.invalidate()
+    third = await tonality_cache.get_snapshot(db)
+    assert len(db.executed) == 2
+    assert third.version > first.version
+
+
+@pytest.mark.asyncio
+async def test_summary_served_from_snapshot(fake_session):
+    db = fake_session([[_profil("sachlich", 0.9), _profil("klar", 0.6)]])
+
+    assert await load_tonality_summary(db) == "sachlich: w, klar: w"
+    assert await load_tonality_summary(db, top_n=1) == "sachlich: w"
+    assert len(db.executed) == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_profile_defaults(fake_session):
+    snap = await tonality_cache.get_snapshot(fake_session([[]]))
+    assert snap.summary == "keine Tonalitaet definiert"
+    assert snap.context.startswith("Noch kein Profil definiert")
+
+
+@pytest.mark.asyncio
+async def test_load_during_uncommitted_write_is_not_kept(fake_session):
+    reader = fake_session([[_profil("sachlich", 0.9)]])
+    async with AsyncSession() as writer:
+        tonality_cache.invalidate_on_commit(writer)
+        tonality_cache.invalidate_on_commit(writer)
+        # A concurrent load before the commit still sees the old rows
+        stale = await tonality_cache.get_snapshot(reader)
+        assert stale.entries[0]["merkmal"] == "sachlich"
+        reader.results = [[_profil("locker", 0.8)]]
+        await writer.commit()
+
+    fresh = await tonality_cache.get_snapshot(reader)
+    assert fresh.entries[0]["merkmal"] == "locker"
+    assert fresh.version == stale.version + 1
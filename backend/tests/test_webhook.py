@@ -1,8 +1,11 @@
+from datetime import datetime, timedelta
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung, SupervisorLog
+from db.models import RedaktionsLog, ArtikelArchiv, ArtikelUebersetzung, SupervisorLog, WebhookIngestLog
 
 
 async def _create_article(db: AsyncSession, status: str = "generating") -> RedaktionsLog:
@@ -185,6 +188,38 @@ async def test_webhook_updates_existing_translation(client: AsyncClient, db_sess
     assert trans.status == "reviewed"
 
 
+@pytest.mark.asyncio
+async def test_webhook_partial_translation_keeps_other_fields(client: AsyncClient, db_session: AsyncSession):
+    row = await _create_article(db_session)
+
+    await client.post("/api/webhook/n8n", json={
+        "artikel_id": row.id,
+        "status": "generating",
+        "translations": {
+            "en": {"titel": "Title", "body": "<p>Body</p>", "status": "deepl_done"},
+        },
+    })
+
+    # Only status changes — titel/body must survive the upsert
+    await client.post("/api/webhook/n8n", json={
+        "artikel_id": row.id,
+        "status": "review",
+        "translations": {"en": {"status": "reviewed"}},
+    })
+
+    from sqlalchemy import select
+    result = await db_session.execute(
+        select(ArtikelUebersetzung).where(
+            ArtikelUebersetzung.artikel_id == row.id,
+            ArtikelUebersetzung.sprache == "en",
+        )
+    )
+    trans = result.scalar_one()
+    assert trans.titel == "Title"
+    assert trans.body == "<p>Body</p>"
+    assert trans.status == "reviewed"
+
+
 # ── Supervisor upsert ───────────────────────────────────────
 
 
@@ -247,3 +282,236 @@ async def test_webhook_full_callback(client: AsyncClient, db_session: AsyncSessi
     await db_session.refresh(row)
     assert row.status == "review"
     assert row.titel == "Vollstaendiger Artikel"
+
+
+# ── Idempotency and ordering ────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_webhook_duplicate_idempotency_key_is_dropped(client: AsyncClient, db_session: AsyncSession):
+    row = await _create_article(db_session)
+
+    first = await client.post("/api/webhook/n8n", json={
+        "artikel_id": row.id,
+        "status": "review",
+        "idempotency_key": f"run-{row.id}-step-3",
+    })
+    assert first.status_code == 200
+    assert "duplicate" not in first.json()
+
+    retry = await client.post("/api/webhook/n8n", json={
+        "artikel_id": row.id,
+        "status": "review",
+        "idempotency_key": f"run-{row.id}-step-3",
+    })
+    assert retry.status_code == 200
+    assert retry.json()["duplicate"] is True
+
+
+@pytest.mark.asyncio
+async def test_webhook_stale_step_does_not_overwrite_status(client: AsyncClient, db_session: AsyncSession):
+    row = await _create_article(db_session)
+
+    await client.post("/api/webhook/n8n", json={
+        "artikel_id": row.id, "status": "review", "step": 5,
+    })
+    late = await client.post("/api/webhook/n8n", json={
+        "artikel_id": row.id, "status": "generating", "step": 2,
+    })
+    assert late.status_code == 200
+    data = late.json()
+    assert data["stale"] is True
+    assert data["status"] == "review"
+
+    await db_session.refresh(row)
+    assert row.status == "review"
+    assert row.last_step == 5
+
+
+@pytest.mark.asyncio
+async def test_full_callback_is_one_statement(monkeypatch, fake_session):
+    from types import SimpleNamespace
+
+    from sqlalchemy.dialects import postgresql
+
+    from db.schemas import N8nCallback
+    from services import dashboard_cache
+    from services.webhook_ingest import apply_callback
+
+    invalidated = []
+    monkeypatch.setattr(dashboard_cache, "invalidate_on_commit", invalidated.append)
+    db = fake_session([SimpleNamespace(logged=True, current_status="generating", id=7, titel="T", status="review")])
+    result = await apply_callback(db, N8nCallback(
+        artikel_id=7, status="review", titel="T", lead="L", body="B", step=3, idempotency_key="k",
+        translations={"en": {"titel": "E"}, "fr": {"lead": "F"}},
+        supervisor={"empfehlung": "freigeben", "score": 80},
+    ))
+
+    assert result == {"ok": True, "artikel_id": 7, "status": "review", "titel": "T"}
+    assert len(db.executed) == 1 and invalidated == [db]
+    sql = str(db.executed[0][0].compile(dialect=postgresql.dialect()))
+    for cte in ("current_article", "ingest", "article", "archive", "translation_0", "translation_1", "supervisor"):
+        assert f"{cte} AS" in sql
+
+
+@pytest.mark.asyncio
+async def test_callback_result_row_maps_to_duplicate_and_stale(fake_session):
+    from types import SimpleNamespace
+
+    from db.schemas import N8nCallback
+    from services.webhook_ingest import apply_callback
+
+    payload = N8nCallback(artikel_id=7, status="generating", step=2, idempotency_key="k")
+    skipped = {"id": None, "titel": None, "status": None}
+
+    duplicate = fake_session([SimpleNamespace(logged=False, current_status="review", **skipped)])
+    assert (await apply_callback(duplicate, payload))["duplicate"] is True
+
+    stale = fake_session([SimpleNamespace(logged=True, current_status="review", **skipped)])
+    assert await apply_callback(stale, payload) == {
+        "ok": True, "artikel_id": 7, "status": "review", "stale": True,
+    }
+
+    unknown = fake_session([SimpleNamespace(logged=True, current_status=None, **skipped)])
+    assert await apply_callback(unknown, payload) is None
+
+
+@pytest.mark.asyncio
+async def test_webhook_without_key_or_step_is_not_logged(client: AsyncClient, db_session: AsyncSession):
+    row = await _create_article(db_session)
+
+    resp = await client.post("/api/webhook/n8n", json={"artikel_id": row.id, "status": "review"})
+    assert resp.status_code == 200
+
+    logged = await db_session.execute(
+        select(func.count()).select_from(WebhookIngestLog).where(WebhookIngestLog.artikel_id == row.id)
+    )
+    assert logged.scalar_one() == 0
+
+
+@pytest.mark.asyncio
+async def test_prune_ingest_log_removes_expired_rows(db_session: AsyncSession):
+    from services.webhook_ingest import prune_ingest_log
+
+    old = WebhookIngestLog(artikel_id=1, step=1, empfangen_am=datetime.utcnow() - timedelta(days=400))
+    recent = WebhookIngestLog(artikel_id=1, step=2)
+    db_session.add_all([old, recent])
+    await db_session.flush()
+
+    assert await prune_ingest_log(db_session) >= 1
+    remaining = await db_session.execute(
+        select(WebhookIngestLog.id).where(WebhookIngestLog.id.in_([old.id, recent.id]))
+    )
+    assert remaining.scalars().all() == [recent.id]
+
+
+# ── Write-behind ingestion ──────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_webhook_async_ingest_returns_202(client: AsyncClient, monkeypatch):
+    from config import settings
+    from services import webhook_ingest
+    from routes import webhook as webhook_route
+
+    queue = webhook_ingest.WebhookQueue(maxsize=1)
+    monkeypatch.setattr(settings, "webhook_async_ingest", True)
+    monkeypatch.setattr(webhook_route, "webhook_queue", queue)
+
+    resp = await client.post("/api/webhook/n8n", json={"artikel_id": 1, "status": "review"})
+    assert resp.status_code == 202
+    assert resp.json()["queued"] is True
+    assert queue.depth == 1
+
+    # Buffer full — n8n should retry later
+    resp = await client.post("/api/webhook/n8n", json={"artikel_id": 2, "status": "review"})
+    assert resp.status_code == 503
+
+
+def test_webhook_queue_takes_bounded_batches():
+    from db.schemas import N8nCallback
+    from services.webhook_ingest import WebhookQueue
+
+    queue = WebhookQueue(maxsize=10, batch_size=3)
+    for i in range(5):
+        assert queue.enqueue(N8nCallback(artikel_id=i, status="review"))
+
+    first = queue._queue.get_nowait()
+    batch = queue._take_batch(first)
+    assert [p.artikel_id for p in batch] == [0, 1, 2]
+    assert queue.depth == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_queue_finishes_batch_when_cancelled(monkeypatch):
+    import asyncio
+    from db.schemas import N8nCallback
+    from services.webhook_ingest import WebhookQueue
+
+    queue = WebhookQueue(maxsize=10, batch_size=5)
+    started, applied = asyncio.Event(), []
+
+    async def slow_apply(batch, session_factory):
+        started.set()
+        await asyncio.sleep(0.02)
+        applied.extend(p.artikel_id for p in batch)
+
+    monkeypatch.setattr(queue, "apply_batch", slow_apply)
+    queue.enqueue(N8nCallback(artikel_id=1, status="review"))
+    queue.enqueue(N8nCallback(artikel_id=2, status="review"))
+
+    task = asyncio.create_task(queue.run(None))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert applied == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_webhook_queue_stores_callbacks_that_fail_twice(monkeypatch, fake_session):
+    from db.schemas import N8nCallback
+    from services import webhook_ingest
+
+    async def apply_callback(db, payload):
+        if payload.artikel_id == 2:
+            raise RuntimeError("deadlock")
+        return {"ok": True, "artikel_id": payload.artikel_id, "status": "review", "titel": "T"}
+
+    async def broadcast_applied(result):
+        pass
+
+    monkeypatch.setattr(webhook_ingest, "apply_callback", apply_callback)
+    monkeypatch.setattr(webhook_ingest, "broadcast_applied", broadcast_applied)
+    queue = webhook_ingest.WebhookQueue(maxsize=10)
+    db = fake_session()
+
+    await queue.apply_batch(
+        [N8nCallback(artikel_id=1, status="review"), N8nCallback(artikel_id=2, status="review")],
+        lambda: db,
+    )
+
+    inserts = [stmt for stmt, _ in db.executed if "webhook_dead_letters" in str(stmt)]
+    assert len(inserts) == 1 and not queue.dead_letters
+    assert inserts[0].compile().params["artikel_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_queue_replays_claimed_dead_letters(fake_session):
+    from sqlalchemy.dialects import postgresql
+
+    from db.schemas import N8nCallback
+    from services import webhook_ingest
+
+    queue = webhook_ingest.WebhookQueue(maxsize=10)
+    # Could not be stored earlier: written before the claim
+    queue.dead_letters.append(N8nCallback(artikel_id=3, status="review"))
+    db = fake_session([None, [{"artikel_id": 2, "status": "review"}]])
+
+    assert await queue.replay_dead_letters(lambda: db) == 1
+
+    assert queue.depth == 1 and not queue.dead_letters
+    claim = str(db.executed[-1][0].compile(dialect=postgresql.dialect()))
+    assert claim.startswith("DELETE FROM clnpth.webhook_dead_letters") and "RETURNING" in claim
+    assert "FOR UPDATE SKIP LOCKED" in claim
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services import wordpress_client
+
+
+@pytest.mark.asyncio
+async def test_iter_file_streams_in_chunks(tmp_path):
+    path = tmp_path / "bild.webp"
+    path.write_bytes(b"x" * 10)
+
+    chunks = [chunk async for chunk in wordpress_client._iter_file(path, chunk_size=4)]
+
+    assert [len(c) for c in chunks] == [4, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_upload_media_missing_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(wordpress_client, "_is_configured", lambda: True)
+    assert await wordpress_client.upload_media(str(tmp_path / "fehlt.png")) is None
+
+
+def _mock_wp(monkeypatch, handler):
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(wordpress_client, "_is_configured", lambda: True)
+    monkeypatch.setattr(wordpress_client.settings, "wp_url", "http://wp.test/wp-json/wp/v2")
+    monkeypatch.setattr(wordpress_client, "_site_limits", {})
+    monkeypatch.setattr(wordpress_client, "_batch_unsupported", set())
+    monkeypatch.setattr(
+        wordpress_client.httpx, "AsyncClient",
+        lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+    )
+
+
+@pytest.mark.asyncio
+async def test_publish_post_respects_site_concurrency_cap(monkeypatch):
+    running = peak = 0
+
+    async def handler(request):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return httpx.Response(201, json={"id": 1})
+
+    monkeypatch.setattr(wordpress_client.settings, "wp_max_concurrency", 2)
+    _mock_wp(monkeypatch, handler)
+
+    posts = await asyncio.gather(*(wordpress_client.publish_post(f"T{i}", "x") for i in range(5)))
+
+    assert posts == [{"id": 1}] * 5
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_publish_posts_uses_batch_api_in_chunks(monkeypatch):
+    batches = []
+
+    def handler(request):
+        assert request.url.path == "/wp-json/batch/v1"
+        requests = json.loads(request.content)["requests"]
+        batches.append([r["path"] for r in requests])
+        return httpx.Response(207, json={"responses": [
+            {"status": 201 if r["path"].endswith("/posts") else 200, "body": {"id": r["body"]["title"]}}
+            for r in requests
+        ]})
+
+    _mock_wp(monkeypatch, handler)
+    posts = [{"title": i, "content": "x"} for i in range(30)] + [{"post_id": 7, "title": 30, "content": "x"}]
+
+    results = await wordpress_client.publish_posts(posts)
+
+    assert results == [{"id": i} for i in range(31)]
+    assert [len(b) for b in batches] == [25, 6]
+    assert batches[1][-1] == "/wp/v2/posts/7"
+
+
+@pytest.mark.asyncio
+async def test_batch_write_falls_back_without_batch_api(monkeypatch):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        if request.url.path.endswith("/batch/v1"):
+            return httpx.Response(404, json={"code": "rest_no_route"})
+        return httpx.Response(201, json={"id": 1})
+
+    _mock_wp(monkeypatch, handler)
+
+    assert await wordpress_client.batch_write([("/posts", {}), ("/posts", {})]) == [{"id": 1}, {"id": 1}]
+    assert await wordpress_client.batch_write([("/posts", {})]) == [{"id": 1}]
+    assert paths.count("/wp-json/batch/v1") == 1
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from ws import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.sent.append(json.loads(message))
+
+
+@pytest.mark.asyncio
+async def test_broadcast_assigns_monotonic_seq():
+    mgr = ConnectionManager(buffer_size=10)
+    ws = FakeWebSocket()
+    await mgr.connect(ws)
+
+    await mgr.broadcast("article:created", {"id": 1})
+    await mgr.broadcast("article:updated", {"id": 1})
+
+    assert [m["seq"] for m in ws.sent] == [1, 2]
+    assert mgr.seq == 2
+
+
+@pytest.mark.asyncio
+async def test_connect_replays_missed_events():
+    mgr = ConnectionManager(buffer_size=10)
+    for i in range(5):
+        await mgr.broadcast("article:updated", {"id": i})
+
+    ws = FakeWebSocket()
+    await mgr.connect(ws, since=3)
+
+    assert [m["seq"] for m in ws.sent] == [4, 5]
+    assert mgr.count == 1
+
+
+@pytest.mark.asyncio
+async def test_connect_sends_reset_when_gap_exceeds_buffer():
+    mgr = ConnectionManager(buffer_size=2)
+    for i in range(5):
+        await mgr.broadcast("article:updated", {"id": i})
+
+    ws = FakeWebSocket()
+    await mgr.connect(ws, since=1)
+
+    assert len(ws.sent) == 1
+    assert ws.sent[0]["event"] == "sync:reset"
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_roundtrip(tmp_path):
+    mgr = ConnectionManager(buffer_size=10)
+    await mgr.broadcast("article:created", {"id": 7})
+    path = tmp_path / "ws_state.json"
+    mgr.save(path)
+
+    restored = ConnectionManager(buffer_size=10)
+    restored.load(path)
+    ws = FakeWebSocket()
+    await restored.connect(ws, since=0)
+
+    assert restored.seq == 1
+    assert ws.sent[0]["data"] == {"id": 7}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_during_replay_is_queued_in_order():
+    import asyncio
+
+    mgr = ConnectionManager(buffer_size=10)
+    for i in range(3):
+        await mgr.broadcast("article:updated", {"id": i})
+
+    release = asyncio.Event()
+
+    class SlowWebSocket(FakeWebSocket):
+        async def send_text(self, message: str):
+            await release.wait()
+            await super().send_text(message)
+
+    ws = SlowWebSocket()
+    connecting = asyncio.create_task(mgr.connect(ws, since=1))
+    await asyncio.sleep(0)
+    # The replay is blocked on the client, yet broadcasts are not
+    await asyncio.wait_for(mgr.broadcast("article:updated", {"id": 3}), timeout=1)
+    release.set()
+    await connecting
+    await mgr.broadcast("article:updated", {"id": 4})
+
+    assert [m["seq"] for m in ws.sent] == [2, 3, 4, 5]
+    assert mgr.count == 1
+
+
+def test_claim_rejects_second_process(tmp_path):
+    import subprocess
+    import sys
+
+    lock = tmp_path / "ws.lock"
+    mgr = ConnectionManager()
+    mgr.claim(lock)
+
+    # flock is per open file, so a second claim from another process fails
+    child = subprocess.run(
+        [sys.executable, "-c", f"from ws import ConnectionManager; from pathlib import Path; "
+                               f"ConnectionManager().claim(Path({str(lock)!r}))"],
+        capture_output=True, text=True,
+    )
+    assert child.returncode != 0
+    assert "single worker" in child.stderr
@@ -1,28 +1,79 @@
 import asyncio
+import fcntl
 import json
+import logging
+from collections import deque
+from pathlib import Path
+from typing import IO
+
 from fastapi import WebSocket, WebSocketDisconnect
 
+from config import settings
+
+logger = logging.getLogger(__name__)
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for live status broadcasts."""
+    """Manages WebSocket connections for live status broadcasts.
+
+    Every broadcast gets a monotonic sequence number and is kept in a bounded
+    ring buffer, so reconnecting clients can resume from their last seen
+    sequence instead of reloading everything.
 
-    def __init__(self) -> None:
+    Connections, sequence and buffer live in this process, so the app must
+    run as a single worker (see the Dockerfile); `claim` makes a second
+    worker fail at startup.
+    """
+
+    def __init__(self, buffer_size: int = 1000) -> None:
         self._connections: list[WebSocket] = []
+        # Connections still receiving their replay, with the broadcasts queued meanwhile
+        self._pending: dict[WebSocket, list[str]] = {}
         self._lock = asyncio.Lock()
+        self._seq = 0
+        self._buffer: deque[tuple[int, str]] = deque(maxlen=buffer_size)
+        self._state_lock: IO | None = None
 
-    async def connect(self, ws: WebSocket) -> None:
+    async def connect(self, ws: WebSocket, since: int | None = None) -> None:
         await ws.accept()
         async with self._lock:
-            self._connections.append(ws)
+            if since is None:
+                self._connections.append(ws)
+                return
+            backlog = self._replay_messages(since)
+            self._pending[ws] = []
+        # Replay outside the lock; broadcasts in the meantime queue up in
+        # _pending and are sent after it, so the client sees every seq in order
+        try:
+            while True:
+                for message in backlog:
+                    await ws.send_text(message)
+                async with self._lock:
+                    backlog = self._pending[ws]
+                    if not backlog:
+                        del self._pending[ws]
+                        self._connections.append(ws)
+                        return
+                    self._pending[ws] = []
+        except BaseException:
+            async with self._lock:
+                self._pending.pop(ws, None)
+            raise
 
     async def disconnect(self, ws: WebSocket) -> None:
         async with self._lock:
-            self._connections.remove(ws)
+            self._pending.pop(ws, None)
+            if ws in self._connections:
+                self._connections.remove(ws)
 
     async def broadcast(self, event: str, data: dict) -> None:
-        message = json.dumps({"event": event, "data": data})
         async with self._lock:
+            self._seq += 1
+            message = json.dumps({"seq": self._seq, "event": event, "data": data})
+            self._buffer.append((self._seq, message))
             dead: list[WebSocket] = []
+            for queued in self._pending.values():
+                queued.append(message)
             for ws in self._connections:
                 try:
                     await ws.send_text(message)
@@ -31,9 +82,59 @@ class ConnectionManager:
             for ws in dead:
                 self._connections.remove(ws)
 
+    def _replay_messages(self, since: int) -> list[str]:
+        """Buffered events after `since`, or a sync:reset if the gap is too large."""
+        oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        if since > self._seq or since < oldest - 1:
+            # Client is ahead (server restarted) or fell out of the buffer
+            return [json.dumps({"seq": self._seq, "event": "sync:reset", "data": {"since": since}})]
+        return [message for seq, message in self._buffer if seq > since]
+
     @property
     def count(self) -> int:
-        return len(self._connections)
+        return len(self._connections) + len(self._pending)
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def claim(self, lock_path: Path) -> None:
+        """Hold an exclusive lock on `lock_path` for the life of this process (called on startup).
+
+        Raises RuntimeError if another process holds it, i.e. the app was
+        started with more than one worker.
+        """
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock = open(lock_path, "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise RuntimeError(
+                f"{lock_path} is held by another process: WebSocket state is per-process, run a single worker"
+            ) from None
+        self._state_lock = lock
+
+    def save(self, path: Path) -> None:
+        """Persist sequence counter and ring buffer (called on shutdown)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "seq": self._seq,
+            "events": [message for _, message in self._buffer],
+        }))
+
+    def load(self, path: Path) -> None:
+        """Restore sequence counter and ring buffer (called on startup)."""
+        if not path.exists():
+            return
+        try:
+            state = json.loads(path.read_text())
+            self._seq = int(state["seq"])
+            self._buffer.clear()
+            for message in state["events"]:
+                self._buffer.append((json.loads(message)["seq"], message))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring unreadable WebSocket replay state at %s", path)
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(buffer_size=settings.ws_replay_buffer_size)
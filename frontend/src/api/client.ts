@@ -209,7 +209,7 @@ export const api = {
 
   images: {
     trigger: (articleId: number, prompt: string, imageType: string = "illustration") =>
-      request<{ ok: boolean; artikel_id: number; backend: string }>(
+      request<{ ok: boolean; artikel_id: number; backend: string; job_id: number }>(
         `/articles/${articleId}/image/trigger`,
         {
           method: "POST",
@@ -218,7 +218,16 @@ export const api = {
       ),
 
     status: (articleId: number) =>
-      request<{ artikel_id: number; bild_url: string | null; bild_prompt: string | null; status: string }>(
+      request<{
+        artikel_id: number;
+        bild_url: string | null;
+        bild_prompt: string | null;
+        status: string;
+        job_id: number | null;
+        backend: string | null;
+        progress: number;
+        error: string | null;
+      }>(
         `/articles/${articleId}/image/status`
       ),
 
@@ -2,18 +2,31 @@ import { useEffect, useRef, useCallback } from "react";
 
 type WsHandler = (event: string, data: Record<string, unknown>) => void;
 
-export function useWebSocket(onMessage: WsHandler) {
+export function useWebSocket(onMessage: WsHandler, onResync?: () => void) {
   const wsRef = useRef<WebSocket | null>(null);
+  const lastSeqRef = useRef<number | null>(null);
   const handlerRef = useRef(onMessage);
   handlerRef.current = onMessage;
+  const resyncRef = useRef(onResync);
+  resyncRef.current = onResync;
 
   const connect = useCallback(() => {
     const protocol = location.protocol === "https:" ? "wss:" : "ws:";
-    const ws = new WebSocket(`${protocol}//${location.host}/ws/status`);
+    // Resume from the last seen sequence so only missed events are replayed
+    const since = lastSeqRef.current !== null ? `?since=${lastSeqRef.current}` : "";
+    const ws = new WebSocket(`${protocol}//${location.host}/ws/status${since}`);
 
     ws.onmessage = (e) => {
       try {
         const msg = JSON.parse(e.data);
+        if (typeof msg.seq === "number") {
+          lastSeqRef.current = msg.seq;
+        }
+        if (msg.event === "sync:reset") {
+          // Gap too large for replay — caller should reload in full
+          resyncRef.current?.();
+          return;
+        }
         handlerRef.current(msg.event, msg.data);
       } catch {
         // ignore malformed messages
@@ -1,7 +1,8 @@
-import { useState } from "react";
+import { useCallback, useState } from "react";
 import { COLORS } from "../styles/tokens";
 import { useAccessibility } from "../hooks/useAccessibility";
 import { useArticleList, useQueueStats } from "../hooks/useArticles";
+import { useWebSocket } from "../hooks/useWebSocket";
 import { api } from "../api/client";
 import { timeAgo } from "../utils/timeAgo";
 import type { ArticleStatus } from "../types";
@@ -44,8 +45,17 @@ interface QueueScreenProps {
 export default function QueueScreen({ onOpenReview }: QueueScreenProps) {
   useAccessibility();
   const [activeFilter, setActiveFilter] = useState<FilterKey>("all");
-  const { articles, loading } = useArticleList(FILTER_TO_STATUS[activeFilter]);
-  const { stats } = useQueueStats();
+  const { articles, loading, refresh } = useArticleList(FILTER_TO_STATUS[activeFilter]);
+  const { stats, refresh: refreshStats } = useQueueStats();
+
+  const reload = useCallback(() => {
+    refresh();
+    refreshStats();
+  }, [refresh, refreshStats]);
+  // Live status: article events and a sync:reset after a long disconnect reload the list
+  useWebSocket((event) => {
+    if (event.startsWith("article:")) reload();
+  }, reload);
 
   const subtitle = stats
     ? `${stats.total} Artikel \u00b7 ${stats.review} zur Freigabe`
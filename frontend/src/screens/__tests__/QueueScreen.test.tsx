@@ -6,8 +6,12 @@ vi.mock("../../hooks/useAccessibility", () => ({
 }));
 
 vi.mock("../../hooks/useArticles", () => ({
-  useArticleList: () => ({ articles: [], loading: false }),
-  useQueueStats: () => ({ stats: { total: 5, review: 2, generating: 1, translating: 1, published: 1, rejected: 0, failed: 0, timeout: 0, paused: 0, cancelled: 0 } }),
+  useArticleList: () => ({ articles: [], loading: false, refresh: vi.fn() }),
+  useQueueStats: () => ({ refresh: vi.fn(), stats: { total: 5, review: 2, generating: 1, translating: 1, published: 1, rejected: 0, failed: 0, timeout: 0, paused: 0, cancelled: 0 } }),
+}));
+
+vi.mock("../../hooks/useWebSocket", () => ({
+  useWebSocket: () => {},
 }));
 
 vi.mock("../../api/client", () => ({